@@ -0,0 +1,50 @@
+"""
+Measures validation of generated bodies of growing size by `validate_request`.
+
+    python -m benchmarks.payload_sizes
+"""
+
+import json
+import timeit
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from flask_pydantic.payloads import PayloadGenerator
+from flask_pydantic.spec import RouteSpec
+from flask_pydantic.validation import validate_request
+
+NUMBER = 200
+LIST_LENGTHS = (1, 10, 100, 1000)
+
+
+class LineItem(BaseModel):
+    sku: str
+    quantity: int
+    price: float
+    note: Optional[str] = None
+
+
+class Order(BaseModel):
+    id: str
+    created: datetime
+    tags: List[str]
+    items: List[LineItem]
+
+
+SPEC = RouteSpec(body=Order)
+
+
+if __name__ == "__main__":
+    print(f"{'items':>6}{'body':>12}{'per request':>14}")
+    for length in LIST_LENGTHS:
+        generator = PayloadGenerator(seed=0, list_length=length, max_depth=3)
+        raw_body = json.dumps(generator.generate(Order)).encode()
+        elapsed = timeit.timeit(
+            lambda: validate_request(SPEC, raw_body=raw_body), number=NUMBER
+        )
+        print(
+            f"{length:>6}{len(raw_body) / 1024:>9.1f} KB"
+            f"{elapsed / NUMBER * 1e6:>11.2f} µs"
+        )
@@ -0,0 +1,46 @@
+"""
+Compares query validation of a route with and without `query_cache` for a repeated
+query string.
+
+    python -m benchmarks.query_cache
+"""
+
+import timeit
+from typing import Optional, Tuple
+from urllib.parse import parse_qsl
+
+from pydantic import BaseModel, ConfigDict
+from werkzeug.datastructures import MultiDict
+
+from flask_pydantic.spec import RouteSpec
+from flask_pydantic.validation import validate_request
+
+NUMBER = 20_000
+
+
+class Query(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    q: str
+    page: int = 1
+    per_page: int = 20
+    sort: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+
+
+QUERY_STRING = b"q=shoes&page=3&per_page=50&sort=-price&tags=red&tags=sale"
+QUERY = MultiDict(parse_qsl(QUERY_STRING.decode()))
+SPECS = {
+    "no cache": RouteSpec(query=Query),
+    "query_cache": RouteSpec(query=Query, query_cache=128),
+}
+
+
+if __name__ == "__main__":
+    print(f"{'case':<14}{'per request':>14}")
+    for name, spec in SPECS.items():
+        elapsed = timeit.timeit(
+            lambda: validate_request(spec, query=QUERY, query_string=QUERY_STRING),
+            number=NUMBER,
+        )
+        print(f"{name:<14}{elapsed / NUMBER * 1e6:>11.2f} µs")
@@ -0,0 +1,63 @@
+"""
+Compares a validated GET route serializing 200 models with the same route using
+`SharedResponseCache` (requests of the werkzeug test client).
+
+    python -m benchmarks.response_cache
+"""
+
+import tempfile
+import timeit
+from typing import List
+
+from flask import Flask
+from pydantic import BaseModel
+
+from flask_pydantic import validate
+from flask_pydantic.response_cache import SharedResponseCache
+
+NUMBER = 2_000
+ITEMS = 200
+
+
+class Query(BaseModel):
+    category: str
+    limit: int = ITEMS
+
+
+class Product(BaseModel):
+    id: int
+    name: str
+    category: str
+    price: float
+
+
+def create_app(cache: SharedResponseCache) -> Flask:
+    app = Flask(__name__)
+
+    def products(query: Query) -> List[Product]:
+        return [
+            Product(id=i, name=f"product {i}", category=query.category, price=i * 1.1)
+            for i in range(query.limit)
+        ]
+
+    app.add_url_rule("/products", "products", validate(response_many=True)(products))
+    app.add_url_rule(
+        "/cached",
+        "cached",
+        validate(response_many=True, response_cache=cache)(products),
+    )
+    return app
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SharedResponseCache(f"{directory}/cache", slot_size=64 * 1024)
+        client = create_app(cache).test_client()
+        print(f"{'case':<16}{'per request':>14}")
+        for name, url in (("no cache", "/products"), ("response_cache", "/cached")):
+            elapsed = timeit.timeit(
+                lambda: client.get(url, query_string={"category": "shoes"}),
+                number=NUMBER,
+            )
+            print(f"{name:<16}{elapsed / NUMBER * 1e6:>11.1f} µs")
+        cache.close()
@@ -0,0 +1,73 @@
+"""
+Compares serialization of `response_many` responses to supported formats.
+
+    python -m benchmarks.response_formats
+"""
+
+import timeit
+from datetime import datetime
+
+from pydantic import BaseModel, create_model
+
+from flask_pydantic.formats import (
+    dump_arrow,
+    dump_columnar,
+    dump_parquet,
+    iter_csv,
+    pyarrow,
+    tabular_schema,
+)
+
+ROWS = 1_000
+
+# 20 fields of mixed types, as in a typical dashboard table
+Row = create_model(
+    "Row",
+    __base__=BaseModel,
+    **{f"int_field_{i}": (int, ...) for i in range(8)},
+    **{f"str_field_{i}": (str, ...) for i in range(6)},
+    **{f"float_field_{i}": (float, ...) for i in range(4)},
+    **{f"datetime_field_{i}": (datetime, ...) for i in range(2)},
+)
+
+CONTENT = [
+    Row(
+        **{f"int_field_{i}": n * i for i in range(8)},
+        **{f"str_field_{i}": f"value {n} {i}" for i in range(6)},
+        **{f"float_field_{i}": n / (i + 1) for i in range(4)},
+        **{f"datetime_field_{i}": datetime(2024, 1, 8, 12, i) for i in range(2)},
+    )
+    for n in range(ROWS)
+]
+
+
+def dump_json() -> bytes:
+    # same as `make_json_response(..., many=True)`
+    return f"[{', '.join([model.model_dump_json() for model in CONTENT])}]".encode()
+
+
+def dump_csv() -> bytes:
+    schema = tabular_schema(CONTENT, False, None)
+    return "".join(iter_csv(schema, CONTENT)).encode()
+
+
+FORMATS = {
+    "json": dump_json,
+    "columnar": lambda: dump_columnar(CONTENT),
+    "csv": dump_csv,
+}
+if pyarrow is not None:
+    FORMATS["arrow"] = lambda: dump_arrow(tabular_schema(CONTENT, False, None), CONTENT)
+    FORMATS["parquet"] = lambda: dump_parquet(
+        tabular_schema(CONTENT, False, None), CONTENT
+    )
+
+
+def bench(func, number: int = 50) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+if __name__ == "__main__":
+    print(f"{'format':<10}{'time':>12}{'size':>12}")
+    for name, func in FORMATS.items():
+        print(f"{name:<10}{bench(func) * 1e3:>10.2f}ms{len(func()):>11}B")
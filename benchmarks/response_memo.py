@@ -0,0 +1,53 @@
+"""
+Compares serialization of long-lived frozen models by `make_json_response` with and
+without `response_memo`.
+
+    python -m benchmarks.response_memo
+"""
+
+import timeit
+from typing import Optional, Tuple
+
+from flask import Flask
+from pydantic import BaseModel, ConfigDict
+
+from flask_pydantic.core import make_json_response
+
+NUMBER = 200
+ITEMS = 1000
+
+
+class Feature(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    key: str
+    description: str
+    enabled: bool
+    rollout: float
+    segments: Tuple[str, ...]
+    owner: Optional[str] = None
+
+
+CATALOG = [
+    Feature(
+        key=f"feature-{i}",
+        description=f"description of feature {i}",
+        enabled=i % 2 == 0,
+        rollout=i / ITEMS,
+        segments=("beta", "internal"),
+    )
+    for i in range(ITEMS)
+]
+
+
+if __name__ == "__main__":
+    print(f"{'case':<16}{'per response':>14}")
+    with Flask(__name__).app_context():
+        for name, memo in (("no memo", False), ("response_memo", True)):
+            elapsed = timeit.timeit(
+                lambda: make_json_response(
+                    CATALOG, 200, by_alias=False, many=True, memo=memo
+                ),
+                number=NUMBER,
+            )
+            print(f"{name:<16}{elapsed / NUMBER * 1000:>11.2f} ms")
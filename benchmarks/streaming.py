@@ -0,0 +1,56 @@
+"""
+Compares validation of a large JSON array body parsed at once (`request_body_many`)
+and incrementally (`request_body_stream=True`), measures time and peak memory.
+
+    python -m benchmarks.streaming
+"""
+
+import io
+import json
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import BaseModel
+
+from flask_pydantic.streaming import iter_json_models
+from flask_pydantic.validation import validate_many_models
+
+ITEMS = 200_000
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    tags: List[str]
+
+
+BODY = json.dumps(
+    [{"id": i, "name": f"name {i}", "tags": ["a", "b"]} for i in range(ITEMS)]
+).encode()
+CASES = {
+    # `Request.get_json` followed by validation of the whole list
+    "at once": lambda: len(validate_many_models(Item, json.loads(BODY))),
+    "stream": lambda: sum(1 for _ in iter_json_models(Item, io.BytesIO(BODY))),
+    "stream (batches)": lambda: sum(
+        len(batch) for batch in iter_json_models(Item, io.BytesIO(BODY), 1000)
+    ),
+}
+
+
+def measure(func) -> tuple:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    print(f"{'case':<18}{'time':>10}{'peak memory':>14}")
+    for name, func in CASES.items():
+        elapsed, peak = measure(func)
+        print(f"{name:<18}{elapsed:>9.2f}s{peak / 2**20:>11.1f} MB")
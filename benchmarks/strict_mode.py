@@ -0,0 +1,79 @@
+"""
+Compares lax and strict validation of request parameters.
+
+    python -m benchmarks.strict_mode
+"""
+
+import json
+import timeit
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from flask_pydantic.core import validate_json_model, validate_string_model
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+    zip_code: str
+
+
+class Body(BaseModel):
+    id: int
+    name: str
+    email: str
+    score: float
+    active: bool
+    created: datetime
+    tags: List[str]
+    address: Address
+    nickname: Optional[str] = None
+
+
+class Query(BaseModel):
+    limit: int
+    offset: int
+    search: str
+    active: bool
+
+
+BODY = json.dumps(
+    {
+        "id": 123,
+        "name": "Geralt",
+        "email": "geralt@rivia.example",
+        "score": 9.5,
+        "active": True,
+        "created": "2024-01-08T12:30:00",
+        "tags": ["witcher", "wolf", "school"],
+        "address": {"street": "Main 1", "city": "Rivia", "zip_code": "12345"},
+    }
+).encode()
+QUERY = {"limit": "20", "offset": "40", "search": "wolf", "active": "true"}
+CASES = {
+    # lax body validation parses JSON by `Request.get_json` first
+    "body": (
+        lambda: Body(**json.loads(BODY)),
+        lambda: validate_json_model(Body, BODY),
+    ),
+    "query": (
+        lambda: validate_string_model(Query, QUERY, strict=False),
+        lambda: validate_string_model(Query, QUERY, strict=True),
+    ),
+}
+
+
+def bench(func, number: int = 50_000) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+if __name__ == "__main__":
+    print(f"{'source':<8}{'lax':>12}{'strict':>12}{'speedup':>10}")
+    for source, (lax, strict) in CASES.items():
+        lax_time, strict_time = bench(lax), bench(strict)
+        print(
+            f"{source:<8}{lax_time * 1e6:>10.2f}us{strict_time * 1e6:>10.2f}us"
+            f"{lax_time / strict_time:>9.2f}x"
+        )
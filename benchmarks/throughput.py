@@ -0,0 +1,254 @@
+"""
+Throughput of the example app across processes and threads of a local WSGI
+server, driven by a local load generator (Linux, no network access needed).
+
+The server pre-forks `processes` workers accepting connections of one listening
+socket, each handling them by a pool of `threads` threads. Load generator
+processes send requests generated by `flask_pydantic.payloads` to one route at
+a time in a closed loop, `clients` requests at once. Successful (2xx, 3xx) and
+rejected (4xx) requests per second are reported separately, as rejected requests
+skip the view and serialization of the response.
+
+    python -m benchmarks.throughput --processes 1,2,4 --threads 1,4 --duration 3
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from flask import Flask
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from flask_pydantic.payloads import PayloadGenerator, request_corpus
+from flask_pydantic.stats import Histogram
+
+HOST = "127.0.0.1"
+EXAMPLE_APP = os.path.join(
+    os.path.dirname(__file__), os.pardir, "example_app", "app.py"
+)
+_FORK = multiprocessing.get_context("fork")
+
+
+def load_example_app() -> Flask:
+    spec = importlib.util.spec_from_file_location("example_app", EXAMPLE_APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # a connection per request, so that connections are spread over processes
+    protocol_version = "HTTP/1.0"
+
+    def log(self, type: str, message: str, *args: Any) -> None:
+        pass
+
+
+class _PooledWSGIServer(BaseWSGIServer):
+    """WSGI server handling connections by a fixed pool of threads"""
+
+    multithread = True
+
+    def __init__(self, app: Flask, fd: int, threads: int):
+        super().__init__(HOST, 0, app, handler=_RequestHandler, fd=fd)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request: socket.socket, client_address: Any) -> None:
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request: socket.socket, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def serve(app: Flask, processes: int, threads: int) -> Tuple[int, List[int]]:
+    """
+    starts pre-forked server of the application
+
+    :return: port and pids of worker processes
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((HOST, 0))
+    listener.listen(1024)
+    pids = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server = _PooledWSGIServer(app, listener.fileno(), threads)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    port = listener.getsockname()[1]
+    listener.close()
+    return port, pids
+
+
+def stop(pids: List[int]) -> None:
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def _send(port: int, request: Dict[str, Any]) -> int:
+    headers = {"Connection": "close"}
+    body: Optional[bytes] = None
+    if "json" in request:
+        body = json.dumps(request["json"]).encode()
+        headers["Content-Type"] = "application/json"
+    elif "form" in request:
+        body = urlencode(request["form"]).encode()
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    connection = http.client.HTTPConnection(HOST, port)
+    try:
+        connection.request(request["method"], request["url"], body, headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def _client(
+    args: Tuple[int, List[Dict[str, Any]], float],
+) -> Tuple[List[int], int, int]:
+    """
+    sends the requests in a loop until the deadline
+
+    :return: latencies (in ns), numbers of rejected (4xx) and failed requests
+    """
+    port, requests, deadline = args
+    latencies = []
+    rejected = failed = 0
+    for request in cycle(requests):
+        start = time.perf_counter_ns()
+        if start >= deadline:
+            break
+        try:
+            status = _send(port, request)
+        except OSError:
+            status = 0
+        latencies.append(time.perf_counter_ns() - start)
+        if 400 <= status < 500:
+            rejected += 1
+        elif not 200 <= status < 400:
+            failed += 1
+    return latencies, rejected, failed
+
+
+def drive(
+    pool: Any, port: int, requests: List[Dict[str, Any]], clients: int, duration: float
+) -> Dict[str, Any]:
+    """runs `clients` load generators for `duration` seconds"""
+    deadline = time.perf_counter_ns() + int(duration * 1e9)
+    # clients start at different requests of the corpus
+    jobs = [
+        (port, requests[index:] + requests[:index], deadline)
+        for index in range(clients)
+    ]
+    start = time.perf_counter()
+    results = pool.map(_client, jobs)
+    elapsed = time.perf_counter() - start
+    histogram = Histogram()
+    rejected = failed = 0
+    for latencies, client_rejected, client_failed in results:
+        for latency in latencies:
+            histogram.record(latency)
+        rejected += client_rejected
+        failed += client_failed
+    ok = histogram.count - rejected - failed
+    return {
+        "requests": histogram.count,
+        "rps": histogram.count / elapsed,
+        "ok_rps": ok / elapsed,
+        "rejected_rps": rejected / elapsed,
+        "p50": histogram.percentile(50) / 1e6,
+        "p99": histogram.percentile(99) / 1e6,
+        "rejected": rejected,
+        "failed": failed,
+    }
+
+
+def _numbers(value: str) -> List[int]:
+    return [int(number) for number in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--processes", type=_numbers, default=[1, 2, 4])
+    parser.add_argument("--threads", type=_numbers, default=[1, 4])
+    parser.add_argument(
+        "--clients", type=int, help="concurrent requests (2 per worker thread)"
+    )
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per route")
+    parser.add_argument("--warmup", type=float, default=0.5, help="seconds per route")
+    parser.add_argument("--count", type=int, default=50, help="requests per route")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--invalid", type=float, default=0.0, help="invalid share")
+    parser.add_argument("--json", action="store_true", help="output JSON lines")
+    options = parser.parse_args()
+
+    app = load_example_app()
+    generator = PayloadGenerator(seed=options.seed)
+    corpora: Dict[str, List[Dict[str, Any]]] = {}
+    for request in request_corpus(app, generator, options.count, (), options.invalid):
+        route = f"{request['method']} {request['url'].split('?')[0]}"
+        corpora.setdefault(route, []).append(request)
+
+    if not options.json:
+        print(
+            f"{'processes':>9}{'threads':>8}  {'route':<18}"
+            f"{'req/s':>9}{'2xx/s':>9}{'4xx/s':>9}{'p50':>10}{'p99':>10}{'failed':>8}"
+        )
+    for processes in options.processes:
+        for threads in options.threads:
+            clients = options.clients or 2 * processes * threads
+            port, pids = serve(app, processes, threads)
+            try:
+                with _FORK.Pool(clients) as pool:
+                    for route, requests in corpora.items():
+                        drive(pool, port, requests, clients, options.warmup)
+                        result = drive(pool, port, requests, clients, options.duration)
+                        result.update(
+                            processes=processes,
+                            threads=threads,
+                            clients=clients,
+                            route=route,
+                        )
+                        _report(result, options.json)
+            finally:
+                stop(pids)
+
+
+def _report(result: Dict[str, Any], as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(result), flush=True)
+        return
+    print(
+        f"{result['processes']:>9}{result['threads']:>8}  {result['route']:<18}"
+        f"{result['rps']:>9.0f}{result['ok_rps']:>9.0f}{result['rejected_rps']:>9.0f}"
+        f"{result['p50']:>7.2f} ms{result['p99']:>7.2f} ms{result['failed']:>8}",
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
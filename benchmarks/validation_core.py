@@ -0,0 +1,70 @@
+"""
+Compares validation by the framework independent core with a full request
+dispatched through flask's test client.
+
+    python -m benchmarks.validation_core
+"""
+
+import json
+import timeit
+from typing import List
+
+from flask import Flask
+from pydantic import BaseModel
+from werkzeug.datastructures import ImmutableMultiDict
+
+from flask_pydantic import validate
+from flask_pydantic.spec import RouteSpec
+from flask_pydantic.validation import validate_request
+
+
+class Query(BaseModel):
+    limit: int
+    offset: int = 0
+    tags: List[str] = []
+
+
+class Body(BaseModel):
+    name: str
+    nickname: str
+    age: int
+
+
+def view(item_id: int, query: Query, body: Body):
+    return {"ok": True}
+
+
+BODY = {"name": "Geralt", "nickname": "White Wolf", "age": 95}
+QUERY = ImmutableMultiDict([("limit", "10"), ("tags", "a"), ("tags", "b")])
+
+app = Flask(__name__)
+app.add_url_rule("/items/<item_id>", view_func=validate()(view), methods=["POST"])
+client = app.test_client()
+spec = RouteSpec(view)
+
+
+def core() -> None:
+    validate_request(spec, path_params={"item_id": "1"}, query=QUERY, body=BODY)
+
+
+def core_raw() -> None:
+    validate_request(
+        spec, path_params={"item_id": "1"}, query=QUERY, raw_body=BODY_BYTES
+    )
+
+
+def flask_request() -> None:
+    client.post("/items/1?limit=10&tags=a&tags=b", json=BODY)
+
+
+BODY_BYTES = json.dumps(BODY).encode()
+
+
+if __name__ == "__main__":
+    for name, func, number in (
+        ("core (parsed body)", core, 50_000),
+        ("core (raw body)", core_raw, 50_000),
+        ("flask test client", flask_request, 5_000),
+    ):
+        seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+        print(f"{name:<20} {seconds * 1e6:9.2f} us")
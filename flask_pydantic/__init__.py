@@ -1,3 +1,5 @@
 from .core import validate  # noqa: F401
 from .exceptions import ValidationError  # noqa: F401
+from .extension import FlaskPydantic  # noqa: F401
+from .routing import route  # noqa: F401
 from .version import __version__  # noqa: F401
@@ -0,0 +1,239 @@
+"""
+Allocation tracking of validated routes.
+
+`AllocationTracker` instrument measures memory allocated (by `tracemalloc`) in
+phases of sampled requests: peak and net (still allocated at the end of the
+phase) allocations and allocation sites with the largest net growth, aggregated
+per endpoint and phase. Body validation of `request_body_many` routes is the
+`validate_many_models` phase, serialization is the `make_json_response` phase,
+items of streamed (`request_body_stream`) bodies are validated in the view phase.
+"""
+
+import os
+import threading
+import tracemalloc
+from itertools import count
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Response, jsonify
+
+from .instrumentation import PHASE_BODY, PHASE_SERIALIZATION, PHASE_VIEW, Instrument
+from .spec import RouteSpec
+from .stats import Histogram
+
+DEFAULT_PHASES = (PHASE_BODY, PHASE_VIEW, PHASE_SERIALIZATION)
+# measure 1 in DEFAULT_SAMPLE_RATE requests
+DEFAULT_SAMPLE_RATE = 100
+# files whose allocations are not reported (tracking itself)
+_IGNORED_FILES = (tracemalloc.__file__, __file__)
+# peak of traced memory can be reset since python 3.9
+_RESET_PEAK = getattr(tracemalloc, "reset_peak", None)
+
+
+class PhaseAllocations:
+    """allocations of sampled requests in a phase of an endpoint"""
+
+    __slots__ = ("samples", "peak", "net", "sites")
+
+    def __init__(self):
+        self.samples = 0
+        self.peak = Histogram()
+        # net allocations may be negative (memory freed in the phase)
+        self.net: List[int] = [0, 0, 0]  # sum, min, max
+        # net size and count of allocations by site ("file:line")
+        self.sites: Dict[str, List[int]] = {}
+
+    def record(
+        self, peak: Optional[int], net: int, sites: Iterable[Tuple[str, int, int]]
+    ) -> None:
+        self.samples += 1
+        if peak is not None:
+            self.peak.record(peak)
+        total, low, high = self.net
+        self.net = [
+            total + net,
+            net if self.samples == 1 else min(low, net),
+            net if self.samples == 1 else max(high, net),
+        ]
+        for site, size, allocations in sites:
+            stats = self.sites.setdefault(site, [0, 0])
+            stats[0] += size
+            stats[1] += allocations
+
+    def top_sites(self, limit: int) -> List[Dict[str, Any]]:
+        sites = sorted(self.sites.items(), key=lambda item: -item[1][0])[:limit]
+        return [
+            {"site": site, "size": size, "count": allocations}
+            for site, (size, allocations) in sites
+        ]
+
+    def as_dict(self, sites: int = 10) -> Dict[str, Any]:
+        total, low, high = self.net
+        return {
+            "samples": self.samples,
+            "peak": {
+                "max": self.peak.max,
+                "mean": self.peak.mean,
+                "p50": self.peak.percentile(50),
+                "p99": self.peak.percentile(99),
+            },
+            "net": {
+                "mean": total / self.samples if self.samples else 0.0,
+                "min": low,
+                "max": high,
+            },
+            "sites": self.top_sites(sites),
+        }
+
+
+class _Request:
+    __slots__ = ("endpoint", "started", "phases")
+
+    def __init__(self, endpoint: str, started: bool):
+        self.endpoint = endpoint
+        # whether tracing was started for the request
+        self.started = started
+        self.phases: Dict[str, Tuple[Optional[int], int, list]] = {}
+
+
+class AllocationTracker(Instrument):
+    """
+    Instrument measuring allocations in phases of sampled requests
+
+    Tracing (with `frames` frames of tracebacks) is started for sampled requests
+    only and stopped at their end unless `tracemalloc` was already tracing, other
+    requests don't pay for it. Only one request of the process is measured at a
+    time, but allocations of other threads during its phases are counted as well,
+    so precise numbers need low concurrency. Peaks are measured on python 3.9 and
+    newer only.
+
+    example::
+
+        tracker = AllocationTracker(sample_rate=10)
+        FlaskPydantic(app, instruments=[tracker])
+        app.add_url_rule("/_allocations", view_func=allocations_view(tracker))
+
+    :param sample_rate: measure 1 in `sample_rate` requests of an endpoint
+    :param phases: measured phases
+    :param sites: number of allocation sites of a phase compared in each sample
+        (0 disables comparison of snapshots, which is the expensive part)
+    :param frames: number of frames of traced allocations
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        phases: Iterable[str] = DEFAULT_PHASES,
+        sites: int = 10,
+        frames: int = 1,
+    ):
+        self.sample_rate = sample_rate
+        self.phases = frozenset(phases)
+        self.sites = sites
+        self.frames = frames
+        self._counters: Dict[str, Iterator[int]] = {}
+        self._stats: Dict[str, Dict[str, PhaseAllocations]] = {}
+        self._lock = threading.Lock()
+        # held while a request is measured
+        self._active = threading.Lock()
+
+    def start_request(self, endpoint: str, spec: RouteSpec) -> Optional[_Request]:
+        if self.sample_rate <= 0:
+            return None
+        counter = self._counters.get(endpoint)
+        if counter is None:
+            counter = self._counters.setdefault(endpoint, count())
+        if next(counter) % self.sample_rate or not self._active.acquire(blocking=False):
+            return None
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(self.frames)
+        return _Request(endpoint, started)
+
+    def start_phase(self, state: _Request, phase: str, attributes: dict) -> Any:
+        if phase not in self.phases or not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot() if self.sites else None
+        if _RESET_PEAK is not None:
+            _RESET_PEAK()
+        return tracemalloc.get_traced_memory()[0], snapshot
+
+    def end_phase(
+        self,
+        state: _Request,
+        phase: str,
+        token: Any,
+        attributes: dict,
+        error: Optional[BaseException],
+    ) -> None:
+        if token is None:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        start, snapshot = token
+        sites = []
+        if snapshot is not None:
+            sites = self._compare(snapshot)
+        state.phases[phase] = (
+            peak - start if _RESET_PEAK is not None else None,
+            current - start,
+            sites,
+        )
+
+    def _compare(self, snapshot: tracemalloc.Snapshot) -> List[Tuple[str, int, int]]:
+        differences = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+        sites = []
+        for difference in differences:
+            if difference.size_diff <= 0 or len(sites) == self.sites:
+                break
+            frame = difference.traceback[0]
+            # filtering of traces is slower than skipping of the grouped sites
+            if frame.filename in _IGNORED_FILES:
+                continue
+            sites.append(
+                (
+                    f"{os.path.relpath(frame.filename)}:{frame.lineno}",
+                    difference.size_diff,
+                    difference.count_diff,
+                )
+            )
+        return sites
+
+    def end_request(
+        self, state: _Request, response: Any, errors: Dict[str, list]
+    ) -> None:
+        if state.started:
+            tracemalloc.stop()
+        self._active.release()
+        with self._lock:
+            endpoint_stats = self._stats.setdefault(state.endpoint, {})
+            for phase, (peak, net, sites) in state.phases.items():
+                stats = endpoint_stats.get(phase)
+                if stats is None:
+                    stats = endpoint_stats[phase] = PhaseAllocations()
+                stats.record(peak, net, sites)
+
+    def report(self) -> Dict[str, Any]:
+        """JSON serializable allocations by endpoint and phase (sizes in bytes)"""
+        with self._lock:
+            return {
+                "endpoints": {
+                    endpoint: {
+                        phase: stats.as_dict(self.sites)
+                        for phase, stats in phases.items()
+                    }
+                    for endpoint, phases in sorted(self._stats.items())
+                }
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+
+
+def allocations_view(tracker: AllocationTracker) -> Callable:
+    """creates view responding with allocations of the process as JSON"""
+
+    def flask_pydantic_allocations() -> Response:
+        return jsonify(tracker.report())
+
+    return flask_pydantic_allocations
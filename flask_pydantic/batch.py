@@ -0,0 +1,177 @@
+"""
+Batch endpoint executing many sub-requests of validated routes in one request.
+
+Sub-requests are dispatched in-process (including request hooks and error
+handlers of the application) and validated by models of their routes. Safe
+(GET, HEAD) sub-requests run in parallel in a bounded thread pool, other methods
+are executed one by one in the order of the batch.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from flask import Flask, Response, current_app, request
+from pydantic import BaseModel, Field, create_model
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+
+from .core import validate
+from .spec import get_route_spec
+
+SAFE_METHODS = frozenset({"GET", "HEAD"})
+# headers of the batch request which are not passed to sub-requests
+_SKIPPED_HEADERS = frozenset({"content-type", "content-length"})
+_BATCH_ATTRIBUTE = "__flask_pydantic_batch__"
+
+
+class SubRequest(BaseModel):
+    """request of a batch"""
+
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    query: Dict[str, Union[str, List[str]]] = {}
+    body: Any = None
+    headers: Dict[str, str] = {}
+
+
+def _environ(sub: SubRequest, headers: Dict[str, str]) -> dict:
+    """
+    :raises ValueError: if the sub-request is malformed (e. g. query string both
+        in the path and in `query`)
+    """
+    kwargs = {} if sub.body is None else {"json": sub.body}
+    builder = EnvironBuilder(
+        path=sub.path,
+        method=sub.method.upper(),
+        # query string may be a part of the path
+        query_string=sub.query or None,
+        headers={**headers, **sub.headers},
+        environ_base={"REMOTE_ADDR": request.remote_addr},
+        **kwargs,
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+
+def _error(status: int, detail: str) -> Dict[str, Any]:
+    return {"status": status, "body": {"detail": detail}}
+
+
+def _body(response: Response) -> Any:
+    """JSON of the response, its text if it isn't JSON (None if empty)"""
+    text = response.get_data(as_text=True)
+    if not text:
+        return None
+    if response.is_json:
+        data = response.get_json(silent=True)
+        if data is not None or text.strip() == "null":
+            return data
+    return text
+
+
+def _dispatch(app: Flask, environ: dict) -> Dict[str, Any]:
+    """
+    dispatches sub-request to validated route, returns its status and body
+    (error 500 if the sub-request fails outside of the application's handlers)
+    """
+    try:
+        return _dispatch_request(app, environ)
+    except Exception:
+        app.logger.exception("Sub-request of a batch failed.")
+        return _error(500, "Internal Server Error")
+
+
+def _dispatch_request(app: Flask, environ: dict) -> Dict[str, Any]:
+    with app.request_context(environ) as ctx:
+        try:
+            endpoint, _ = ctx.url_adapter.match(return_rule=False)
+        except HTTPException as e:
+            return _error(e.code, e.description)
+        view = app.view_functions.get(endpoint)
+        if get_route_spec(view) is None or getattr(view, _BATCH_ATTRIBUTE, False):
+            return _error(404, "Only validated routes can be requested in a batch.")
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            response = app.make_response(app.handle_exception(e))
+        return {"status": response.status_code, "body": _body(response)}
+
+
+def _run(
+    app: Flask,
+    environs: List[Optional[dict]],
+    results: List[Any],
+    methods: List[str],
+    pool: ThreadPoolExecutor,
+) -> List[dict]:
+    """dispatches sub-requests with environ, others have results already"""
+    pending = []
+    for index, (environ, method) in enumerate(zip(environs, methods)):
+        if environ is None:
+            continue
+        if method in SAFE_METHODS:
+            pending.append((index, pool.submit(_dispatch, app, environ)))
+            continue
+        # unsafe sub-request waits for the preceding ones
+        for pending_index, future in pending:
+            results[pending_index] = future.result()
+        pending = []
+        results[index] = _dispatch(app, environ)
+    for pending_index, future in pending:
+        results[pending_index] = future.result()
+    return results
+
+
+def batch_view(max_workers: int = 8, max_requests: int = 50) -> Callable:
+    """
+    creates view of batch endpoint
+
+    The endpoint accepts JSON body `{"requests": [{"id": ..., "method": "GET",
+    "path": "/items/1", "query": {...}, "body": ..., "headers": {...}}, ...]}`
+    and responds with `{"responses": [{"id": ..., "status": 200, "body": ...}]}`.
+    Headers of the batch request (e. g. `Authorization`) are passed to
+    sub-requests.
+
+    example::
+
+        app.add_url_rule("/batch", view_func=batch_view(), methods=["POST"])
+
+    :param max_workers: number of threads executing safe sub-requests in parallel
+    :param max_requests: maximal number of sub-requests in a batch
+    """
+    pool = ThreadPoolExecutor(max_workers, thread_name_prefix="flask-pydantic-batch")
+    batch_model = create_model(
+        "BatchRequest",
+        requests=(List[SubRequest], Field(min_length=1, max_length=max_requests)),
+    )
+
+    @validate()
+    def batch(body: batch_model) -> Response:
+        app = current_app._get_current_object()
+        headers = {
+            name: value
+            for name, value in request.headers.items()
+            if name.lower() not in _SKIPPED_HEADERS
+        }
+        subs = body.requests
+        environs: List[Optional[dict]] = []
+        results: List[Any] = [None] * len(subs)
+        for index, sub in enumerate(subs):
+            try:
+                environs.append(_environ(sub, headers))
+            except ValueError as e:
+                environs.append(None)
+                results[index] = _error(400, str(e))
+        methods = [sub.method.upper() for sub in subs]
+        results = _run(app, environs, results, methods, pool)
+        responses = [{"id": sub.id, **result} for sub, result in zip(subs, results)]
+        return current_app.response_class(
+            json.dumps({"responses": responses}), mimetype="application/json"
+        )
+
+    setattr(batch, _BATCH_ATTRIBUTE, True)
+    return batch
@@ -0,0 +1,233 @@
+"""
+Caches of validated request parameters and memo of serialized response models.
+
+Validated models are returned from the cache as they are (not copied), so only
+immutable models (frozen, with immutable fields) can be cached. Caches of
+routes with mutable models are disabled when the route is decorated.
+"""
+
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import is_dataclass
+from datetime import date, time as time_of_day, timedelta
+from decimal import Decimal
+from enum import Enum
+from functools import partial
+from pathlib import PurePath
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple, Union
+from uuid import UUID
+
+try:
+    from typing import Annotated, Literal, get_args, get_origin
+except ImportError:
+    from typing_extensions import Annotated, Literal, get_args, get_origin
+
+from pydantic import BaseModel
+
+from .converters import field_annotations
+
+_MISSING = object()
+
+
+class CacheStats(NamedTuple):
+    """counters of a cache"""
+
+    hits: int
+    misses: int
+    size: int
+    maxsize: Optional[int] = None
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**self._asdict(), "hit_rate": self.hit_rate}
+
+
+class LRUCache:
+    """
+    Thread safe least recently used cache with bounded size
+
+    :param maxsize: maximal number of cached entries
+    :param ttl: time (in seconds) after which entries expire, entries don't expire
+        if not given
+    :param timer: clock used to expire entries
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize < 1:
+            raise ValueError("Cache size must be a positive number.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<LRUCache {len(self._data)}/{self.maxsize}>"
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """returns cached value of the key (`default` if it is missing or expired)"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires = entry
+                if expires is None or expires > self.timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """stores the value, least recently used entry is evicted if cache is full"""
+        expires = None if self.ttl is None else self.timer() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """removes all entries and resets counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, len(self._data), self.maxsize)
+
+
+def digest(data: bytes) -> bytes:
+    """fast 128 bit hash of raw request data (cache key)"""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# field types whose values are immutable
+_IMMUTABLE_TYPES = (
+    str,
+    bytes,
+    int,
+    float,
+    complex,
+    Decimal,
+    date,
+    time_of_day,
+    timedelta,
+    UUID,
+    Enum,
+    PurePath,
+    type(None),
+)
+
+
+def is_frozen(type_: Any, _seen: Tuple[type, ...] = ()) -> bool:
+    """
+    whether instances of the type are immutable: frozen models and dataclasses
+    whose fields are immutable too (scalars, tuples, frozensets, frozen models)
+    """
+    origin = get_origin(type_)
+    if origin is Annotated:
+        return is_frozen(get_args(type_)[0], _seen)
+    if origin is Literal:
+        return True
+    if origin in (Union, tuple, frozenset):
+        args = [arg for arg in get_args(type_) if arg is not Ellipsis]
+        return bool(args) and all(is_frozen(arg, _seen) for arg in args)
+    if not isinstance(type_, type):
+        return False
+    if type_ in _seen:
+        # recursive model, frozen unless other fields are mutable
+        return True
+    if issubclass(type_, BaseModel):
+        if not type_.model_config.get("frozen"):
+            return False
+    elif is_dataclass(type_):
+        if not type_.__dataclass_params__.frozen:
+            return False
+    else:
+        return issubclass(type_, _IMMUTABLE_TYPES)
+    return all(
+        is_frozen(field_type, (*_seen, type_))
+        for field_type in field_annotations(type_).values()
+    )
+
+
+class SerializationMemo:
+    """
+    Memo of JSON serialization of frozen models keyed by identity of the model
+
+    Entries are kept only as long as the model is alive (they are dropped by weak
+    reference callbacks), so long-lived models (e. g. reference data returned by
+    many requests) are serialized once per combination of `by_alias` and
+    `exclude_none`. Other models are serialized as usual.
+    """
+
+    def __init__(self):
+        self.hits = self.misses = 0
+        self._entries: Dict[int, Tuple[weakref.ref, Dict[Tuple[bool, bool], str]]] = {}
+        # weak reference callbacks may run (garbage collection) while it is held
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def dump_json(
+        self, model: BaseModel, by_alias: bool = False, exclude_none: bool = False
+    ) -> str:
+        """JSON of the model, memoized for frozen models"""
+        if not type(model).model_config.get("frozen"):
+            return model.model_dump_json(by_alias=by_alias, exclude_none=exclude_none)
+        key, options = id(model), (by_alias, exclude_none)
+        # lookups of hot entries don't take the lock (counters are approximate)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0]() is model:
+            js = entry[1].get(options)
+            if js is not None:
+                self.hits += 1
+                return js
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0]() is not model:
+                entry = (weakref.ref(model, partial(self._remove, key)), {})
+                self._entries[key] = entry
+            self.misses += 1
+        js = entry[1][options] = model.model_dump_json(
+            by_alias=by_alias, exclude_none=exclude_none
+        )
+        return js
+
+    def _remove(self, key: int, ref: weakref.ref) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, len(self._entries))
+
+
+# shared by all routes with `validate(response_memo=True)`
+serialization_memo = SerializationMemo()
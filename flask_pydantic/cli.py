@@ -0,0 +1,155 @@
+import json
+from typing import Optional, Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .payloads import PayloadGenerator, request_corpus
+from .registry import validated_routes
+from .stats import PHASE_TOTAL, EndpointStats, Histogram, app_stats, load_stats, report
+
+cli = AppGroup("pydantic", help="Flask-Pydantic commands.")
+
+
+@cli.command("routes")
+@click.option("--json", "as_json", is_flag=True, help="Output routes as JSON.")
+def routes_command(as_json: bool) -> None:
+    """Show routes validated by flask-pydantic."""
+    routes = sorted(validated_routes(current_app), key=lambda r: r.endpoint)
+    if as_json:
+        click.echo(json.dumps([route.describe() for route in routes], indent=2))
+        return
+    if not routes:
+        click.echo("No validated routes.")
+        return
+    for route in routes:
+        info = route.describe()
+        click.echo(
+            f"{route.endpoint} [{', '.join(route.methods)}] {', '.join(route.rules)}"
+        )
+        for source in ("query", "body", "form", "response"):
+            if info[source]:
+                click.echo(f"    {source}: {info[source]}")
+        for name, type_ in info["path"].items():
+            click.echo(f"    path {name}: {type_}")
+        options = ", ".join(
+            f"{name}={value}" for name, value in info["options"].items()
+        )
+        click.echo(f"    options: {options}")
+        click.echo(f"    built: {_built(info['build_time'])}")
+        for source, stats in info["caches"].items():
+            click.echo(
+                f"    {source} cache: {stats['size']}/{stats['maxsize']} entries, "
+                f"{stats['hits']} hits, {stats['misses']} misses"
+            )
+
+
+def _built(build_time) -> str:
+    if build_time is None:
+        return "no"
+    return f"yes ({build_time * 1000:.2f} ms)"
+
+
+@cli.command("stats")
+@click.option("--json", "as_json", is_flag=True, help="Output statistics as JSON.")
+@click.option(
+    "--dir",
+    "directory",
+    type=click.Path(exists=True, file_okay=False),
+    help="Directory with statistics written by worker processes.",
+)
+@click.option(
+    "--max-age",
+    type=float,
+    help="Skip (and remove) statistics files not written to for given seconds.",
+)
+def stats_command(as_json: bool, directory: str, max_age: Optional[float]) -> None:
+    """Show performance statistics of validated routes."""
+    perf_stats = app_stats(current_app)
+    if directory is not None:
+        stats = load_stats(directory, max_age=max_age)
+    elif perf_stats is not None:
+        stats = perf_stats.collect()
+    else:
+        stats = {}
+    if as_json:
+        click.echo(json.dumps(report(stats), indent=2))
+        return
+    if not stats:
+        click.echo("No statistics.")
+        return
+    # endpoints with the longest total time first
+    for endpoint, endpoint_stats in sorted(
+        stats.items(), key=lambda item: -item[1].phases[PHASE_TOTAL].total
+    ):
+        _echo_stats(endpoint, endpoint_stats)
+
+
+@cli.command("payloads")
+@click.argument("endpoints", nargs=-1)
+@click.option("--count", default=10, show_default=True, help="Requests per endpoint.")
+@click.option("--seed", default=0, show_default=True, help="Seed of the generator.")
+@click.option(
+    "--invalid",
+    "invalid_ratio",
+    default=0.0,
+    show_default=True,
+    help="Share of requests with an invalid payload.",
+)
+@click.option("--list-length", default=3, show_default=True, help="Length of arrays.")
+@click.option(
+    "--string-length", default=8, show_default=True, help="Length of strings."
+)
+@click.option(
+    "--max-depth", default=4, show_default=True, help="Maximal nesting of objects."
+)
+def payloads_command(
+    endpoints: Tuple[str, ...],
+    count: int,
+    seed: int,
+    invalid_ratio: float,
+    list_length: int,
+    string_length: int,
+    max_depth: int,
+) -> None:
+    """Emit generated requests of validated routes as JSON lines."""
+    generator = PayloadGenerator(
+        seed=seed,
+        list_length=list_length,
+        string_length=string_length,
+        max_depth=max_depth,
+    )
+    corpus = request_corpus(current_app, generator, count, endpoints, invalid_ratio)
+    for request in corpus:
+        click.echo(json.dumps(request))
+
+
+def _latency(histogram: Histogram) -> str:
+    values = [
+        f"p{percent} {histogram.percentile(percent) / 1e6:.3f} ms"
+        for percent in (50, 90, 99)
+    ]
+    return ", ".join([*values, f"max {histogram.max / 1e6:.3f} ms"])
+
+
+def _size(histogram: Histogram) -> str:
+    return ", ".join(
+        f"p{percent} {histogram.percentile(percent)} B" for percent in (50, 99)
+    )
+
+
+def _echo_stats(endpoint: str, stats: EndpointStats) -> None:
+    click.echo(f"{endpoint}: {stats.requests} requests")
+    for phase, histogram in stats.phases.items():
+        model = stats.models.get(phase)
+        name = f"{phase} ({model})" if model else phase
+        click.echo(f"    {name}: {_latency(histogram)}")
+    if stats.request_bytes.count:
+        click.echo(f"    request size: {_size(stats.request_bytes)}")
+    if stats.response_bytes.count:
+        click.echo(f"    response size: {_size(stats.response_bytes)}")
+    for source, rate in stats.error_rates().items():
+        click.echo(f"    {source} errors: {rate:.2%}")
+    for source, cache in stats.caches.items():
+        click.echo(f"    {source} cache: {cache['hit_rate']:.2%} hits")
@@ -1,26 +1,74 @@
-from typing import Type, Union
+from dataclasses import is_dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Type, Union, get_type_hints
 
 try:
     from typing import get_args, get_origin
 except ImportError:
     from typing_extensions import get_args, get_origin
 
+from typing_extensions import is_typeddict
+
 from pydantic import BaseModel
-from werkzeug.datastructures import ImmutableMultiDict
+from werkzeug.datastructures import ImmutableMultiDict, MultiDict
+
+SEQUENCE_TYPES = (list, tuple, set, frozenset)
 
 
 def _is_list(type_: Type) -> bool:
     origin = get_origin(type_)
-    if origin is list:
+    if origin in SEQUENCE_TYPES:
         return True
     if origin is Union:
         return any(_is_list(t) for t in get_args(type_))
     return False
 
 
-def convert_query_params(
-    query_params: ImmutableMultiDict, model: Type[BaseModel]
-) -> dict:
+def field_annotations(model: Any) -> Dict[str, Any]:
+    """
+    annotations of fields of a pydantic model, dataclass or TypedDict
+
+    Empty dictionary is returned for other types.
+    """
+    if isinstance(model, type) and issubclass(model, BaseModel):
+        return {name: field.annotation for name, field in model.model_fields.items()}
+    if is_dataclass(model) or is_typeddict(model):
+        try:
+            return get_type_hints(model)
+        except (NameError, TypeError):
+            return dict(getattr(model, "__annotations__", {}))
+    return {}
+
+
+@lru_cache(maxsize=None)
+def list_fields(model: Any) -> FrozenSet[str]:
+    """names (and aliases) of model fields annotated as lists, tuples or sets"""
+    names = {
+        name for name, type_ in field_annotations(model).items() if _is_list(type_)
+    }
+    if isinstance(model, type) and issubclass(model, BaseModel):
+        names.update(
+            field.alias
+            for name, field in model.model_fields.items()
+            if name in names and field.alias
+        )
+    return frozenset(names)
+
+
+def convert_multi_dict(content: MultiDict, list_keys: FrozenSet[str]) -> dict:
+    """
+    converts `MultiDict` (query or form parameters) to dictionary in a single pass
+
+    All values of keys in `list_keys` are kept as lists, only the first value is
+    kept for other keys.
+    """
+    return {
+        key: values if key in list_keys else values[0]
+        for key, values in content.lists()
+    }
+
+
+def convert_query_params(query_params: ImmutableMultiDict, model: Any) -> dict:
     """
     group query parameters into lists if model defines them
 
@@ -28,12 +76,4 @@ def convert_query_params(
     :param model: query parameter's model
     :return: resulting parameters
     """
-    return {
-        **query_params.to_dict(),
-        **{
-            key: value
-            for key, value in query_params.to_dict(flat=False).items()
-            if key in model.model_fields
-            and _is_list(model.model_fields[key].annotation)
-        },
-    }
+    return convert_multi_dict(query_params, list_fields(model))
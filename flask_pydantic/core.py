@@ -1,16 +1,55 @@
-from functools import wraps
-from typing import Any, Callable, Iterable, List, Optional, Tuple, Type, Union
+from functools import partial, wraps
+from typing import Any, Callable, Iterable, Optional, Sized, Type, Union
 
-from flask import Response, current_app, jsonify, make_response, request
-from pydantic import BaseModel, ValidationError, TypeAdapter, RootModel
+from flask import Flask, Request, Response, current_app, jsonify, make_response, request
+from pydantic import BaseModel
 
-from .converters import convert_query_params
+from .cache import digest, serialization_memo
+from .converters import convert_query_params  # noqa: F401
 from .exceptions import (
     InvalidIterableOfModelsException,
-    JsonBodyParsingError,
     ManyModelValidationError,
+    UnsupportedMediaTypeError,
+    UploadTooLargeError,
 )
 from .exceptions import ValidationError as FailedValidation
+from .extension import EXTENSION_NAME
+from .formats import (
+    DEFAULT_FORMAT_PARAM,
+    FORMAT_ARROW,
+    FORMAT_COLUMNAR,
+    FORMAT_CSV,
+    FORMAT_JSON,
+    MEDIA_TYPES,
+    check_body_formats,
+    check_formats,
+    dump_arrow,
+    dump_columnar,
+    dump_parquet,
+    iter_csv,
+    negotiate_format,
+    tabular_schema,
+)
+from .instrumentation import (
+    PHASE_SERIALIZATION,
+    PHASE_VIEW,
+    RequestTrace,
+    start_trace,
+)
+from .registry import register
+from .response_cache import CachedResponse, SharedResponseCache
+from .routing import converted_path_params
+from .singleflight import SharedResponse, singleflight_key
+from .spec import SPEC_ATTRIBUTE, RouteSpec, type_name
+from .uploads import upload_error
+from .validation import (  # noqa: F401
+    validate_json_model,
+    validate_many_models,
+    validate_model,
+    validate_path_params,
+    validate_request,
+    validate_string_model,
+)
 
 try:
     from flask_restful import original_flask_make_response as make_response
@@ -24,9 +63,23 @@ def make_json_response(
     by_alias: bool,
     exclude_none: bool = False,
     many: bool = False,
+    memo: bool = False,
 ) -> Response:
-    """serializes model, creates JSON response with given status code"""
-    if many:
+    """
+    serializes model, creates JSON response with given status code
+
+    :param memo: whether JSON of frozen models is memoized (see `SerializationMemo`)
+    """
+    if memo:
+        dump = partial(
+            serialization_memo.dump_json, by_alias=by_alias, exclude_none=exclude_none
+        )
+        js = (
+            f"[{', '.join([dump(model) for model in content])}]"
+            if many
+            else dump(content)
+        )
+    elif many:
         js = f"[{', '.join([model.model_dump_json(exclude_none=exclude_none, by_alias=by_alias) for model in content])}]"
     else:
         js = content.model_dump_json(exclude_none=exclude_none, by_alias=by_alias)
@@ -35,6 +88,115 @@ def make_json_response(
     return response
 
 
+def make_columnar_response(
+    content: Iterable[BaseModel],
+    status_code: int,
+    by_alias: bool,
+    model: Optional[Type[BaseModel]] = None,
+) -> Response:
+    """serializes models to columnar JSON, creates response with given status code"""
+    try:
+        js = dump_columnar(content, by_alias=by_alias, model=model)
+    except TypeError:
+        raise InvalidIterableOfModelsException(content)
+    response = make_response(js, status_code)
+    response.mimetype = "application/json"
+    return response
+
+
+def make_tabular_response(
+    content: Iterable[BaseModel],
+    response_format: str,
+    status_code: int,
+    by_alias: bool,
+    model: Optional[Type[BaseModel]] = None,
+) -> Response:
+    """
+    serializes models to CSV (streamed), Arrow IPC stream or Parquet file, creates
+    response with given status code
+    """
+    try:
+        schema = tabular_schema(content, by_alias=by_alias, model=model)
+    except TypeError:
+        raise InvalidIterableOfModelsException(content)
+    if response_format == FORMAT_CSV:
+        data = iter_csv(schema, content)
+    elif response_format == FORMAT_ARROW:
+        data = dump_arrow(schema, content)
+    else:
+        data = dump_parquet(schema, content)
+    response = make_response(data, status_code)
+    response.mimetype = MEDIA_TYPES[response_format]
+    return response
+
+
+def not_acceptable_response(formats: Iterable[str]) -> Response:
+    body = {
+        "detail": "Requested response format is not available. "
+        f"Available formats: {', '.join(formats)}."
+    }
+    return make_response(jsonify(body), 406)
+
+
+def response_cache_key(*parts: str) -> bytes:
+    """key of a cached response (digest of route name, full path, ...)"""
+    return digest("\0".join(parts).encode())
+
+
+def cached_response(cached: CachedResponse, vary_accept: bool = False) -> Response:
+    response = make_response(cached.body, cached.status)
+    response.content_type = cached.content_type
+    if vary_accept:
+        response.vary.add("Accept")
+    return response
+
+
+# request headers the response may depend on by default (credentials of the user)
+DEFAULT_VARY_HEADERS = ("Authorization", "Cookie")
+
+# headers of responses which can be restored from the response cache
+CACHEABLE_HEADERS = frozenset({"Content-Type", "Content-Length", "Vary"})
+
+
+def store_response(
+    cache: SharedResponseCache, key: bytes, response: Response, ttl: Optional[float]
+) -> bool:
+    """
+    stores successful response in the cache (streamed responses and responses
+    with custom headers are not cached)
+    """
+    if (
+        not 200 <= response.status_code < 300
+        or response.is_streamed
+        or not CACHEABLE_HEADERS.issuperset(response.headers.keys())
+    ):
+        return False
+    cached = CachedResponse(
+        response.status_code, response.content_type or "", response.get_data()
+    )
+    return cache.set(key, cached, ttl)
+
+
+# maximal time (in seconds) coalesced requests wait for the first one
+DEFAULT_SINGLEFLIGHT_TIMEOUT = 30.0
+
+
+def shared_response(response: Any) -> Optional[SharedResponse]:
+    """
+    serialized copy of response for coalesced requests (None if streamed or with
+    custom headers, e. g. `Set-Cookie` of the first request)
+    """
+    if (
+        not isinstance(response, Response)
+        or response.is_streamed
+        or not CACHEABLE_HEADERS.issuperset(response.headers.keys())
+    ):
+        return None
+    return SharedResponse(
+        response.status_code, list(response.headers.items()), response.get_data()
+    )
+
+
 def unsupported_media_type_response(request_cont_type: str) -> Response:
     body = {
         "detail": f"Unsupported media type '{request_cont_type}' in request. "
@@ -50,57 +212,65 @@ def is_iterable_of_models(content: Any) -> bool:
         return False
 
 
-def validate_many_models(model: Type[BaseModel], content: Any) -> List[BaseModel]:
-    try:
-        return [model(**fields) for fields in content]
-    except TypeError:
-        # iteration through `content` fails
-        err = [
-            {
-                "loc": ["root"],
-                "msg": "is not an array of objects",
-                "type": "type_error.array",
-            }
-        ]
-        raise ManyModelValidationError(err)
-    except ValidationError as ve:
-        raise ManyModelValidationError(ve.errors())
-
-
-def validate_path_params(func: Callable, kwargs: dict) -> Tuple[dict, list]:
-    errors = []
-    validated = {}
-    for name, type_ in func.__annotations__.items():
-        if name in {"query", "body", "form", "return"}:
-            continue
-        try:
-            adapter = TypeAdapter(type_)
-            validated[name] = adapter.validate_python(kwargs.get(name))
-        except ValidationError as e:
-            err = e.errors()[0]
-            err["loc"] = [name]
-            errors.append(err)
-    kwargs = {**kwargs, **validated}
-    return kwargs, errors
+def validation_error_response(errors: dict, app: Optional[Flask] = None) -> Response:
+    config = (app or current_app).config
+    if config.get("FLASK_PYDANTIC_VALIDATION_ERROR_RAISE", False):
+        raise FailedValidation(**errors)
+    status_code = config.get("FLASK_PYDANTIC_VALIDATION_ERROR_STATUS_CODE", 400)
+    return make_response(jsonify({"validation_error": errors}), status_code)
+
+
+def get_body_bytes(**params) -> Optional[bytes]:
+    """raw JSON request body (None if the request doesn't contain JSON)"""
+    return _get_body_bytes(request, params)
 
 
 def get_body_dict(**params):
-    data = request.get_json(**params)
+    return _get_body_dict(request, params)
+
+
+def _get_body_bytes(req: Request, params: dict) -> Optional[bytes]:
+    if params.get("force") or req.is_json:
+        data = req.get_data(cache=True)
+        if data or not params.get("silent"):
+            return data
+    if params.get("silent"):
+        return b"{}"
+    return None
+
+
+def _get_body_dict(req: Request, params: dict):
+    data = req.get_json(**params)
     if data is None and params.get("silent"):
         return {}
     return data
 
 
 def validate(
-    body: Optional[Type[BaseModel]] = None,
-    query: Optional[Type[BaseModel]] = None,
+    body: Optional[Any] = None,
+    query: Optional[Any] = None,
     on_success_status: int = 200,
     exclude_none: bool = False,
     response_many: bool = False,
     request_body_many: bool = False,
     response_by_alias: bool = False,
     get_json_params: Optional[dict] = None,
-    form: Optional[Type[BaseModel]] = None,
+    form: Optional[Any] = None,
+    strict: Optional[bool] = None,
+    response_formats: Optional[Iterable[str]] = None,
+    request_body_stream: bool = False,
+    request_body_batch_size: Optional[int] = None,
+    response_memo: bool = False,
+    query_style: Optional[str] = None,
+    query_delimiter: Optional[str] = None,
+    query_cache: Optional[int] = None,
+    body_cache: Optional[int] = None,
+    body_cache_ttl: Optional[float] = None,
+    response_cache: Optional[SharedResponseCache] = None,
+    response_cache_ttl: Optional[float] = None,
+    singleflight: bool = False,
+    body_formats: Optional[Iterable[str]] = None,
+    vary_headers: Iterable[str] = DEFAULT_VARY_HEADERS,
 ):
     """
     Decorator for route methods which will validate query, body and form parameters
@@ -114,14 +284,69 @@ def validate(
 
     Or directly as `kwargs`, if you define them in the decorated function.
 
+    Besides pydantic models, parameters can be described by any type supported by
+    pydantic's `TypeAdapter` (e. g. `TypedDict` or dataclass), validated parameters
+    are then plain dictionaries (or dataclass instances) which are cheaper to
+    create than model instances.
+
     `exclude_none` whether to remove None fields from response
     `response_many` whether content of response consists of many objects
         (e. g. List[BaseModel]). Resulting response will be an array of serialized
         models.
     `request_body_many` whether response body contains array of given model
-        (request.body_params then contains list of models i. e. List[BaseModel])
+        (request.body_params then contains list of models i. e. List[BaseModel]).
+    `request_body_stream` whether `request_body_many` items are validated lazily
+        while they are read from the request stream (JSON array is parsed
+        incrementally), request.body_params is then an iterator of models, which
+        raises `ManyModelValidationError` when an invalid item is reached
+        (converted to validation error response if not handled by the route)
+    `request_body_batch_size` validate `request_body_many` items in batches of
+        given size (request.body_params then yields lists of models when
+        `request_body_stream` is set)
+    `query_style` `flat` (default) or `deep`, which fills fields of nested
+        query models (models, dataclasses, TypedDicts and dicts) from parameters
+        in bracket notation, e. g. `filter[created][gte]=2024-01-01`, keys which
+        don't match fields of nested models are rejected
+    `query_delimiter` if given, values of list fields of the query model are
+        split by it too, e. g. `sort=-created,id` for `","`
+    `query_cache` size of LRU cache of validated query models keyed by raw query
+        string, the query model has to be frozen with immutable fields (the
+        cache is disabled with a warning otherwise)
+    `body_cache` size of LRU cache of validated body models keyed by hash of raw
+        request body (duplicate deliveries skip JSON parsing and validation), the
+        body model has to be frozen with immutable fields
+    `body_cache_ttl` time in seconds after which cached bodies expire
+    `response_cache` cache (`SharedResponseCache`) of successful responses of GET
+        requests keyed by the route, full path of the request and `vary_headers`
+        (and `Accept` header if `response_formats` are set), cached responses are
+        returned without validation and calling the route
+    `response_cache_ttl` time in seconds after which cached responses expire,
+        defaults to ttl of the cache
+    `singleflight` whether identical concurrent GET requests (equal validated
+        path and query parameters and `vary_headers`) are coalesced, the route is
+        called by the first one, the others wait and receive copy of its response
+        (responses with custom headers aren't shared)
     `response_by_alias` whether Pydantic's alias is used
+    `response_memo` whether JSON of frozen response models (and frozen items of
+        `response_many` responses) is memoized as long as the model instance is
+        alive, for routes returning long-lived models
     `get_json_params` - parameters to be passed to Request.get_json() function
+    `strict` whether to validate parameters in pydantic's strict mode (no type
+        coercion of body values, query, form and path parameters are validated in
+        pydantic's string mode, models with list fields in lax mode with
+        a warning), defaults to `FLASK_PYDANTIC_STRICT` config value
+    `response_formats` formats of `response_many` response the client can choose
+        from by `format` query parameter or `Accept` header, e. g.
+        `("json", "columnar", "csv")`. Supported formats are `json`, `columnar`
+        (JSON with list of columns and rows), `csv`, `arrow` and `parquet` (the
+        last two require `pyarrow` package)
+    `body_formats` formats of `request_body_many` request body accepted besides
+        JSON, `("csv",)` lets rows of `text/csv` body be validated against the
+        model (body of other media types is rejected by default)
+    `vary_headers` request headers whose values are part of `response_cache`
+        and `singleflight` keys, `Authorization` and `Cookie` by default so that
+        responses of one user aren't returned to others, `()` if the responses
+        are public
 
     example::
 
@@ -162,103 +387,73 @@ def validate(
     -> that will render JSON response with serialized MyModel instance
     """
 
+    formats = check_formats(response_formats or ())
+    body_formats = check_body_formats(body_formats or ())
+    csv_body = FORMAT_CSV in body_formats
+    vary_headers = tuple(vary_headers)
+
     def decorate(func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            q, b, f, err = None, None, None, {}
-            kwargs, path_err = validate_path_params(func, kwargs)
-            if path_err:
-                err["path_params"] = path_err
-            query_in_kwargs = func.__annotations__.get("query")
-            query_model = query_in_kwargs or query
-            if query_model:
-                query_params = convert_query_params(request.args, query_model)
-                try:
-                    q = query_model(**query_params)
-                except ValidationError as ve:
-                    err["query_params"] = ve.errors()
-            body_in_kwargs = func.__annotations__.get("body")
-            body_model = body_in_kwargs or body
-            if body_model:
-                body_params = get_body_dict(**(get_json_params or {}))
-                if issubclass(body_model, RootModel):
-                    try:
-                        b = body_model(body_params)
-                    except ValidationError as ve:
-                        err["body_params"] = ve.errors()
-                elif request_body_many:
-                    try:
-                        b = validate_many_models(body_model, body_params)
-                    except ManyModelValidationError as e:
-                        err["body_params"] = e.errors()
-                else:
-                    try:
-                        b = body_model(**body_params)
-                    except TypeError:
-                        content_type = request.headers.get("Content-Type", "").lower()
-                        media_type = content_type.split(";")[0]
-                        if media_type != "application/json":
-                            return unsupported_media_type_response(content_type)
-                        else:
-                            raise JsonBodyParsingError()
-                    except ValidationError as ve:
-                        err["body_params"] = ve.errors()
-            form_in_kwargs = func.__annotations__.get("form")
-            form_model = form_in_kwargs or form
-            if form_model:
-                form_params = request.form
-                if issubclass(form_model, RootModel):
-                    try:
-                        f = form_model(form_params)
-                    except ValidationError as ve:
-                        err["form_params"] = ve.errors()
-                else:
-                    try:
-                        f = form_model(**form_params)
-                    except TypeError:
-                        content_type = request.headers.get("Content-Type", "").lower()
-                        media_type = content_type.split(";")[0]
-                        if media_type != "multipart/form-data":
-                            return unsupported_media_type_response(content_type)
-                        else:
-                            raise JsonBodyParsingError
-                    except ValidationError as ve:
-                        err["form_params"] = ve.errors()
-            request.query_params = q
-            request.body_params = b
-            request.form_params = f
-            if query_in_kwargs:
-                kwargs["query"] = q
-            if body_in_kwargs:
-                kwargs["body"] = b
-            if form_in_kwargs:
-                kwargs["form"] = f
-
-            if err:
-                if current_app.config.get(
-                    "FLASK_PYDANTIC_VALIDATION_ERROR_RAISE", False
-                ):
-                    raise FailedValidation(**err)
-                else:
-                    status_code = current_app.config.get(
-                        "FLASK_PYDANTIC_VALIDATION_ERROR_STATUS_CODE", 400
+        spec = RouteSpec(
+            func,
+            body=body,
+            query=query,
+            form=form,
+            on_success_status=on_success_status,
+            exclude_none=exclude_none,
+            response_many=response_many,
+            request_body_many=request_body_many,
+            response_by_alias=response_by_alias,
+            response_memo=response_memo,
+            get_json_params=get_json_params,
+            strict=strict,
+            response_formats=formats or None,
+            request_body_stream=request_body_stream,
+            request_body_batch_size=request_body_batch_size,
+            query_style=query_style,
+            query_delimiter=query_delimiter,
+            query_cache=query_cache,
+            body_cache=body_cache,
+            body_cache_ttl=body_cache_ttl,
+            response_cache=response_cache,
+            response_cache_ttl=response_cache_ttl,
+            singleflight=singleflight,
+            body_formats=body_formats or None,
+            vary_headers=(
+                vary_headers if response_cache is not None or singleflight else None
+            ),
+        )
+
+        def serialize(res: Any, response_format: str) -> Any:
+            if response_many:
+                if not is_iterable_of_models(res):
+                    raise InvalidIterableOfModelsException(res)
+                if response_format == FORMAT_COLUMNAR:
+                    response = make_columnar_response(
+                        res,
+                        on_success_status,
+                        by_alias=response_by_alias,
+                        model=spec.response_model,
                     )
-                    return make_response(
-                        jsonify({"validation_error": err}), status_code
+                elif response_format != FORMAT_JSON:
+                    response = make_tabular_response(
+                        res,
+                        response_format,
+                        on_success_status,
+                        by_alias=response_by_alias,
+                        model=spec.response_model,
                     )
-            res = func(*args, **kwargs)
-
-            if response_many:
-                if is_iterable_of_models(res):
-                    return make_json_response(
+                else:
+                    response = make_json_response(
                         res,
                         on_success_status,
                         by_alias=response_by_alias,
                         exclude_none=exclude_none,
                         many=True,
+                        memo=response_memo,
                     )
-                else:
-                    raise InvalidIterableOfModelsException(res)
+                if formats:
+                    response.vary.add("Accept")
+                return response
 
             if isinstance(res, BaseModel):
                 return make_json_response(
@@ -266,6 +461,7 @@ def validate(
                     on_success_status,
                     exclude_none=exclude_none,
                     by_alias=response_by_alias,
+                    memo=response_memo,
                 )
 
             if (
@@ -288,6 +484,7 @@ def validate(
                     status,
                     exclude_none=exclude_none,
                     by_alias=response_by_alias,
+                    memo=response_memo,
                 )
                 if headers:
                     ret.headers.update(headers)
@@ -295,6 +492,198 @@ def validate(
 
             return res
 
+        response_name = type_name(spec.response_annotation)
+
+        def traced_serialize(
+            trace: RequestTrace, res: Any, response_format: str
+        ) -> Any:
+            with trace.phase(PHASE_SERIALIZATION, model=response_name) as attributes:
+                response = serialize(res, response_format)
+                if response_many and isinstance(res, Sized):
+                    attributes["items"] = len(res)
+                if isinstance(response, Response):
+                    attributes["bytes"] = response.calculate_content_length()
+            return response
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not spec.built:
+                # lazy schema build, on the first request of the route
+                spec.build()
+            # resolved once, the proxy is looked up by every attribute access
+            app = current_app._get_current_object()
+            extension = app.extensions.get(EXTENSION_NAME)
+            trace = None
+            if extension is not None and extension.instruments:
+                trace = start_trace(extension.instruments, request.endpoint, spec)
+            if trace is None:
+                return handle(app, None, args, kwargs)
+            response = None
+            try:
+                response = handle(app, trace, args, kwargs)
+                return response
+            finally:
+                trace.finish(response)
+
+        def handle(
+            app: Flask, trace: Optional[RequestTrace], args: tuple, kwargs: dict
+        ) -> Any:
+            req = request._get_current_object()
+            config = app.config
+            cache_key = None
+            if response_cache is not None and req.method in ("GET", "HEAD"):
+                cache_key = response_cache_key(
+                    spec.name,
+                    req.full_path,
+                    req.headers.get("Accept", "") if formats else "",
+                    *(req.headers.get(name, "") for name in vary_headers),
+                )
+                cached = response_cache.get(cache_key)
+                if cached is not None:
+                    return cached_response(cached, vary_accept=bool(formats))
+            strict_mode = strict
+            if strict_mode is None:
+                strict_mode = config.get("FLASK_PYDANTIC_STRICT", False)
+            if strict_mode and not spec.strict_checked:
+                spec.check_strict()
+            body_params = raw_body = body_stream = None
+            if (
+                spec.body_model
+                and request_body_many
+                and (
+                    (csv_body and req.mimetype == MEDIA_TYPES[FORMAT_CSV])
+                    or (request_body_stream and req.is_json)
+                )
+            ):
+                body_stream = req.stream
+            elif (
+                spec.body_model
+                and (strict_mode or spec.body_cache is not None)
+                and not request_body_stream
+            ):
+                raw_body = _get_body_bytes(req, get_json_params or {})
+            elif spec.body_model:
+                body_params = _get_body_dict(req, get_json_params or {})
+            form_params = files = None
+            if spec.form_model and spec.upload_fields:
+                try:
+                    # aborted while streaming by `UploadRequest`
+                    form_params, files = req.form, req.files
+                except UploadTooLargeError as e:
+                    errors = {"form_params": [upload_error(e)]}
+                    if trace is not None:
+                        trace.errors = errors
+                    return validation_error_response(errors, app)
+            elif spec.form_model:
+                form_params = req.form
+            query = req.args if spec.query_model else None
+            requested_format = None
+            response_format = FORMAT_JSON
+            if response_many and formats:
+                param = config.get("FLASK_PYDANTIC_FORMAT_PARAM", DEFAULT_FORMAT_PARAM)
+                requested_format = req.args.get(param)
+                if query is not None and param in query:
+                    # the parameter isn't part of the query model (which can forbid
+                    # extra keys), cached queries are still keyed by whole query
+                    # string as the parameter is removed from it consistently
+                    query = query.copy()
+                    query.poplist(param)
+            try:
+                validated = validate_request(
+                    spec,
+                    path_params=kwargs,
+                    query=query,
+                    body=body_params,
+                    raw_body=raw_body,
+                    form=form_params,
+                    files=files,
+                    stream=body_stream,
+                    headers=req.headers,
+                    strict=strict_mode,
+                    skip_path_params=converted_path_params(wrapper),
+                    query_string=(
+                        req.query_string if spec.query_cache is not None else None
+                    ),
+                    trace=trace,
+                )
+            except UnsupportedMediaTypeError as e:
+                return unsupported_media_type_response(e.content_type)
+            kwargs = validated.path_params
+            req.query_params = validated.query_params
+            req.body_params = validated.body_params
+            req.form_params = validated.form_params
+            if spec.query_in_kwargs:
+                kwargs["query"] = validated.query_params
+            if spec.body_in_kwargs:
+                kwargs["body"] = validated.body_params
+            if spec.form_in_kwargs:
+                kwargs["form"] = validated.form_params
+
+            if validated.errors:
+                if trace is not None:
+                    trace.errors = validated.errors
+                return validation_error_response(validated.errors, app)
+            if response_many and formats:
+                response_format = negotiate_format(
+                    requested_format, req.accept_mimetypes, formats
+                )
+                if response_format is None:
+                    return not_acceptable_response(formats)
+
+            def respond() -> Any:
+                try:
+                    if trace is None:
+                        res = func(*args, **kwargs)
+                    else:
+                        with trace.phase(PHASE_VIEW):
+                            res = func(*args, **kwargs)
+                except ManyModelValidationError as e:
+                    if not request_body_stream:
+                        raise
+                    # invalid item of lazily validated request body
+                    errors = {"body_params": e.errors()}
+                    if trace is not None:
+                        trace.errors = errors
+                    return validation_error_response(errors, app)
+                if trace is None:
+                    response = serialize(res, response_format)
+                else:
+                    response = traced_serialize(trace, res, response_format)
+                if cache_key is not None or spec.flights is not None:
+                    response = app.make_response(response)
+                if cache_key is not None:
+                    store_response(
+                        response_cache, cache_key, response, response_cache_ttl
+                    )
+                return response
+
+            if spec.flights is not None and req.method in ("GET", "HEAD"):
+                # identical requests have equal validated inputs
+                key = singleflight_key(
+                    spec.name,
+                    validated.path_params,
+                    validated.query_params,
+                    response_format,
+                    [req.headers.get(name, "") for name in vary_headers],
+                )
+                response, shared = spec.flights.do(
+                    key,
+                    respond,
+                    share=shared_response,
+                    timeout=config.get(
+                        "FLASK_PYDANTIC_SINGLEFLIGHT_TIMEOUT",
+                        DEFAULT_SINGLEFLIGHT_TIMEOUT,
+                    ),
+                )
+                if shared:
+                    return app.response_class(
+                        response.body, response.status, response.headers
+                    )
+                return response
+            return respond()
+
+        setattr(wrapper, SPEC_ATTRIBUTE, spec)
+        register(spec)
         return wrapper
 
     return decorate
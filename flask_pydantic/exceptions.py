@@ -20,6 +20,25 @@ class JsonBodyParsingError(BaseFlaskPydanticException):
     pass
 
 
+class UnsupportedMediaTypeError(BaseFlaskPydanticException):
+    """This exception is raised if request parameters can not be read from the
+    request of given content type"""
+
+    def __init__(self, content_type: str, *args):
+        self.content_type = content_type
+        super().__init__(content_type, *args)
+
+
+class UploadTooLargeError(BaseFlaskPydanticException):
+    """This exception is raised while streaming a file upload which exceeds size
+    limit of its form field"""
+
+    def __init__(self, field: str, max_size: int, *args):
+        self.field = field
+        self.max_size = max_size
+        super().__init__(field, max_size, *args)
+
+
 class ManyModelValidationError(BaseFlaskPydanticException):
     """This exception is raised if there is a failure during validation of many
     models in an iterable"""
@@ -32,6 +51,18 @@ class ManyModelValidationError(BaseFlaskPydanticException):
         return self._errors
 
 
+class QueryParsingError(BaseFlaskPydanticException):
+    """This exception is raised if nested query parameters don't match fields of
+    the query model"""
+
+    def __init__(self, errors: List[dict], *args):
+        self._errors = errors
+        super().__init__(*args)
+
+    def errors(self):
+        return self._errors
+
+
 class ValidationError(BaseFlaskPydanticException):
     """This exception is raised if there is a failure during validation if the
     user has configured an exception to be raised instead of a response"""
@@ -0,0 +1,106 @@
+import gc
+import time
+from typing import Dict, Iterable, List, Optional
+
+from flask import Flask
+
+from .cli import cli
+from .instrumentation import Instrument
+from .registry import validated_routes
+
+SCHEMA_BUILD_LAZY = "lazy"
+SCHEMA_BUILD_EAGER = "eager"
+EXTENSION_NAME = "flask-pydantic"
+
+
+class FlaskPydantic:
+    """
+    Flask extension controlling when pydantic validators of validated routes are
+    built.
+
+    - `lazy` (default) - validators are built on the first request of each route,
+      which keeps application start (and CLI commands) fast
+    - `eager` - validators of all routes registered so far are built by `init_app`,
+      then the garbage collector is frozen (`gc.freeze`) so that forked workers
+      (e. g. gunicorn with `preload_app`) share the built objects copy-on-write and
+      the first request is as fast as any other
+
+    The mode is taken from `schema_build` argument or `FLASK_PYDANTIC_SCHEMA_BUILD`
+    configuration variable. In eager mode `init_app` should be called after all
+    routes and blueprints are registered (alternatively call `warmup` right before
+    workers are forked).
+
+    `instruments` (e. g. `PerfStats`) observe phases of requests of validated routes
+    of the application (see `flask_pydantic.instrumentation`).
+
+    example::
+
+        app = Flask(__name__)
+        app.register_blueprint(api)
+        FlaskPydantic(app, schema_build="eager")
+    """
+
+    def __init__(
+        self,
+        app: Optional[Flask] = None,
+        schema_build: Optional[str] = None,
+        gc_freeze: Optional[bool] = None,
+        instruments: Iterable[Instrument] = (),
+    ):
+        self.schema_build = schema_build
+        self.gc_freeze = gc_freeze
+        self.instruments: List[Instrument] = list(instruments)
+        self.build_times: Dict[str, float] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        app.config.setdefault("FLASK_PYDANTIC_SCHEMA_BUILD", SCHEMA_BUILD_LAZY)
+        app.config.setdefault("FLASK_PYDANTIC_GC_FREEZE", True)
+        app.extensions[EXTENSION_NAME] = self
+        app.cli.add_command(cli)
+        schema_build = self.schema_build or app.config["FLASK_PYDANTIC_SCHEMA_BUILD"]
+        if schema_build not in (SCHEMA_BUILD_LAZY, SCHEMA_BUILD_EAGER):
+            raise ValueError(
+                f"Unknown schema build strategy '{schema_build}', "
+                f"use '{SCHEMA_BUILD_LAZY}' or '{SCHEMA_BUILD_EAGER}'."
+            )
+        if schema_build == SCHEMA_BUILD_EAGER:
+            self.warmup(app)
+
+    def add_instrument(self, instrument: Instrument) -> None:
+        self.instruments.append(instrument)
+
+    def warmup(self, app: Flask, gc_freeze: Optional[bool] = None) -> Dict[str, float]:
+        """
+        builds validators and serializers of all validated routes of the application
+
+        :param app: flask application
+        :param gc_freeze: whether to move all objects to permanent generation of
+            the garbage collector afterwards (defaults to `FLASK_PYDANTIC_GC_FREEZE`)
+        :return: build time (in seconds) per endpoint
+        """
+        start = time.perf_counter()
+        build_times = {}
+        for route in validated_routes(app):
+            endpoint = route.endpoint
+            build_times[endpoint] = route.spec.build()
+            app.logger.debug(
+                "flask-pydantic: built endpoint '%s' in %.2f ms",
+                endpoint,
+                build_times[endpoint] * 1000,
+            )
+        if gc_freeze is None:
+            gc_freeze = self.gc_freeze
+        if gc_freeze is None:
+            gc_freeze = app.config.get("FLASK_PYDANTIC_GC_FREEZE", True)
+        if gc_freeze:
+            gc.collect()
+            gc.freeze()
+        app.logger.info(
+            "flask-pydantic: built %d validated endpoints in %.2f ms",
+            len(build_times),
+            (time.perf_counter() - start) * 1000,
+        )
+        self.build_times.update(build_times)
+        return build_times
@@ -0,0 +1,533 @@
+"""
+Alternative response formats of routes returning many models (`response_many`).
+"""
+
+import csv
+import io
+from datetime import date, datetime, time
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+try:
+    from typing import Annotated, get_args, get_origin
+except ImportError:
+    from typing_extensions import Annotated, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+from werkzeug.datastructures import MIMEAccept
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMAT_JSON = "json"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_CSV = "csv"
+FORMAT_ARROW = "arrow"
+FORMAT_PARQUET = "parquet"
+RESPONSE_FORMATS = (
+    FORMAT_JSON,
+    FORMAT_COLUMNAR,
+    FORMAT_CSV,
+    FORMAT_ARROW,
+    FORMAT_PARQUET,
+)
+MEDIA_TYPES = {
+    FORMAT_JSON: "application/json",
+    FORMAT_COLUMNAR: "application/json",
+    FORMAT_CSV: "text/csv",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+}
+# formats requiring optional `pyarrow` package
+ARROW_FORMATS = (FORMAT_ARROW, FORMAT_PARQUET)
+
+# rows serialized at once by streamed (CSV) and batched (Arrow, Parquet) formats
+BATCH_SIZE = 1000
+
+# query parameter selecting response format (e. g. `?format=columnar`)
+DEFAULT_FORMAT_PARAM = "format"
+
+
+# formats of `request_body_many` request bodies accepted besides JSON
+BODY_FORMATS = (FORMAT_CSV,)
+
+
+def check_body_formats(formats: Iterable[str]) -> Tuple[str, ...]:
+    """
+    :raises ValueError: if any of the formats is not supported for request bodies
+    """
+    formats = tuple(formats)
+    unknown = [f for f in formats if f not in BODY_FORMATS]
+    if unknown:
+        raise ValueError(
+            f"Unknown request body format(s) {', '.join(map(repr, unknown))}, "
+            f"supported formats are {', '.join(BODY_FORMATS)}"
+        )
+    return formats
+
+
+def check_formats(formats: Iterable[str]) -> Tuple[str, ...]:
+    """
+    :raises ValueError: if any of the formats is not supported
+    """
+    formats = tuple(formats)
+    unknown = [f for f in formats if f not in RESPONSE_FORMATS]
+    if unknown:
+        raise ValueError(
+            f"Unknown response format(s) {', '.join(map(repr, unknown))}, "
+            f"supported formats are {', '.join(RESPONSE_FORMATS)}"
+        )
+    if pyarrow is None and any(f in ARROW_FORMATS for f in formats):
+        raise ValueError("Arrow and Parquet formats require `pyarrow` package")
+    return formats
+
+
+def negotiate_format(
+    requested: Optional[str], accept: MIMEAccept, formats: Sequence[str]
+) -> Optional[str]:
+    """
+    selects response format
+
+    :param requested: format requested by query parameter
+    :param accept: accepted media types (`request.accept_mimetypes`), format can
+        be requested by its media type (e. g. `text/csv`) or columnar format by
+        media type parameter, i. e. `application/json; format=columnar`
+    :param formats: formats enabled for the route
+    :return: selected format (`json` or the first enabled format if no media type
+        is accepted explicitly), None if no enabled format is acceptable
+    """
+    if requested:
+        return requested if requested in formats else None
+    default = FORMAT_JSON if FORMAT_JSON in formats else formats[0]
+    if not accept:
+        return default
+    # the default format is preferred by wildcards and between equal qualities
+    offers = {_offer(default): default}
+    offers.update((_offer(format_), format_) for format_ in formats)
+    best = accept.best_match(offers)
+    return offers[best] if best is not None else None
+
+
+def _offer(format_: str) -> str:
+    if format_ == FORMAT_COLUMNAR:
+        return f"{MEDIA_TYPES[format_]}; format={format_}"
+    return MEDIA_TYPES[format_]
+
+
+def _field_type(field: Any) -> Any:
+    if field.metadata:
+        return Annotated[(field.annotation, *field.metadata)]
+    return field.annotation
+
+
+class ColumnarSerializer:
+    """
+    Serializes list of models to `{"columns": [...], "rows": [[...], ...]}`
+
+    Values of rows are read directly from model attributes and serialized by
+    pydantic-core as tuples of field types, so no per-row dictionaries are created.
+    Models with custom field serializers are dumped row by row instead.
+    """
+
+    def __init__(self, model: Type[BaseModel], by_alias: bool = False):
+        fields = list(model.model_fields.items())
+        computed = list(model.model_computed_fields.items())
+        self.model = model
+        self.by_alias = by_alias
+        self.names = tuple(name for name, _ in fields + computed)
+        self.columns = [
+            (field.serialization_alias or field.alias or name) if by_alias else name
+            for name, field in fields
+        ] + [(field.alias or name) if by_alias else name for name, field in computed]
+        types = [_field_type(field) for _, field in fields]
+        types += [field.return_type for _, field in computed]
+        self.dump_rows = bool(model.__pydantic_decorators__.field_serializers)
+        self.adapter = TypeAdapter(List[Tuple[tuple(types)]]) if types else None
+        self._getter = attrgetter(*self.names) if self.names else None
+
+    def rows(self, content: Iterable[BaseModel]) -> List[tuple]:
+        if self._getter is None:
+            return [() for _ in content]
+        if len(self.names) == 1:
+            return [(self._getter(model),) for model in content]
+        return list(map(self._getter, content))
+
+    def dump_json(self, content: Iterable[BaseModel]) -> bytes:
+        if self.dump_rows:
+            rows = to_json(
+                [
+                    list(model.model_dump(mode="json", by_alias=self.by_alias).values())
+                    for model in content
+                ]
+            )
+        elif self.adapter is None:
+            rows = to_json(self.rows(content))
+        else:
+            rows = self.adapter.dump_json(
+                self.rows(content), by_alias=self.by_alias, warnings=False
+            )
+        return b'{"columns":' + to_json(self.columns) + b',"rows":' + rows + b"}"
+
+
+@lru_cache(maxsize=None)
+def columnar_serializer(
+    model: Type[BaseModel], by_alias: bool = False
+) -> ColumnarSerializer:
+    """columnar serializer of the model, built once per model"""
+    return ColumnarSerializer(model, by_alias)
+
+
+def dump_columnar(
+    content: Iterable[BaseModel],
+    by_alias: bool = False,
+    model: Optional[Type[BaseModel]] = None,
+) -> bytes:
+    """
+    serializes list of models of the same type to columnar JSON
+
+    :param model: model used to get columns of an empty list
+    :raises TypeError: if models are not instances of the same model class
+    """
+    first = next(iter(content), None)
+    if first is not None:
+        model = type(first)
+    if model is None:
+        return b'{"columns":[],"rows":[]}'
+    if not all(isinstance(item, model) for item in content):
+        raise TypeError("columnar format requires models of the same type")
+    return columnar_serializer(model, by_alias).dump_json(content)
+
+
+# leaf types kept as python objects in Arrow tables, other values are JSON encoded
+_ARROW_NATIVE_TYPES = (bool, int, float, str, bytes, datetime, date, time)
+
+
+class FlatColumn(NamedTuple):
+    """column of flattened model schema"""
+
+    name: str
+    # attribute names leading from the model to the value
+    path: Tuple[str, ...]
+    # keys leading to the value in the dumped model (aliases if dumped by alias)
+    keys: Tuple[str, ...]
+    type: Any
+    native: bool
+    # whether any of the parent models is optional
+    nullable_parent: bool = False
+
+
+def _model_of(type_: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """nested model of field annotation (and whether it is optional)"""
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        return type_, False
+    if get_origin(type_) is Union:
+        args = [arg for arg in get_args(type_) if arg is not type(None)]
+        if len(args) == 1 and len(args) < len(get_args(type_)):
+            model, _ = _model_of(args[0])
+            return model, True
+    return None, False
+
+
+def _is_native(type_: Any) -> bool:
+    if get_origin(type_) is Union:
+        return all(_is_native(arg) for arg in get_args(type_) if arg is not type(None))
+    if get_origin(type_) is Annotated:
+        return _is_native(get_args(type_)[0])
+    return isinstance(type_, type) and issubclass(type_, _ARROW_NATIVE_TYPES)
+
+
+def _flat_columns(
+    model: Type[BaseModel],
+    by_alias: bool,
+    prefix: str = "",
+    path: Tuple[str, ...] = (),
+    keys: Tuple[str, ...] = (),
+    optional: bool = False,
+    seen: Tuple[type, ...] = (),
+) -> Iterator[FlatColumn]:
+    fields = [
+        (name, (field.serialization_alias or field.alias or name), _field_type(field))
+        for name, field in model.model_fields.items()
+    ]
+    fields += [
+        (name, (field.alias or name), field.return_type)
+        for name, field in model.model_computed_fields.items()
+    ]
+    for name, alias, type_ in fields:
+        key = alias if by_alias else name
+        column = prefix + key
+        nested, nested_optional = _model_of(type_)
+        if nested is not None and nested not in seen:
+            yield from _flat_columns(
+                nested,
+                by_alias,
+                prefix=column + ".",
+                path=(*path, name),
+                keys=(*keys, key),
+                optional=optional or nested_optional,
+                seen=(*seen, model),
+            )
+            continue
+        if optional:
+            type_ = Optional[type_]
+        yield FlatColumn(
+            column, (*path, name), (*keys, key), type_, _is_native(type_), optional
+        )
+
+
+def _has_field_serializers(model: Type[BaseModel], seen: Tuple[type, ...] = ()) -> bool:
+    if model.__pydantic_decorators__.field_serializers:
+        return True
+    for field in model.model_fields.values():
+        nested, _ = _model_of(field.annotation)
+        if nested is not None and nested not in seen:
+            if _has_field_serializers(nested, (*seen, model)):
+                return True
+    return False
+
+
+def _getter(path: Tuple[str, ...]) -> Callable[[Any], Any]:
+    if len(path) == 1:
+        return attrgetter(path[0])
+
+    def get(value: Any) -> Any:
+        for name in path:
+            if value is None:
+                return None
+            value = getattr(value, name)
+        return value
+
+    return get
+
+
+def _item_getter(path: Tuple[str, ...]) -> Callable[[dict], Any]:
+    def get(value: Any) -> Any:
+        for name in path:
+            if value is None:
+                return None
+            value = value.get(name)
+        return value
+
+    return get
+
+
+class FlatSchema:
+    """
+    Flattened field schema of a model used by tabular formats (CSV, Arrow, Parquet)
+
+    Fields of nested models are flattened to dotted columns (e. g. `address.city`),
+    other values which are not scalars (lists, dictionaries, ...) are JSON encoded.
+    Row values are read directly from model attributes and serialized by a single
+    pydantic-core call per batch of rows. Models with custom field serializers are
+    dumped row by row instead.
+    """
+
+    def __init__(self, model: Type[BaseModel], by_alias: bool = False):
+        self.model = model
+        self.by_alias = by_alias
+        self.columns = list(_flat_columns(model, by_alias))
+        self.names = [column.name for column in self.columns]
+        self.dump_rows = _has_field_serializers(model)
+        types = tuple(column.type for column in self.columns)
+        self.adapter = TypeAdapter(List[Tuple[types]]) if types else None
+        self._item_getters = [_item_getter(column.keys) for column in self.columns]
+        self._encoded = [
+            i for i, column in enumerate(self.columns) if not column.native
+        ]
+        if len(self.columns) > 1 and not any(
+            column.nullable_parent for column in self.columns
+        ):
+            # values of all columns are read by a single C call
+            self._row = attrgetter(*(".".join(column.path) for column in self.columns))
+        else:
+            getters = [_getter(column.path) for column in self.columns]
+            self._row = lambda model: tuple(get(model) for get in getters)
+
+    def rows(self, content: Iterable[BaseModel], mode: str = "json") -> List[list]:
+        """serialized rows of flattened values"""
+        if self.adapter is None:
+            return [[] for _ in content]
+        if self.dump_rows:
+            dumped = [
+                model.model_dump(mode=mode, by_alias=self.by_alias) for model in content
+            ]
+            return [[get(row) for get in self._item_getters] for row in dumped]
+        rows = list(map(self._row, content))
+        return self.adapter.dump_python(
+            rows, mode=mode, by_alias=self.by_alias, warnings=False
+        )
+
+    def json_rows(self, content: Iterable[BaseModel]) -> List[list]:
+        """rows of JSON compatible scalars (nested lists and dicts are encoded)"""
+        rows = self.rows(content, "json")
+        if self._encoded:
+            for row in rows:
+                for i in self._encoded:
+                    if isinstance(row[i], (list, dict)):
+                        row[i] = to_json(row[i]).decode()
+        return rows
+
+    def arrow_columns(self, content: List[BaseModel]) -> List[list]:
+        """columns of python values, values of non-native types are JSON encoded"""
+        python = self.rows(content, "python")
+        encoded = None
+        columns = []
+        for i, column in enumerate(self.columns):
+            if column.native:
+                columns.append([row[i] for row in python])
+                continue
+            if encoded is None:
+                encoded = self.rows(content, "json")
+            columns.append([_json_string(row[i]) for row in encoded])
+        return columns
+
+
+def _json_string(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return to_json(value).decode()
+
+
+@lru_cache(maxsize=None)
+def flat_schema(model: Type[BaseModel], by_alias: bool = False) -> FlatSchema:
+    """flattened schema of the model, built once per model"""
+    return FlatSchema(model, by_alias)
+
+
+def _batches(content: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    items = iter(content)
+    batch = list(islice(items, size))
+    while batch:
+        yield batch
+        batch = list(islice(items, size))
+
+
+def tabular_schema(
+    content: Iterable[BaseModel], by_alias: bool, model: Optional[Type[BaseModel]]
+) -> Optional[FlatSchema]:
+    """
+    flattened schema of models in `content` (or of `model` if `content` is empty)
+
+    :raises TypeError: if models are not instances of the same model class
+    """
+    first = next(iter(content), None)
+    if first is not None:
+        model = type(first)
+    if model is None:
+        return None
+    if not all(isinstance(item, model) for item in content):
+        raise TypeError("tabular formats require models of the same type")
+    return flat_schema(model, by_alias)
+
+
+def iter_csv(
+    schema: Optional[FlatSchema],
+    content: Iterable[BaseModel],
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[str]:
+    """
+    serializes models to CSV, yields header line first and then chunks of
+    `batch_size` rows
+    """
+    if schema is None:
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(schema.names)
+    yield buffer.getvalue()
+    for batch in _batches(content, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(schema.json_rows(batch))
+        yield buffer.getvalue()
+
+
+def _arrow_type(type_: Any) -> Any:
+    if get_origin(type_) is Union:
+        args = [arg for arg in get_args(type_) if arg is not type(None)]
+        return _arrow_type(args[0]) if len(args) == 1 else pyarrow.string()
+    if get_origin(type_) is Annotated:
+        return _arrow_type(get_args(type_)[0])
+    for python_type, arrow_type in (
+        (bool, pyarrow.bool_),
+        (int, pyarrow.int64),
+        (float, pyarrow.float64),
+        (str, pyarrow.string),
+        (bytes, pyarrow.binary),
+        (datetime, lambda: pyarrow.timestamp("us")),
+        (date, pyarrow.date32),
+        (time, lambda: pyarrow.time64("us")),
+    ):
+        if isinstance(type_, type) and issubclass(type_, python_type):
+            return arrow_type()
+    return pyarrow.string()
+
+
+@lru_cache(maxsize=None)
+def arrow_schema(schema: FlatSchema) -> Any:
+    """Arrow schema of flattened model schema, built once per model"""
+    return pyarrow.schema(
+        [
+            (
+                column.name,
+                _arrow_type(column.type) if column.native else pyarrow.string(),
+            )
+            for column in schema.columns
+        ]
+    )
+
+
+def _record_batches(
+    schema: FlatSchema, content: Iterable[BaseModel], batch_size: int
+) -> Iterator[Any]:
+    pa_schema = arrow_schema(schema)
+    for batch in _batches(content, batch_size):
+        yield pyarrow.record_batch(schema.arrow_columns(batch), schema=pa_schema)
+
+
+def dump_arrow(
+    schema: Optional[FlatSchema],
+    content: Iterable[BaseModel],
+    batch_size: int = BATCH_SIZE,
+) -> bytes:
+    """serializes models to Arrow IPC stream of record batches of `batch_size` rows"""
+    if schema is None:
+        return b""
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, arrow_schema(schema)) as writer:
+        for batch in _record_batches(schema, content, batch_size):
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def dump_parquet(
+    schema: Optional[FlatSchema],
+    content: Iterable[BaseModel],
+    batch_size: int = BATCH_SIZE,
+) -> bytes:
+    """serializes models to Parquet file with row groups of `batch_size` rows"""
+    if schema is None:
+        return b""
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.parquet.ParquetWriter(sink, arrow_schema(schema)) as writer:
+        for batch in _record_batches(schema, content, batch_size):
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
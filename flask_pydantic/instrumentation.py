@@ -0,0 +1,118 @@
+"""
+Instrumentation of phases of validated requests.
+
+Instruments registered in the `FlaskPydantic` extension observe requests of
+validated routes phase by phase: validation of path, query, body and form
+parameters, execution of the view and serialization of the response. Requests
+which are not sampled by any instrument are not traced at all.
+"""
+
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .spec import RouteSpec
+
+PHASE_PATH = "path_params"
+PHASE_QUERY = "query_params"
+PHASE_BODY = "body_params"
+PHASE_FORM = "form_params"
+PHASE_VIEW = "view"
+PHASE_SERIALIZATION = "serialization"
+PHASES = (
+    PHASE_PATH,
+    PHASE_QUERY,
+    PHASE_BODY,
+    PHASE_FORM,
+    PHASE_VIEW,
+    PHASE_SERIALIZATION,
+)
+
+
+class Instrument:
+    """
+    Base class of instruments, all methods are no-ops
+
+    `start_request` returns state of a sampled request (or None if the request
+    isn't sampled), the state is passed to other methods. Attributes of a phase
+    (`model`, `items`, `bytes`) are passed to both `start_phase` and `end_phase`,
+    some of them (e. g. number of items) are known at the end of the phase only.
+    """
+
+    def start_request(self, endpoint: str, spec: RouteSpec) -> Any:
+        return None
+
+    def start_phase(self, state: Any, phase: str, attributes: Dict[str, Any]) -> Any:
+        """:return: token passed to `end_phase`"""
+        return None
+
+    def end_phase(
+        self,
+        state: Any,
+        phase: str,
+        token: Any,
+        attributes: Dict[str, Any],
+        error: Optional[BaseException],
+    ) -> None:
+        pass
+
+    def end_request(self, state: Any, response: Any, errors: Dict[str, list]) -> None:
+        """:param errors: validation errors by source"""
+
+
+class RequestTrace:
+    """phases of a request sampled by (some of) the instruments"""
+
+    __slots__ = ("endpoint", "spec", "states", "errors")
+
+    def __init__(
+        self, endpoint: str, spec: RouteSpec, states: List[Tuple[Instrument, Any]]
+    ):
+        self.endpoint = endpoint
+        self.spec = spec
+        self.states = states
+        self.errors: Dict[str, list] = {}
+
+    @contextmanager
+    def phase(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """
+        context of a phase, yields its attributes which can be completed inside
+
+        Phases end in the reverse order of instruments (like nested contexts).
+        """
+        tokens = [
+            (instrument, state, instrument.start_phase(state, name, attributes))
+            for instrument, state in self.states
+        ]
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            for instrument, state, token in reversed(tokens):
+                instrument.end_phase(state, name, token, attributes, error)
+
+    def finish(self, response: Any) -> None:
+        for instrument, state in reversed(self.states):
+            instrument.end_request(state, response, self.errors)
+
+
+def start_trace(
+    instruments: Sequence[Instrument], endpoint: str, spec: RouteSpec
+) -> Optional[RequestTrace]:
+    """:return: trace of the request, None if no instrument samples it"""
+    states = []
+    for instrument in instruments:
+        state = instrument.start_request(endpoint, spec)
+        if state is not None:
+            states.append((instrument, state))
+    return RequestTrace(endpoint, spec, states) if states else None
@@ -0,0 +1,91 @@
+"""
+OpenTelemetry spans of phases of validated requests.
+
+`OpenTelemetry` instrument opens a child span of the current (e. g. Flask
+instrumentation's request) span for every phase: validation of path, query, body
+and form parameters, execution of the view and serialization of the response.
+Without `opentelemetry-api` package (or if the current span isn't recording) the
+instrument doesn't sample any request, so it costs nothing.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from .instrumentation import Instrument
+from .spec import RouteSpec
+from .version import __version__
+
+try:
+    from opentelemetry import context, trace
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:
+    context = trace = None
+
+ATTRIBUTE_PREFIX = "flask_pydantic"
+# phase attributes set as span attributes
+_ATTRIBUTES = ("model", "items", "bytes")
+
+
+class OpenTelemetry(Instrument):
+    """
+    Instrument creating spans `flask_pydantic.<phase>` with attributes
+    `flask_pydantic.endpoint`, `flask_pydantic.model`, `flask_pydantic.items` (number
+    of items of `request_body_many` and `response_many`) and `flask_pydantic.bytes`
+    (size of request body or serialized response)
+
+    Sources with validation errors are set as `flask_pydantic.validation_errors`
+    attribute of the current span.
+
+    example::
+
+        FlaskPydantic(app, instruments=[OpenTelemetry()])
+
+    :param tracer_provider: provider of the tracer, global one by default
+    """
+
+    def __init__(self, tracer_provider: Optional[Any] = None):
+        self.tracer = None
+        if trace is not None:
+            self.tracer = trace.get_tracer(
+                __name__, __version__, tracer_provider=tracer_provider
+            )
+
+    def start_request(self, endpoint: str, spec: RouteSpec) -> Optional[str]:
+        if self.tracer is None or not trace.get_current_span().is_recording():
+            return None
+        return endpoint
+
+    def start_phase(
+        self, state: str, phase: str, attributes: Dict[str, Any]
+    ) -> Tuple[Any, object]:
+        span = self.tracer.start_span(
+            f"{ATTRIBUTE_PREFIX}.{phase}",
+            attributes={f"{ATTRIBUTE_PREFIX}.endpoint": state},
+        )
+        # spans created inside the phase (e. g. by the view) are its children
+        token = context.attach(trace.set_span_in_context(span))
+        return span, token
+
+    def end_phase(
+        self,
+        state: str,
+        phase: str,
+        token: Tuple[Any, object],
+        attributes: Dict[str, Any],
+        error: Optional[BaseException],
+    ) -> None:
+        span, context_token = token
+        context.detach(context_token)
+        for name in _ATTRIBUTES:
+            value = attributes.get(name)
+            if value is not None:
+                span.set_attribute(f"{ATTRIBUTE_PREFIX}.{name}", value)
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, repr(error)))
+        span.end()
+
+    def end_request(self, state: str, response: Any, errors: Dict[str, list]) -> None:
+        if errors:
+            trace.get_current_span().set_attribute(
+                f"{ATTRIBUTE_PREFIX}.validation_errors", sorted(errors)
+            )
@@ -0,0 +1,478 @@
+"""
+Synthetic payloads generated from models of validated routes.
+
+`PayloadGenerator` walks JSON schema of a model (pydantic model, `TypedDict`,
+dataclass, ...) and generates valid or deliberately invalid payloads of
+controllable size, deterministically for a given seed. Payloads are used by
+benchmarks and emitted as request corpora by `flask pydantic payloads`.
+"""
+
+import math
+import random
+import string
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from flask import Flask
+from pydantic import TypeAdapter, ValidationError
+from werkzeug.datastructures import MultiDict
+
+from .registry import validated_routes
+from .spec import RouteSpec, type_adapter, type_name
+from .validation import validate_request
+
+_ALPHABET = string.ascii_letters + string.digits
+_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+# integers without bounds are generated from this range
+_DEFAULT_RANGE = (0, 1000)
+# maximal attempts to generate invalid payload
+_ATTEMPTS = 20
+# values of other types than the replaced ones
+_INVALID_VALUES: Tuple[Any, ...] = ({"invalid": True}, "invalid", [None])
+
+
+class PayloadGenerator:
+    """
+    Generator of payloads from JSON schema of models
+
+    Optional fields are included with `optional` probability, below `max_depth`
+    optional fields are omitted, nullable fields are None and arrays are as short
+    as allowed (which terminates recursive models). String patterns are not
+    supported, generated strings match length and format only.
+
+    :param seed: seed of the random generator
+    :param list_length: length of arrays and mappings (within schema bounds)
+    :param string_length: length of strings (within schema bounds)
+    :param max_depth: maximal nesting of generated objects and arrays
+    :param optional: probability of including an optional field
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        list_length: int = 3,
+        string_length: int = 8,
+        max_depth: int = 4,
+        optional: float = 0.5,
+    ):
+        self.random = random.Random(seed)
+        self.list_length = list_length
+        self.string_length = string_length
+        self.max_depth = max_depth
+        self.optional = optional
+
+    def generate(self, model: Any) -> Any:
+        """valid payload of the model (JSON compatible python object)"""
+        schema = type_adapter(model).json_schema(mode="validation")
+        return self._value(schema, schema.get("$defs", {}), 0)
+
+    def generate_many(self, model: Any) -> List[Any]:
+        """`list_length` payloads (e. g. body of `request_body_many` route)"""
+        return [self.generate(model) for _ in range(self.list_length)]
+
+    def invalid(
+        self,
+        model: Any,
+        many: bool = False,
+        is_invalid: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        payload which fails validation against the model (a value of a random
+        field is replaced by a value of another type or the field is removed)
+
+        :param is_invalid: checks that payload fails validation, validates it
+            against the model (list of models if `many`) by default
+        :raises ValueError: if invalid payload can't be generated
+        """
+        if is_invalid is None:
+            is_invalid = partial(_fails, type_adapter(List[model] if many else model))
+        payload = self.generate_many(model) if many else self.generate(model)
+        for _ in range(_ATTEMPTS):
+            candidate = self._mutate(payload)
+            if is_invalid(candidate):
+                return candidate
+        raise ValueError(f"Invalid payload of {type_name(model)} can't be generated.")
+
+    def _mutate(self, payload: Any) -> Any:
+        nodes = list(_nodes(payload, ()))
+        path, value = self.random.choice(nodes)
+        parent = _get(payload, path[:-1]) if path else None
+        if isinstance(parent, dict) and self.random.random() < 0.3:
+            return _replace(payload, path, None, remove=True)
+        choices = [
+            invalid for invalid in _INVALID_VALUES if type(invalid) is not type(value)
+        ]
+        return _replace(payload, path, self.random.choice(choices))
+
+    def _value(self, schema: Dict[str, Any], defs: Dict[str, Any], depth: int) -> Any:
+        if "$ref" in schema:
+            schema = {**defs[schema["$ref"].rsplit("/", 1)[-1]], **schema}
+            schema.pop("$ref")
+        if "const" in schema:
+            return schema["const"]
+        if "enum" in schema:
+            return self.random.choice(schema["enum"])
+        for key in ("anyOf", "oneOf"):
+            if key in schema:
+                return self._union(schema[key], defs, depth)
+        if "allOf" in schema:
+            return self._value(schema["allOf"][0], defs, depth)
+        type_ = schema.get("type")
+        if isinstance(type_, list):
+            type_ = self.random.choice(type_)
+        generate = getattr(self, f"_{type_}", None)
+        if generate is None:
+            # any value
+            return self._string({"type": "string"}, defs, depth)
+        return generate(schema, defs, depth)
+
+    def _union(self, options: List[dict], defs: Dict[str, Any], depth: int) -> Any:
+        nullable = any(option.get("type") == "null" for option in options)
+        if nullable and depth >= self.max_depth:
+            return None
+        options = [option for option in options if option.get("type") != "null"]
+        if any(option.get("type") in ("number", "integer") for option in options):
+            # strings of numbers (e. g. decimals) have to be numeric
+            options = [
+                option
+                for option in options
+                if option.get("type") != "string" or "format" in option
+            ]
+        return self._value(self.random.choice(options), defs, depth)
+
+    def _object(self, schema: Dict[str, Any], defs: Dict[str, Any], depth: int) -> Any:
+        properties = schema.get("properties", {})
+        required = set(schema.get("required", ()))
+        value = {}
+        for name, field in properties.items():
+            if name not in required and (
+                depth >= self.max_depth or self.random.random() >= self.optional
+            ):
+                continue
+            value[name] = self._value(field, defs, depth + 1)
+        extra = schema.get("additionalProperties")
+        if isinstance(extra, dict) and not properties:
+            for index in range(self._length(schema, "Properties", depth)):
+                value[f"key{index}"] = self._value(extra, defs, depth + 1)
+        return value
+
+    def _array(self, schema: Dict[str, Any], defs: Dict[str, Any], depth: int) -> Any:
+        if "prefixItems" in schema:
+            return [
+                self._value(item, defs, depth + 1) for item in schema["prefixItems"]
+            ]
+        items = schema.get("items", {})
+        return [
+            self._value(items, defs, depth + 1)
+            for _ in range(self._length(schema, "Items", depth))
+        ]
+
+    def _length(self, schema: Dict[str, Any], kind: str, depth: int) -> int:
+        low = schema.get(f"min{kind}", 0)
+        if depth >= self.max_depth:
+            return low
+        return max(
+            low, min(self.list_length, schema.get(f"max{kind}", self.list_length))
+        )
+
+    def _string(self, schema: Dict[str, Any], defs: Dict[str, Any], depth: int) -> str:
+        format_ = schema.get("format")
+        if format_ in ("date-time", "date", "time"):
+            moment = _EPOCH + timedelta(seconds=self.random.randrange(10**8))
+            if format_ == "date":
+                return date.isoformat(moment.date())
+            if format_ == "time":
+                return moment.time().isoformat()
+            return moment.isoformat()
+        if format_ == "uuid":
+            return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+        if format_ == "email":
+            return f"{self._text(8)}@example.com"
+        if format_ in ("uri", "url"):
+            return f"https://example.com/{self._text(8)}"
+        if format_ == "ipv4":
+            return ".".join(str(self.random.randrange(256)) for _ in range(4))
+        if format_ == "duration":
+            return f"PT{self.random.randrange(1, 100)}S"
+        low = schema.get("minLength", 0)
+        high = schema.get("maxLength", max(low, self.string_length))
+        return self._text(max(low, min(self.string_length, high)))
+
+    def _text(self, length: int) -> str:
+        return "".join(self.random.choices(_ALPHABET, k=length))
+
+    def _integer(self, schema: Dict[str, Any], defs: Dict[str, Any], depth: int) -> int:
+        low, high, _, _ = _bounds(schema, integer=True)
+        step = schema.get("multipleOf")
+        if step:
+            return _multiple(self.random, step, low, high, False, False)
+        return self.random.randint(low, high)
+
+    def _number(
+        self, schema: Dict[str, Any], defs: Dict[str, Any], depth: int
+    ) -> float:
+        low, high, low_open, high_open = _bounds(schema, integer=False)
+        step = schema.get("multipleOf")
+        if step:
+            return _multiple(self.random, step, low, high, low_open, high_open)
+        value = self.random.uniform(low, high)
+        for candidate in (round(value, 2), value, (low + high) / 2):
+            # rounded (or random) value may end up on an exclusive bound
+            if _within(candidate, low, high, low_open, high_open):
+                return candidate
+        return low
+
+    def _boolean(
+        self, schema: Dict[str, Any], defs: Dict[str, Any], depth: int
+    ) -> bool:
+        return self.random.random() < 0.5
+
+    def _null(self, schema: Dict[str, Any], defs: Dict[str, Any], depth: int) -> None:
+        return None
+
+
+def _fails(adapter: TypeAdapter, payload: Any) -> bool:
+    try:
+        adapter.validate_python(payload)
+    except ValidationError:
+        return True
+    return False
+
+
+def _bounds(schema: Dict[str, Any], integer: bool) -> Tuple[Any, Any, bool, bool]:
+    """
+    lower and upper bound of a number and whether they are exclusive (bounds of
+    integers are inclusive)
+    """
+    low, high = schema.get("minimum"), schema.get("maximum")
+    low_open = high_open = False
+    if "exclusiveMinimum" in schema:
+        low, low_open = schema["exclusiveMinimum"], True
+    if "exclusiveMaximum" in schema:
+        high, high_open = schema["exclusiveMaximum"], True
+    if integer:
+        if low is not None:
+            low = math.floor(low) + 1 if low_open else math.ceil(low)
+        if high is not None:
+            high = math.ceil(high) - 1 if high_open else math.floor(high)
+        low_open = high_open = False
+    if low is None:
+        low = (
+            min(_DEFAULT_RANGE[0], high - 1) if high is not None else _DEFAULT_RANGE[0]
+        )
+    if high is None:
+        high = max(_DEFAULT_RANGE[1], low + 1)
+    return low, high, low_open, high_open
+
+
+def _within(
+    value: float, low: float, high: float, low_open: bool, high_open: bool
+) -> bool:
+    return (low < value if low_open else low <= value) and (
+        value < high if high_open else value <= high
+    )
+
+
+def _multiple(
+    random_: random.Random,
+    step: Any,
+    low: Any,
+    high: Any,
+    low_open: bool,
+    high_open: bool,
+) -> Any:
+    """random multiple of the step within bounds (the lowest bound if there is none)"""
+    first, last = math.ceil(low / step), math.floor(high / step)
+    if low_open and first * step <= low:
+        first += 1
+    if high_open and last * step >= high:
+        last -= 1
+    value = random_.randint(first, last) * step if first <= last else low
+    # multiples of fractional steps are rounded to avoid binary artifacts (0.1 * 3)
+    return value if isinstance(value, int) else round(value, 10)
+
+
+def _nodes(value: Any, path: tuple):
+    yield path, value
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _nodes(item, (*path, key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from _nodes(item, (*path, index))
+
+
+def _get(value: Any, path: tuple) -> Any:
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _replace(value: Any, path: tuple, new: Any, remove: bool = False) -> Any:
+    """copy of the value with replaced (or removed) item at the path"""
+    if not path:
+        return new
+    key, rest = path[0], path[1:]
+    copy = dict(value) if isinstance(value, dict) else list(value)
+    if remove and not rest:
+        del copy[key]
+    else:
+        copy[key] = _replace(value[key], rest, new, remove)
+    return copy
+
+
+def to_pairs(value: Dict[str, Any], nested: bool = True) -> List[Tuple[str, str]]:
+    """
+    query or form parameters of a payload (repeated keys of lists, nested objects
+    in bracket notation)
+    """
+    pairs: List[Tuple[str, str]] = []
+    for key, item in value.items():
+        _add_pairs(pairs, key, item, nested)
+    return pairs
+
+
+def _add_pairs(pairs: list, key: str, value: Any, nested: bool) -> None:
+    if value is None:
+        return
+    if isinstance(value, list):
+        for item in value:
+            _add_pairs(pairs, key, item, nested)
+    elif isinstance(value, dict) and nested:
+        for name, item in value.items():
+            _add_pairs(pairs, f"{key}[{name}]", item, nested)
+    elif isinstance(value, bool):
+        pairs.append((key, "true" if value else "false"))
+    else:
+        pairs.append((key, str(value)))
+
+
+def route_payload(
+    spec: RouteSpec, generator: PayloadGenerator, invalid: bool = False
+) -> Dict[str, Any]:
+    """
+    payloads of all sources of the route (`path` values, `query` and `form`
+    parameters as lists of pairs, JSON `body`) and whether they are `valid`
+
+    :param invalid: whether a payload of one (random) source should be invalid,
+        the payload stays valid if no source can be invalid (e. g. query of string
+        fields only)
+    """
+    sources = [
+        source
+        for source in ("query", "body", "form")
+        if getattr(spec, f"{source}_model") is not None
+    ]
+    payload: Dict[str, Any] = {
+        "path": {
+            name: generator.generate(type_)
+            for name, type_ in spec.path_annotations.items()
+        },
+        "valid": True,
+    }
+    for source in sources:
+        model = getattr(spec, f"{source}_model")
+        if source == "body" and spec.options.get("request_body_many"):
+            payload[source] = generator.generate_many(model)
+        else:
+            payload[source] = _encode(spec, source, generator.generate(model))
+    if invalid:
+        for source in generator.random.sample(sources, len(sources)):
+            try:
+                payload[source] = _invalid(spec, source, generator)
+            except ValueError:
+                continue
+            payload["valid"] = False
+            break
+    return payload
+
+
+def _encode(spec: RouteSpec, source: str, value: Any) -> Any:
+    if source == "query":
+        nested = spec.query_parser is not None and spec.query_parser.nested
+        return to_pairs(value, nested)
+    if source == "form":
+        return to_pairs(
+            {
+                name: item
+                for name, item in value.items()
+                if name not in spec.upload_fields
+            },
+            nested=False,
+        )
+    return value
+
+
+def _invalid(spec: RouteSpec, source: str, generator: PayloadGenerator) -> Any:
+    model = getattr(spec, f"{source}_model")
+    if source == "body":
+        return generator.invalid(model, spec.options.get("request_body_many", False))
+
+    # strings of query and form parameters are validated as by the route
+    source_spec = RouteSpec(
+        **{source: model},
+        query_style=spec.options.get("query_style"),
+        query_delimiter=spec.options.get("query_delimiter"),
+    )
+
+    def is_invalid(value: Any) -> bool:
+        if not isinstance(value, dict):
+            # parameters are always an object
+            return False
+        pairs = MultiDict(_encode(spec, source, value))
+        validated = validate_request(source_spec, **{source: pairs})
+        return f"{source}_params" in validated.errors
+
+    return _encode(spec, source, generator.invalid(model, is_invalid=is_invalid))
+
+
+# methods of requests with body (or form) payloads, in order of preference
+_BODY_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+def _method(spec: RouteSpec, methods: Tuple[str, ...]) -> str:
+    preferred = _BODY_METHODS if spec.body_model or spec.form_model else ("GET",)
+    return next((method for method in preferred if method in methods), methods[0])
+
+
+def request_corpus(
+    app: Flask,
+    generator: PayloadGenerator,
+    count: int = 10,
+    endpoints: Iterable[str] = (),
+    invalid_ratio: float = 0.0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    generates requests of validated routes of the application: `endpoint`,
+    `method`, `url` (with query string), `json` body or `form` parameters and
+    whether the request is `valid`
+
+    :param count: number of requests of each endpoint
+    :param endpoints: generated endpoints (all validated routes by default)
+    :param invalid_ratio: probability of a request with invalid payload
+    :raises werkzeug.routing.BuildError: if URL can't be built from generated
+        path parameters
+    """
+    selected = set(endpoints)
+    routes = sorted(validated_routes(app), key=lambda route: route.endpoint)
+    adapter = app.url_map.bind("localhost")
+    for route in routes:
+        if selected and route.endpoint not in selected:
+            continue
+        method = _method(route.spec, route.methods)
+        for _ in range(count):
+            invalid = generator.random.random() < invalid_ratio
+            payload = route_payload(route.spec, generator, invalid)
+            url = adapter.build(route.endpoint, payload["path"], method=method)
+            if payload.get("query"):
+                url = f"{url}?{urlencode(payload['query'])}"
+            request = {"endpoint": route.endpoint, "method": method, "url": url}
+            if "body" in payload:
+                request["json"] = payload["body"]
+            if "form" in payload:
+                request["form"] = payload["form"]
+            request["valid"] = payload["valid"]
+            yield request
@@ -0,0 +1,124 @@
+"""
+Sampled profiling of validated routes.
+
+`Profiler` instrument profiles 1 in N requests of every endpoint by `cProfile`,
+profiles are aggregated per endpoint and written to a directory on rotation (as
+`pstats` files, e. g. for `snakeviz` or comparison of hot models across deploys).
+"""
+
+import atexit
+import cProfile
+import os
+import pstats
+import re
+import threading
+import time
+from datetime import datetime
+from itertools import count
+from typing import Any, Dict, Iterator, Optional
+
+from .instrumentation import Instrument
+from .spec import RouteSpec
+
+# profile 1 in DEFAULT_SAMPLE_RATE requests
+DEFAULT_SAMPLE_RATE = 100
+
+
+def _file_name(endpoint: str) -> str:
+    return re.sub(r"[^\w.-]", "_", endpoint)
+
+
+class Profiler(Instrument):
+    """
+    Instrument profiling sampled requests of validated routes
+
+    Only one request of the process is profiled at a time, requests sampled while
+    another one is profiled are skipped.
+
+    example::
+
+        FlaskPydantic(app, instruments=[Profiler("/tmp/profiles", rates={"search": 10})])
+
+    :param directory: directory the profiles are written to (as
+        `<endpoint>.<time>.<pid>.pstats`)
+    :param sample_rate: profile 1 in `sample_rate` requests of an endpoint
+    :param rates: sample rates of endpoints (0 disables profiling of the endpoint)
+    :param interval: time (in seconds) after which profiles are written and reset
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        rates: Optional[Dict[str, int]] = None,
+        interval: float = 300.0,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.rates = dict(rates or {})
+        self.interval = interval
+        self._counters: Dict[str, Iterator[int]] = {}
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+        # held while a request is profiled
+        self._active = threading.Lock()
+        self._next_rotation = time.monotonic() + interval
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.rotate)
+
+    def _sampled(self, endpoint: str) -> bool:
+        rate = self.rates.get(endpoint, self.sample_rate)
+        if rate <= 0:
+            return False
+        counter = self._counters.get(endpoint)
+        if counter is None:
+            counter = self._counters.setdefault(endpoint, count())
+        return next(counter) % rate == 0
+
+    def start_request(self, endpoint: str, spec: RouteSpec) -> Optional[Any]:
+        if not self._sampled(endpoint) or not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is active
+            self._active.release()
+            return None
+        return endpoint, profile
+
+    def end_request(self, state: Any, response: Any, errors: Dict[str, list]) -> None:
+        endpoint, profile = state
+        profile.disable()
+        self._active.release()
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                self._stats[endpoint] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if time.monotonic() >= self._next_rotation:
+            self.rotate()
+
+    def profiles(self) -> Dict[str, pstats.Stats]:
+        """profiles aggregated since the last rotation by endpoint"""
+        with self._lock:
+            return dict(self._stats)
+
+    def rotate(self) -> Dict[str, str]:
+        """
+        writes aggregated profiles to the directory and resets them
+
+        :return: paths of written profiles by endpoint
+        """
+        with self._lock:
+            profiles, self._stats = self._stats, {}
+            self._next_rotation = time.monotonic() + self.interval
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        paths = {}
+        for endpoint, stats in profiles.items():
+            paths[endpoint] = os.path.join(
+                self.directory, f"{_file_name(endpoint)}.{stamp}.{os.getpid()}.pstats"
+            )
+            stats.dump_stats(paths[endpoint])
+        return paths
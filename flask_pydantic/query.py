@@ -0,0 +1,246 @@
+"""
+Parsing of nested (deep object) query strings, e. g.
+
+    ?filter[status]=open&filter[created][gte]=2024-01-01&sort=-created,id
+
+The parser is compiled from the field tree of the query model, so keys are resolved
+by dictionary lookups only and unknown keys of nested objects are rejected before
+the model is validated.
+"""
+
+import re
+from dataclasses import is_dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    from typing import Annotated, get_args, get_origin
+except ImportError:
+    from typing_extensions import Annotated, get_args, get_origin
+
+from pydantic import BaseModel
+from typing_extensions import is_typeddict
+from werkzeug.datastructures import MultiDict
+
+from .converters import SEQUENCE_TYPES, field_annotations
+from .exceptions import QueryParsingError
+
+QUERY_STYLE_FLAT = "flat"
+QUERY_STYLE_DEEP = "deep"
+QUERY_STYLES = (QUERY_STYLE_FLAT, QUERY_STYLE_DEEP)
+
+_VALUE, _LIST, _OBJECT, _MAP = "value", "list", "object", "map"
+_KEY = re.compile(r"([^\[\]]+)((?:\[[^\[\]]*\])*)")
+_SEGMENT = re.compile(r"\[([^\[\]]*)\]")
+
+
+class QueryNode:
+    """node of compiled field tree of a query model"""
+
+    __slots__ = ("kind", "keys", "children", "item")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        # field names and aliases of an object mapped to keys of the model input
+        self.keys: Dict[str, str] = {}
+        self.children: Dict[str, "QueryNode"] = {}
+        # value node of a mapping
+        self.item: Optional["QueryNode"] = None
+
+    def __repr__(self) -> str:
+        return f"<QueryNode {self.kind} {sorted(self.keys)}>"
+
+    def child(self, key: str) -> Tuple[Optional[str], Optional["QueryNode"]]:
+        if self.kind == _MAP:
+            return key, self.item
+        input_key = self.keys.get(key)
+        if input_key is None:
+            return None, None
+        return input_key, self.children[input_key]
+
+
+def _is_model(type_: Any) -> bool:
+    return isinstance(type_, type) and issubclass(type_, BaseModel)
+
+
+def _is_object(type_: Any) -> bool:
+    return _is_model(type_) or is_dataclass(type_) or is_typeddict(type_)
+
+
+def _object_fields(type_: Any) -> Dict[str, Tuple[str, Any]]:
+    """fields of a nested type, `{name or alias: (input key, annotation)}`"""
+    fields = {}
+    if _is_model(type_):
+        for name, field in type_.model_fields.items():
+            key = field.alias or name
+            fields[name] = fields[key] = (key, field.annotation)
+        return fields
+    return {name: (name, hint) for name, hint in field_annotations(type_).items()}
+
+
+def _compile(type_: Any, nodes: Dict[Any, QueryNode]) -> QueryNode:
+    origin = get_origin(type_)
+    if origin is Annotated:
+        return _compile(get_args(type_)[0], nodes)
+    if origin is Union:
+        args = [arg for arg in get_args(type_) if arg is not type(None)]
+        nested = [arg for arg in args if _is_object(arg) or get_origin(arg)]
+        return _compile(nested[0] if nested else args[0], nodes)
+    if origin in SEQUENCE_TYPES:
+        return QueryNode(_LIST)
+    if origin is dict:
+        node = QueryNode(_MAP)
+        args = get_args(type_)
+        node.item = _compile(args[1], nodes) if args else QueryNode(_VALUE)
+        return node
+    if not _is_object(type_):
+        return QueryNode(_VALUE)
+    if type_ in nodes:
+        # recursive model
+        return nodes[type_]
+    node = nodes[type_] = QueryNode(_OBJECT)
+    for name, (key, annotation) in _object_fields(type_).items():
+        node.keys[name] = key
+        if key not in node.children:
+            node.children[key] = _compile(annotation, nodes)
+    return node
+
+
+def _error(loc: List[str], msg: str, type_: str) -> dict:
+    return {"loc": loc, "msg": msg, "type": type_}
+
+
+class QueryParser:
+    """
+    Parser of query parameters compiled from the query model
+
+    :param model: query model (pydantic model, dataclass or TypedDict), fields of
+        nested types are filled from `key[field]` parameters
+    :param nested: whether bracket notation of nested fields is parsed
+    :param delimiter: if given, values of list fields are split by it (e. g.
+        `sort=-created,id`), repeated keys are still collected into the list
+    """
+
+    def __init__(
+        self, model: Any, nested: bool = True, delimiter: Optional[str] = None
+    ):
+        self.model = model
+        self.nested = nested
+        self.delimiter = delimiter
+        self.root = _compile(model, {})
+        self.has_lists = self._has_lists(self.root, set())
+
+    def __repr__(self) -> str:
+        return f"<QueryParser {self.root!r}>"
+
+    def _has_lists(self, node: QueryNode, seen: set) -> bool:
+        if id(node) in seen:
+            return False
+        seen.add(id(node))
+        nodes = list(node.children.values())
+        if node.item is not None:
+            nodes.append(node.item)
+        return node.kind == _LIST or any(self._has_lists(n, seen) for n in nodes)
+
+    def parse(self, query: MultiDict) -> dict:
+        """
+        converts query parameters to (nested) dictionary of model input
+
+        :raises QueryParsingError: if a key doesn't match the model's fields
+        """
+        result: dict = {}
+        errors = []
+        for key, values in query.lists():
+            path = self._path(key) if self.nested and "[" in key else [key]
+            if path is None:
+                errors.append(_error([key], "Invalid query parameter", "query_key"))
+                continue
+            error = self._set(result, path, values)
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise QueryParsingError(errors)
+        return result
+
+    @staticmethod
+    def _path(key: str) -> Optional[List[str]]:
+        match = _KEY.fullmatch(key)
+        if match is None:
+            return None
+        return [match.group(1), *_SEGMENT.findall(match.group(2))]
+
+    def _set(self, result: dict, path: List[str], values: List[str]) -> Optional[dict]:
+        node = self.root
+        target = result
+        loc: List[str] = []
+        last = len(path) - 1
+        for index, segment in enumerate(path):
+            if segment == "" and node.kind == _LIST:
+                # `tags[]=a&tags[]=b`
+                continue
+            if node.kind not in (_OBJECT, _MAP):
+                return _error(
+                    loc + [segment],
+                    "Field doesn't have nested parameters",
+                    "query_nesting",
+                )
+            key, child = node.child(segment)
+            if child is None:
+                if index == last == 0:
+                    # unknown top level keys are left to the model
+                    result[segment] = values[0]
+                    return None
+                return _error(
+                    loc + [segment], "Extra inputs are not permitted", "extra_forbidden"
+                )
+            loc.append(key)
+            node = child
+            if index < last and path[index + 1 :] != [""]:
+                nested = target.setdefault(key, {})
+                if not isinstance(nested, dict):
+                    return _error(loc, "Conflicting query parameters", "query_nesting")
+                target = nested
+            else:
+                break
+        return self._set_value(target, loc, node, values)
+
+    def _set_value(
+        self, target: dict, loc: List[str], node: QueryNode, values: List[str]
+    ) -> Optional[dict]:
+        key = loc[-1]
+        if node.kind == _LIST:
+            if self.delimiter:
+                values = [
+                    item for value in values for item in value.split(self.delimiter)
+                ]
+            items = target.setdefault(key, [])
+            if not isinstance(items, list):
+                return _error(loc, "Conflicting query parameters", "query_nesting")
+            items.extend(values)
+            return None
+        if node.kind in (_OBJECT, _MAP) and self.nested:
+            return _error(
+                loc, f"Input should be given as {key}[field]=value", "query_nesting"
+            )
+        if key in target:
+            return _error(loc, "Conflicting query parameters", "query_nesting")
+        target[key] = values[0]
+        return None
+
+
+def query_parser(
+    model: Any, style: Optional[str] = None, delimiter: Optional[str] = None
+) -> Optional[QueryParser]:
+    """
+    compiles parser of the query model for given style (None for flat queries
+    without list delimiter, which are converted by `convert_multi_dict`)
+
+    :raises ValueError: if the style is unknown
+    """
+    style = style or QUERY_STYLE_FLAT
+    if style not in QUERY_STYLES:
+        raise ValueError(
+            f"Unknown query style '{style}', use one of {', '.join(QUERY_STYLES)}."
+        )
+    if model is None or (style == QUERY_STYLE_FLAT and not delimiter):
+        return None
+    return QueryParser(model, nested=style == QUERY_STYLE_DEEP, delimiter=delimiter)
@@ -0,0 +1,75 @@
+import threading
+import weakref
+from itertools import count
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from flask import Flask
+
+from .spec import RouteSpec, get_route_spec
+
+_specs: "weakref.WeakValueDictionary[int, RouteSpec]" = weakref.WeakValueDictionary()
+_counter = count()
+_lock = threading.Lock()
+
+
+class ValidatedRoute(NamedTuple):
+    """validated route of a flask application"""
+
+    endpoint: str
+    rules: Tuple[str, ...]
+    methods: Tuple[str, ...]
+    spec: RouteSpec
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "rules": list(self.rules),
+            "methods": list(self.methods),
+            **self.spec.describe(),
+        }
+
+
+def register(spec: RouteSpec) -> None:
+    """registers spec of a function decorated by `validate`"""
+    with _lock:
+        _specs[next(_counter)] = spec
+
+
+def registered_specs() -> List[RouteSpec]:
+    """specs of all (still alive) functions decorated by `validate`"""
+    with _lock:
+        return list(_specs.values())
+
+
+def validated_routes(app: Flask) -> Iterator[ValidatedRoute]:
+    """
+    iterates over routes of the application which are decorated by `validate`
+
+    :param app: flask application
+    """
+    rules: Dict[str, List[Any]] = {}
+    for rule in app.url_map.iter_rules():
+        rules.setdefault(rule.endpoint, []).append(rule)
+    for endpoint, view_func in app.view_functions.items():
+        spec = get_route_spec(view_func)
+        if spec is None:
+            continue
+        endpoint_rules = rules.get(endpoint, [])
+        methods = sorted(
+            {method for rule in endpoint_rules for method in (rule.methods or ())}
+            - {"HEAD", "OPTIONS"}
+        )
+        yield ValidatedRoute(
+            endpoint=endpoint,
+            rules=tuple(rule.rule for rule in endpoint_rules),
+            methods=tuple(methods),
+            spec=spec,
+        )
+
+
+def find_route(app: Flask, endpoint: str) -> Optional[ValidatedRoute]:
+    """returns validated route of given endpoint (or None)"""
+    for route in validated_routes(app):
+        if route.endpoint == endpoint:
+            return route
+    return None
@@ -0,0 +1,259 @@
+"""
+Response cache shared by all worker processes of a node.
+
+Serialized responses are stored in fixed-size slots of a memory-mapped file, so a
+response serialized by one worker is served by all workers without any external
+service. Slots are grouped into windows of `ways` slots, a key can be stored only
+in the window selected by its hash (set-associative hash index). When the window
+is full, a slot is evicted by the clock (second chance) algorithm.
+
+Writers lock the byte range of the window (`fcntl.lockf`, which excludes other
+processes) and a process-local lock. Readers don't lock, every slot has a sequence
+number which is odd while the slot is written (seqlock), torn reads are detected
+by the sequence number and CRC of the data and treated as misses.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional
+
+from .cache import CacheStats
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # without record locks the cache is safe for threads of a single process only
+    fcntl = None
+
+MAGIC = b"FPRC"
+VERSION = 1
+# magic, version, slots, slot size, ways
+_HEADER = struct.Struct("<4sHIII")
+HEADER_SIZE = 64
+# sequence, key, expiration (0 - never), referenced bit, status code, content type
+# length, body length, CRC of content type and body
+_SLOT = struct.Struct("<Q16sdBHHII")
+_REF_OFFSET = 32
+_EMPTY_KEY = bytes(16)
+
+
+class CachedResponse(NamedTuple):
+    """serialized response stored in the cache"""
+
+    status: int
+    content_type: str
+    body: bytes
+
+
+class SharedResponseCache:
+    """
+    Cache of serialized responses in a memory-mapped file shared by processes
+
+    Create the cache before workers are forked (e. g. at module level of the
+    application) or in every worker with the same path and geometry.
+
+    :param path: path of the cache file, created if it doesn't exist
+    :param slots: number of slots (maximal number of cached responses)
+    :param slot_size: size of a slot in bytes, larger responses are not cached
+    :param ways: number of slots a key can be stored in
+    :param ttl: default time (in seconds) after which responses expire
+    :raises ValueError: if the existing file has different geometry
+    """
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 4096,
+        slot_size: int = 16 * 1024,
+        ways: int = 8,
+        ttl: Optional[float] = None,
+    ):
+        if ways < 1 or ways > 255 or slots % ways:
+            raise ValueError("Number of slots must be a multiple of ways (1-255).")
+        if slot_size <= _SLOT.size:
+            raise ValueError(f"Slot size must be larger than {_SLOT.size} bytes.")
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.ways = ways
+        self.ttl = ttl
+        self.windows = slots // ways
+        # clock hands of windows follow the header
+        self._slots_offset = HEADER_SIZE + self.windows
+        self.size = self._slots_offset + slots * slot_size
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._init_file()
+            self._mmap = mmap.mmap(self._fd, self.size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def __repr__(self) -> str:
+        return f"<SharedResponseCache {self.path} {self.slots}x{self.slot_size}>"
+
+    def _init_file(self) -> None:
+        header = _HEADER.pack(
+            MAGIC, VERSION, self.slots, self.slot_size, self.ways
+        ).ljust(HEADER_SIZE, b"\0")
+        with self._locked(0, HEADER_SIZE):
+            existing = os.pread(self._fd, HEADER_SIZE, 0)
+            if existing == header and os.fstat(self._fd).st_size == self.size:
+                return
+            if existing.strip(b"\0"):
+                raise ValueError(
+                    f"Cache file {self.path} exists with different geometry."
+                )
+            os.ftruncate(self._fd, self.size)
+            os.pwrite(self._fd, header, 0)
+
+    @contextmanager
+    def _locked(self, offset: int, length: int) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset, os.SEEK_SET)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset, os.SEEK_SET)
+
+    def _window(self, key: bytes) -> int:
+        return int.from_bytes(key[:8], "little") % self.windows
+
+    def _slot_offset(self, window: int, way: int) -> int:
+        return self._slots_offset + (window * self.ways + way) * self.slot_size
+
+    def get(self, key: bytes) -> Optional[CachedResponse]:
+        """
+        returns cached response of the key (16 bytes digest)
+
+        Missing, expired and concurrently written responses are misses.
+        """
+        mm = self._mmap
+        window = self._window(key)
+        for way in range(self.ways):
+            offset = self._slot_offset(window, way)
+            seq, slot_key, expires, _, status, type_len, body_len, crc = (
+                _SLOT.unpack_from(mm, offset)
+            )
+            if slot_key != key:
+                continue
+            start = offset + _SLOT.size
+            data = mm[start : start + type_len + body_len]
+            if (
+                seq & 1
+                or _SLOT.unpack_from(mm, offset)[0] != seq
+                or zlib.crc32(data) != crc
+                or (expires and expires <= time.time())
+            ):
+                break
+            mm[offset + _REF_OFFSET] = 1
+            self.hits += 1
+            return CachedResponse(
+                status, data[:type_len].decode("latin-1"), data[type_len:]
+            )
+        self.misses += 1
+        return None
+
+    def set(
+        self, key: bytes, response: CachedResponse, ttl: Optional[float] = None
+    ) -> bool:
+        """
+        stores the response, a slot of the key's window is evicted if it is full
+
+        :return: whether the response was stored (it fits into a slot)
+        """
+        content_type = response.content_type.encode("latin-1")
+        data = content_type + response.body
+        if _SLOT.size + len(data) > self.slot_size:
+            return False
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else 0.0
+        window = self._window(key)
+        start = self._slot_offset(window, 0)
+        with self._locked(start, self.ways * self.slot_size):
+            way = self._choose_way(window, key)
+            offset = self._slot_offset(window, way)
+            mm = self._mmap
+            seq = _SLOT.unpack_from(mm, offset)[0]
+            # odd sequence marks the slot as being written
+            struct.pack_into("<Q", mm, offset, seq + 1)
+            mm[offset + _SLOT.size : offset + _SLOT.size + len(data)] = data
+            _SLOT.pack_into(
+                mm,
+                offset,
+                seq + 1,
+                key,
+                expires,
+                0,
+                response.status,
+                len(content_type),
+                len(response.body),
+                zlib.crc32(data),
+            )
+            struct.pack_into("<Q", mm, offset, seq + 2)
+        return True
+
+    def _choose_way(self, window: int, key: bytes) -> int:
+        mm = self._mmap
+        now = time.time()
+        for way in range(self.ways):
+            _, slot_key, expires = _SLOT.unpack_from(
+                mm, self._slot_offset(window, way)
+            )[:3]
+            if slot_key in (key, _EMPTY_KEY) or (expires and expires <= now):
+                return way
+        # clock: referenced slots get a second chance
+        hand_offset = HEADER_SIZE + window
+        hand = mm[hand_offset] % self.ways
+        while True:
+            ref_offset = self._slot_offset(window, hand) + _REF_OFFSET
+            if not mm[ref_offset]:
+                mm[hand_offset] = (hand + 1) % self.ways
+                return hand
+            mm[ref_offset] = 0
+            hand = (hand + 1) % self.ways
+
+    def delete(self, key: bytes) -> None:
+        window = self._window(key)
+        start = self._slot_offset(window, 0)
+        with self._locked(start, self.ways * self.slot_size):
+            for way in range(self.ways):
+                offset = self._slot_offset(window, way)
+                if _SLOT.unpack_from(self._mmap, offset)[1] == key:
+                    seq = _SLOT.unpack_from(self._mmap, offset)[0]
+                    struct.pack_into("<Q16s", self._mmap, offset, seq + 2, _EMPTY_KEY)
+
+    def clear(self) -> None:
+        """removes all responses (of all processes) and resets counters"""
+        with self._locked(self._slots_offset, self.slots * self.slot_size):
+            for slot in range(self.slots):
+                offset = self._slots_offset + slot * self.slot_size
+                seq = _SLOT.unpack_from(self._mmap, offset)[0]
+                struct.pack_into("<Q16s", self._mmap, offset, seq + 2, _EMPTY_KEY)
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        """number of occupied slots"""
+        return sum(
+            _SLOT.unpack_from(self._mmap, self._slots_offset + slot * self.slot_size)[1]
+            != _EMPTY_KEY
+            for slot in range(self.slots)
+        )
+
+    def stats(self) -> CacheStats:
+        """hits and misses of this process, size of the shared cache"""
+        return CacheStats(self.hits, self.misses, len(self), self.slots)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
@@ -0,0 +1,213 @@
+import re
+from decimal import Decimal
+from enum import Enum
+from itertools import count
+from typing import Any, Callable, Dict, FrozenSet, Tuple, Type, Union
+from uuid import UUID
+
+try:
+    from typing import Literal, get_args, get_origin
+except ImportError:
+    from typing_extensions import Literal, get_args, get_origin
+
+try:
+    from typing import Annotated
+except ImportError:
+    from typing_extensions import Annotated
+
+from pydantic import TypeAdapter
+from pydantic import ValidationError as PydanticValidationError
+from werkzeug.routing import BaseConverter, ValidationError
+
+from .spec import NON_PATH_ANNOTATIONS
+
+# rule variables without an explicit converter, e. g. `<user_id>`
+_PLAIN_RULE_VARIABLE = re.compile(r"<([a-zA-Z_][a-zA-Z0-9_]*)>")
+_CONVERTED_PATH_PARAMS_ATTR = "_flask_pydantic_converted_path_params"
+
+_INT_REGEX = r"[+-]?\d+"
+_FLOAT_REGEX = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+_UUID_REGEX = (
+    r"[A-Fa-f0-9]{8}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{12}"
+)
+
+_converters: Dict[Any, Tuple[str, Type["PydanticConverter"]]] = {}
+_counter = count()
+
+
+class PydanticConverter(BaseConverter):
+    """Base class of converters generated by `path_converter`.
+
+    URL parts not matching `regex` are never routed to the view, parts matching it
+    are validated by pydantic and values which fail the validation make the rule
+    not match (werkzeug tries the next rule or responds with 404).
+    """
+
+    adapter: TypeAdapter
+
+    def to_python(self, value: str) -> Any:
+        try:
+            return self.adapter.validate_strings(value)
+        except PydanticValidationError:
+            raise ValidationError()
+
+    def to_url(self, value: Any) -> str:
+        return super().to_url(self.adapter.dump_python(value, mode="json"))
+
+
+def _unwrap(type_: Any) -> Any:
+    """strips `Annotated` metadata (constraints are checked by the adapter)"""
+    while get_origin(type_) is Annotated:
+        type_ = get_args(type_)[0]
+    return type_
+
+
+def _alternatives(values) -> str:
+    # longest alternatives first so that regex alternation prefers full matches
+    escaped = sorted({re.escape(str(v)) for v in values}, key=len, reverse=True)
+    return "(?:" + "|".join(escaped) + ")"
+
+
+def _regex_for(type_: Any) -> Tuple[str, int]:
+    """
+    returns regular expression matching URL part of given type and converter weight
+
+    lower weight means the rule is tried sooner by werkzeug router
+    """
+    type_ = _unwrap(type_)
+    origin = get_origin(type_)
+    if origin is Literal:
+        return _alternatives(get_args(type_)), 20
+    if origin is Union:
+        regexes = [_regex_for(t) for t in get_args(type_) if t is not type(None)]
+        if regexes and all(weight < 100 for _, weight in regexes):
+            pattern = "|".join(regex for regex, _ in regexes)
+            return f"(?:{pattern})", max(weight for _, weight in regexes)
+        return BaseConverter.regex, BaseConverter.weight
+    if isinstance(type_, type):
+        if issubclass(type_, Enum):
+            return _alternatives(member.value for member in type_), 20
+        if issubclass(type_, bool):
+            return BaseConverter.regex, BaseConverter.weight
+        if issubclass(type_, int):
+            return _INT_REGEX, 50
+        if issubclass(type_, (float, Decimal)):
+            return _FLOAT_REGEX, 50
+        if issubclass(type_, UUID):
+            return _UUID_REGEX, 30
+    return BaseConverter.regex, BaseConverter.weight
+
+
+def path_converter(type_: Any) -> Tuple[str, Type[PydanticConverter]]:
+    """
+    returns name and werkzeug converter class for given type
+
+    Converters are created once per type and reused by all rules.
+    """
+    key = type_
+    try:
+        return _converters[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # unhashable annotation metadata, converter can not be shared
+        key = object()
+    index = next(_counter)
+    regex, weight = _regex_for(type_)
+    converter = type(
+        f"PydanticConverter{index}",
+        (PydanticConverter,),
+        {"regex": regex, "weight": weight, "adapter": TypeAdapter(type_)},
+    )
+    _converters[key] = (f"pydantic_{index}", converter)
+    return _converters[key]
+
+
+def typed_rule(
+    rule: str, func: Callable
+) -> Tuple[str, Dict[str, Type[PydanticConverter]], FrozenSet[str]]:
+    """
+    rewrites URL rule so that its annotated variables use generated converters
+
+    Only variables without explicit converter (e. g. `<user_id>`, not
+    `<int:user_id>`) are rewritten.
+
+    :param rule: URL rule
+    :param func: view function (possibly decorated by `validate`)
+    :return: tuple of rewritten rule, converters to register in application's
+        url map and names of converted variables
+    """
+    annotations = getattr(func, "__annotations__", {})
+    converters = {}
+    converted = set()
+
+    def replace(match) -> str:
+        name = match.group(1)
+        if name in NON_PATH_ANNOTATIONS or name not in annotations:
+            return match.group(0)
+        converter_name, converter = path_converter(annotations[name])
+        converters[converter_name] = converter
+        converted.add(name)
+        return f"<{converter_name}:{name}>"
+
+    return _PLAIN_RULE_VARIABLE.sub(replace, rule), converters, frozenset(converted)
+
+
+def route(scaffold, rule: str, **options: Any) -> Callable:
+    """
+    Replacement for `app.route`/`blueprint.route` which lets werkzeug router convert
+    annotated path parameters.
+
+    URL parts which can not be validated against the annotation are rejected by
+    the router itself (404 or another matching rule is used), the view receives
+    already typed values and `validate` skips their validation.
+
+    example::
+
+        from uuid import UUID
+        from flask_pydantic import route, validate
+
+        @route(app, "/users/<user_id>", methods=["GET"])
+        @validate()
+        def get_user(user_id: UUID):
+            ...
+
+    :param scaffold: flask application or blueprint
+    :param rule: URL rule
+    :param options: options passed to `add_url_rule`
+    """
+
+    def decorator(func: Callable) -> Callable:
+        rewritten, converters, converted = typed_rule(rule, func)
+        register_converters(scaffold, converters)
+        # mark every function of the decorator chain, so that `validate` finds
+        # the marker on its wrapper even under other decorators
+        wrapped = func
+        while wrapped is not None:
+            setattr(wrapped, _CONVERTED_PATH_PARAMS_ATTR, converted)
+            wrapped = getattr(wrapped, "__wrapped__", None)
+        # the decorator can be applied more than once, keep options intact
+        rule_options = dict(options)
+        endpoint = rule_options.pop("endpoint", None)
+        scaffold.add_url_rule(rewritten, endpoint, func, **rule_options)
+        return func
+
+    return decorator
+
+
+def register_converters(scaffold, converters: Dict[str, Type[BaseConverter]]) -> None:
+    """registers converters in application's url map (deferred for blueprints)"""
+    if not converters:
+        return
+    url_map = getattr(scaffold, "url_map", None)
+    if url_map is not None:
+        url_map.converters.update(converters)
+    else:
+        scaffold.record_once(
+            lambda state: state.app.url_map.converters.update(converters)
+        )
+
+
+def converted_path_params(func: Callable) -> FrozenSet[str]:
+    """names of path parameters already converted by generated converters"""
+    return getattr(func, _CONVERTED_PATH_PARAMS_ATTR, frozenset())
@@ -0,0 +1,92 @@
+"""
+Coalescing of identical concurrent requests (singleflight).
+
+The first request of a key executes the route, concurrent requests of the same key
+wait for it and receive a copy of its serialized response.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from pydantic_core import to_json
+
+from .cache import CacheStats, digest
+
+
+class SharedResponse(NamedTuple):
+    """serialized response shared by coalesced requests"""
+
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+
+
+class SingleFlight:
+    """
+    Executes a function once for concurrent calls with the same key
+
+    Calls waiting for the result (for at most `timeout` seconds) receive the
+    (shared copy of) result of the first call. If the first call fails or its
+    result can't be shared (`None`), waiting calls execute the function themselves.
+    """
+
+    def __init__(self):
+        self.hits = self.misses = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """number of keys in flight"""
+        return len(self._flights)
+
+    def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Any],
+        share: Callable[[Any], Any] = lambda result: result,
+        timeout: Optional[float] = None,
+    ) -> Tuple[Any, bool]:
+        """
+        :param share: converts result of the first call to the result received by
+            waiting calls (e. g. response to its serialized copy)
+        :param timeout: maximal time (in seconds) to wait for the first call
+        :return: result of the function (or its shared copy) and whether it was
+            shared by another call
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+        if not leader:
+            if flight.done.wait(timeout) and flight.result is not None:
+                with self._lock:
+                    self.hits += 1
+                return flight.result, True
+            return func(), False
+        try:
+            result = func()
+            flight.result = share(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, len(self._flights))
+
+
+def singleflight_key(*parts: Any) -> bytes:
+    """key of validated request inputs (models, dataclasses, dicts, ...)"""
+    return digest(to_json(parts, fallback=repr))
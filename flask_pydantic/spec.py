@@ -0,0 +1,280 @@
+import time
+import warnings
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
+
+try:
+    from typing import get_args
+except ImportError:
+    from typing_extensions import get_args
+
+from pydantic import BaseModel, RootModel, TypeAdapter
+
+from .cache import LRUCache, is_frozen
+from .converters import list_fields
+from .query import QueryParser, query_parser
+from .singleflight import SingleFlight
+from .uploads import UploadField, upload_fields
+
+SPEC_ATTRIBUTE = "__flask_pydantic_spec__"
+NON_PATH_ANNOTATIONS = frozenset({"query", "body", "form", "return"})
+# pydantic's string mode (used for strings in strict mode) is available since 2.6
+STRING_MODE = hasattr(TypeAdapter, "validate_strings")
+
+
+def is_model_class(type_: Any) -> bool:
+    return isinstance(type_, type) and issubclass(type_, BaseModel)
+
+
+def is_root_model_class(type_: Any) -> bool:
+    return isinstance(type_, type) and issubclass(type_, RootModel)
+
+
+@lru_cache(maxsize=None)
+def _cached_type_adapter(type_: Any) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def type_adapter(type_: Any) -> TypeAdapter:
+    """
+    returns type adapter of given type
+
+    Adapters are built once per type and shared by all routes.
+    """
+    try:
+        return _cached_type_adapter(type_)
+    except TypeError:
+        # unhashable type, adapter can not be cached
+        return TypeAdapter(type_)
+
+
+def type_name(type_: Any) -> Optional[str]:
+    if type_ is None:
+        return None
+    if isinstance(type_, type):
+        return type_.__qualname__
+    return repr(type_).replace("typing.", "")
+
+
+class RouteSpec:
+    """
+    Validation specification of a route function decorated by `validate`
+
+    Holds models of all request parameter sources and pydantic adapters built for
+    the route. Adapters are built lazily on the first request unless `build` is
+    called beforehand (e. g. by `FlaskPydantic.warmup`).
+    """
+
+    def __init__(
+        self,
+        func: Optional[Callable] = None,
+        body: Optional[Any] = None,
+        query: Optional[Any] = None,
+        form: Optional[Any] = None,
+        **options: Any,
+    ):
+        annotations = func.__annotations__ if func is not None else {}
+        self.func = func
+        self.query_in_kwargs = annotations.get("query")
+        self.body_in_kwargs = annotations.get("body")
+        self.form_in_kwargs = annotations.get("form")
+        self.query_model = self.query_in_kwargs or query
+        self.body_model = self.body_in_kwargs or body
+        self.form_model = self.form_in_kwargs or form
+        # fields receiving all values of repeated query or form keys
+        self.query_list_fields = list_fields(self.query_model)
+        self.query_parser: Optional[QueryParser] = query_parser(
+            self.query_model, options.get("query_style"), options.get("query_delimiter")
+        )
+        self.form_list_fields = list_fields(self.form_model)
+        self.response_annotation = annotations.get("return")
+        self.path_annotations = {
+            name: type_
+            for name, type_ in annotations.items()
+            if name not in NON_PATH_ANNOTATIONS
+        }
+        self.options = options
+        self.build_time: Optional[float] = None
+        self._path_adapters: Optional[Dict[str, TypeAdapter]] = None
+        self._upload_fields: Optional[Dict[str, UploadField]] = None
+        self.query_cache = self._cache("query", options.get("query_cache"))
+        self.body_cache = self._cache(
+            "body", options.get("body_cache"), options.get("body_cache_ttl")
+        )
+        self.flights = SingleFlight() if options.get("singleflight") else None
+        self.strict_checked = False
+        if options.get("strict"):
+            self.check_strict()
+
+    def _cache(
+        self, source: str, size: Optional[int], ttl: Optional[float] = None
+    ) -> Optional[LRUCache]:
+        model = getattr(self, f"{source}_model")
+        if not size or model is None:
+            return None
+        reason = None
+        if not is_frozen(model):
+            reason = f"{type_name(model)} is not frozen or has mutable fields"
+        elif source == "body" and self.options.get("request_body_many"):
+            reason = "lists of models are mutable"
+        if reason is not None:
+            warnings.warn(
+                f"{source}_cache of {self.name} is disabled, {reason}.", stacklevel=4
+            )
+            return None
+        return LRUCache(size, ttl)
+
+    def check_strict(self, stacklevel: int = 4) -> None:
+        """
+        warns about string parameters which are validated in lax mode although
+        strict mode is used (string mode of older pydantic versions is missing,
+        string mode doesn't support lists)
+        """
+        self.strict_checked = True
+        query_lists = (
+            self.query_parser.has_lists
+            if self.query_parser is not None
+            else self.query_list_fields
+        )
+        if STRING_MODE:
+            reason = "list fields are not supported by pydantic's string mode"
+            lax = {"query": query_lists, "form": self.form_list_fields}
+        else:
+            reason = "string mode requires pydantic 2.6 or newer"
+            lax = {"query": True, "form": True, "path": True}
+        used = {
+            "query": self.query_model,
+            "form": self.form_model,
+            "path": self.path_annotations,
+        }
+        sources = [source for source in used if used[source] and lax.get(source)]
+        if not sources:
+            return
+        warnings.warn(
+            f"{', '.join(sources)} parameters of {self.name} are validated in lax "
+            f"mode in strict mode, {reason}.",
+            stacklevel=stacklevel,
+        )
+
+    def caches(self) -> Dict[str, Any]:
+        """enabled caches of validated parameters by source"""
+        caches = {
+            "query": self.query_cache,
+            "body": self.body_cache,
+            "response": self.options.get("response_cache"),
+            "singleflight": self.flights,
+        }
+        return {source: cache for source, cache in caches.items() if cache is not None}
+
+    def __repr__(self) -> str:
+        return f"<RouteSpec {self.name}>"
+
+    @property
+    def name(self) -> str:
+        if self.func is None:
+            return "<no function>"
+        return f"{self.func.__module__}.{self.func.__qualname__}"
+
+    @property
+    def built(self) -> bool:
+        return self.build_time is not None
+
+    @property
+    def path_adapters(self) -> Dict[str, TypeAdapter]:
+        """type adapters of annotated path parameters"""
+        if self._path_adapters is None:
+            self._path_adapters = {
+                name: TypeAdapter(type_)
+                for name, type_ in self.path_annotations.items()
+            }
+        return self._path_adapters
+
+    @property
+    def upload_fields(self) -> Dict[str, UploadField]:
+        """`UploadFile` fields of the form model"""
+        if self._upload_fields is None:
+            self._upload_fields = (
+                upload_fields(self.form_model) if self.form_model else {}
+            )
+        return self._upload_fields
+
+    @property
+    def response_model(self) -> Optional[Type[BaseModel]]:
+        """model of annotated response (e. g. `List[Model]`)"""
+        response = self.response_annotation
+        for type_ in (response, *get_args(response)):
+            if is_model_class(type_):
+                return type_
+        return None
+
+    def models(self) -> Iterator[Type[BaseModel]]:
+        """pydantic models used by the route (including annotated response)"""
+        for model in self.request_types():
+            if is_model_class(model):
+                yield model
+        response = self.response_annotation
+        for type_ in (response, *get_args(response)):
+            if is_model_class(type_):
+                yield type_
+
+    def request_types(self) -> Iterator[Any]:
+        """types of query, body and form parameters used by the route"""
+        for type_ in (self.query_model, self.body_model, self.form_model):
+            if type_ is not None:
+                yield type_
+
+    def describe(self) -> Dict[str, Any]:
+        """JSON serializable description of the route's validation setup"""
+        return {
+            "function": self.name,
+            "query": type_name(self.query_model),
+            "body": type_name(self.body_model),
+            "form": type_name(self.form_model),
+            "path": {
+                name: type_name(type_) for name, type_ in self.path_annotations.items()
+            },
+            "response": type_name(self.response_annotation),
+            "options": {
+                name: value if isinstance(value, (bool, int, str)) else repr(value)
+                for name, value in self.options.items()
+                if value is not None
+            },
+            "built": self.built,
+            "build_time": self.build_time,
+            "adapters": sorted(self._path_adapters or ()),
+            "caches": {
+                source: cache.stats().as_dict()
+                for source, cache in self.caches().items()
+            },
+        }
+
+    def build(self) -> float:
+        """
+        builds all validators and serializers used by the route
+
+        :return: build time in seconds
+        """
+        start = time.perf_counter()
+        self.path_adapters
+        self.upload_fields
+        for model in self.models():
+            if not model.__pydantic_complete__:
+                # models with `defer_build=True` are built on first use otherwise
+                model.model_rebuild()
+        for type_ in self.request_types():
+            if not is_model_class(type_):
+                type_adapter(type_)
+                if self.options.get("request_body_many") and type_ is self.body_model:
+                    type_adapter(List[type_])
+        self.build_time = time.perf_counter() - start
+        return self.build_time
+
+
+def get_route_spec(view_func: Callable) -> Optional[RouteSpec]:
+    """returns spec of a view function decorated by `validate` (or None)"""
+    while view_func is not None:
+        spec = getattr(view_func, SPEC_ATTRIBUTE, None)
+        if spec is not None:
+            return spec
+        view_func = getattr(view_func, "__wrapped__", None)
+    return None
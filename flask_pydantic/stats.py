@@ -0,0 +1,492 @@
+"""
+Per-route performance statistics.
+
+`PerfStats` instrument records latencies of phases of validated requests (in
+nanoseconds), request and response sizes and validation errors by source into
+HDR-style histograms. Every thread records into its own buckets, so nothing is
+locked on the request path, buckets are merged when statistics are read (values
+of requests in progress may be incomplete).
+
+Histograms can be merged, so statistics of worker processes written to a shared
+directory are aggregated by `flask pydantic stats --dir`.
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask, Response, jsonify, request
+
+from .instrumentation import Instrument
+from .spec import RouteSpec
+
+# linear sub-buckets per power of two, relative error of percentiles is < 2 ** -5
+SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+PERCENTILES = (50, 90, 99)
+# latency of the whole validated request
+PHASE_TOTAL = "total"
+
+
+def _bucket_index(value: int) -> int:
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - _SUB_BUCKETS
+
+
+def _bucket_high(index: int) -> int:
+    """highest value counted in the bucket"""
+    if index < _SUB_BUCKETS:
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    mantissa = (index & (_SUB_BUCKETS - 1)) + _SUB_BUCKETS
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """log-linear histogram of non-negative integers (HDR-style)"""
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = self.total = self.max = 0
+        self.min: Optional[int] = None
+
+    def record(self, value: int) -> None:
+        index = _bucket_index(value)
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        counts = self.counts
+        # copy is atomic, other thread may record meanwhile
+        for index, count in other.counts.copy().items():
+            counts[index] = counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> int:
+        """highest value equivalent to the percentile (0 if empty)"""
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_high(index), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min or 0,
+            "max": self.max,
+            "mean": self.mean,
+            **{f"p{percent}": self.percentile(percent) for percent in PERCENTILES},
+            "buckets": {str(index): count for index, count in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        histogram = cls()
+        histogram.counts = {
+            int(index): count for index, count in data["buckets"].items()
+        }
+        histogram.count = data["count"]
+        histogram.total = data["sum"]
+        histogram.min = data["min"] if data["count"] else None
+        histogram.max = data["max"]
+        return histogram
+
+
+def _merge_caches(target: Dict[str, dict], caches: Dict[str, dict]) -> None:
+    for source, stats in caches.items():
+        merged = target.setdefault(source, dict(stats, hits=0, misses=0))
+        merged["hits"] += stats["hits"]
+        merged["misses"] += stats["misses"]
+        total = merged["hits"] + merged["misses"]
+        merged["hit_rate"] = merged["hits"] / total if total else 0.0
+        merged["size"] = max(merged["size"], stats["size"])
+
+
+class EndpointStats:
+    """statistics of an endpoint"""
+
+    __slots__ = (
+        "requests",
+        "phases",
+        "request_bytes",
+        "response_bytes",
+        "errors",
+        "models",
+        "caches",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.phases: Dict[str, Histogram] = {}
+        self.request_bytes = Histogram()
+        self.response_bytes = Histogram()
+        # number of requests with validation errors by source
+        self.errors: Dict[str, int] = {}
+        # names of validated models by phase
+        self.models: Dict[str, str] = {}
+        # statistics of the route's caches (see `RouteSpec.caches`)
+        self.caches: Dict[str, dict] = {}
+
+    def _phase(self, phase: str) -> Histogram:
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = Histogram()
+        return histogram
+
+    def record(
+        self,
+        elapsed: int,
+        durations: Dict[str, int],
+        request_bytes: Optional[int],
+        response_bytes: Optional[int],
+        errors: Dict[str, list],
+    ) -> None:
+        self.requests += 1
+        self._phase(PHASE_TOTAL).record(elapsed)
+        for phase, duration in durations.items():
+            self._phase(phase).record(duration)
+        if request_bytes is not None:
+            self.request_bytes.record(request_bytes)
+        if response_bytes is not None:
+            self.response_bytes.record(response_bytes)
+        for source in errors:
+            self.errors[source] = self.errors.get(source, 0) + 1
+
+    def merge(self, other: "EndpointStats") -> None:
+        self.requests += other.requests
+        for phase, histogram in other.phases.copy().items():
+            self._phase(phase).merge(histogram)
+        self.request_bytes.merge(other.request_bytes)
+        self.response_bytes.merge(other.response_bytes)
+        for source, count in other.errors.copy().items():
+            self.errors[source] = self.errors.get(source, 0) + count
+        self.models.update(other.models.copy())
+        _merge_caches(self.caches, other.caches)
+
+    def error_rates(self) -> Dict[str, float]:
+        """share of requests with validation errors by source"""
+        return {source: count / self.requests for source, count in self.errors.items()}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "phases": {
+                phase: histogram.as_dict() for phase, histogram in self.phases.items()
+            },
+            "request_bytes": self.request_bytes.as_dict(),
+            "response_bytes": self.response_bytes.as_dict(),
+            "errors": self.errors,
+            "error_rates": self.error_rates(),
+            "models": self.models,
+            "caches": self.caches,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EndpointStats":
+        stats = cls()
+        stats.requests = data["requests"]
+        stats.phases = {
+            phase: Histogram.from_dict(histogram)
+            for phase, histogram in data["phases"].items()
+        }
+        stats.request_bytes = Histogram.from_dict(data["request_bytes"])
+        stats.response_bytes = Histogram.from_dict(data["response_bytes"])
+        stats.errors = dict(data["errors"])
+        stats.models = dict(data["models"])
+        stats.caches = {source: dict(cache) for source, cache in data["caches"].items()}
+        return stats
+
+
+def _merge_into(target: Dict[str, EndpointStats], bucket: Dict[str, Any]) -> None:
+    for endpoint, stats in bucket.copy().items():
+        merged = target.get(endpoint)
+        if merged is None:
+            merged = target[endpoint] = EndpointStats()
+        merged.merge(stats)
+
+
+class _Request:
+    __slots__ = ("endpoint", "start", "durations", "models", "request_bytes")
+
+    def __init__(self, endpoint: str, request_bytes: Optional[int]):
+        self.endpoint = endpoint
+        self.request_bytes = request_bytes
+        self.durations: Dict[str, int] = {}
+        self.models: Dict[str, str] = {}
+        self.start = perf_counter_ns()
+
+
+def _response_size(response: Any) -> Optional[int]:
+    if isinstance(response, Response):
+        return response.calculate_content_length()
+    return None
+
+
+class PerfStats(Instrument):
+    """
+    Instrument collecting statistics of all requests of validated routes
+
+    example::
+
+        stats = PerfStats()
+        FlaskPydantic(app, instruments=[stats])
+        app.add_url_rule("/_stats", view_func=stats_view(stats))
+
+    :param directory: directory the statistics of this process are written to
+        (as `<pid>.json`, at most every `flush_interval` seconds), the file is
+        removed at exit
+    :param flush_interval: minimal time (in seconds) between writes
+    :param max_age: time (in seconds) after which files of other processes which
+        weren't written to are stale (files of finished processes always are),
+        stale files are removed when statistics are collected
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        flush_interval: float = 10.0,
+        max_age: Optional[float] = None,
+    ):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_age = max_age
+        self._local = threading.local()
+        self._threads: List[Tuple[threading.Thread, Dict[str, EndpointStats]]] = []
+        # statistics of finished threads
+        self._retired: Dict[str, EndpointStats] = {}
+        self._specs: Dict[str, RouteSpec] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._next_flush = time.monotonic() + flush_interval
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.close)
+
+    def _bucket(self) -> Dict[str, EndpointStats]:
+        try:
+            return self._local.bucket
+        except AttributeError:
+            pass
+        bucket = self._local.bucket = {}
+        with self._lock:
+            self._retire()
+            self._threads.append((threading.current_thread(), bucket))
+        return bucket
+
+    def _retire(self) -> None:
+        alive = []
+        for thread, bucket in self._threads:
+            if thread.is_alive():
+                alive.append((thread, bucket))
+            else:
+                _merge_into(self._retired, bucket)
+        self._threads = alive
+
+    def start_request(self, endpoint: str, spec: RouteSpec) -> _Request:
+        if endpoint not in self._specs:
+            self._specs[endpoint] = spec
+        return _Request(endpoint, request.content_length)
+
+    def start_phase(self, state: _Request, phase: str, attributes: dict) -> int:
+        return perf_counter_ns()
+
+    def end_phase(
+        self,
+        state: _Request,
+        phase: str,
+        token: int,
+        attributes: dict,
+        error: Optional[BaseException],
+    ) -> None:
+        durations = state.durations
+        durations[phase] = durations.get(phase, 0) + perf_counter_ns() - token
+        model = attributes.get("model")
+        if model is not None:
+            state.models[phase] = model
+
+    def end_request(
+        self, state: _Request, response: Any, errors: Dict[str, list]
+    ) -> None:
+        elapsed = perf_counter_ns() - state.start
+        bucket = self._bucket()
+        stats = bucket.get(state.endpoint)
+        if stats is None:
+            stats = bucket[state.endpoint] = EndpointStats()
+        stats.record(
+            elapsed,
+            state.durations,
+            state.request_bytes,
+            _response_size(response),
+            errors,
+        )
+        if len(stats.models) < len(state.models):
+            stats.models.update(state.models)
+        if self.directory is not None and time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def snapshot(self) -> Dict[str, EndpointStats]:
+        """statistics of this process by endpoint"""
+        merged: Dict[str, EndpointStats] = {}
+        with self._lock:
+            self._retire()
+            _merge_into(merged, self._retired)
+            buckets = [bucket for _, bucket in self._threads]
+        for bucket in buckets:
+            _merge_into(merged, bucket)
+        for endpoint, stats in merged.items():
+            stats.caches = {
+                source: cache.stats().as_dict()
+                for source, cache in self._specs[endpoint].caches().items()
+            }
+        return merged
+
+    def collect(self) -> Dict[str, EndpointStats]:
+        """statistics of this process and other processes writing to the directory"""
+        stats = self.snapshot()
+        if self.directory is not None:
+            for endpoint, other in load_stats(
+                self.directory, exclude_pid=os.getpid(), max_age=self.max_age
+            ).items():
+                stats.setdefault(endpoint, EndpointStats()).merge(other)
+        return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self._retired = {}
+            for _, bucket in self._threads:
+                bucket.clear()
+
+    def flush(self) -> None:
+        """writes statistics of this process to the directory"""
+        if self.directory is None or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = time.monotonic() + self.flush_interval
+            path = os.path.join(self.directory, f"{os.getpid()}.json")
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(report(self.snapshot()), f)
+            os.replace(f"{path}.tmp", path)
+        finally:
+            self._flush_lock.release()
+
+    def close(self) -> None:
+        """removes statistics of this process from the directory"""
+        if self.directory is None:
+            return
+        with self._flush_lock:
+            self.directory, directory = None, self.directory
+            try:
+                os.remove(os.path.join(directory, f"{os.getpid()}.json"))
+            except FileNotFoundError:
+                pass
+
+
+def report(stats: Dict[str, EndpointStats]) -> Dict[str, Any]:
+    """JSON serializable statistics"""
+    return {
+        "endpoints": {
+            endpoint: endpoint_stats.as_dict()
+            for endpoint, endpoint_stats in sorted(stats.items())
+        }
+    }
+
+
+def _is_running(pid: int) -> bool:
+    if os.name != "posix":
+        # signals can't probe processes elsewhere
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # process of another user
+        pass
+    return True
+
+
+def _is_stale(path: str, pid: int, max_age: Optional[float]) -> bool:
+    """whether the statistics file is left by a finished (or long idle) process"""
+    if not _is_running(pid):
+        return True
+    return max_age is not None and time.time() - os.path.getmtime(path) > max_age
+
+
+def load_stats(
+    directory: str, exclude_pid: Optional[int] = None, max_age: Optional[float] = None
+) -> Dict[str, EndpointStats]:
+    """
+    merges statistics written to the directory by `PerfStats` of processes
+    running on this host
+
+    Stale files (of finished processes, or not written to for `max_age` seconds)
+    are removed.
+    """
+    merged: Dict[str, EndpointStats] = {}
+    for name in sorted(os.listdir(directory)):
+        pid = name[: -len(".json")]
+        if not name.endswith(".json") or not pid.isdigit() or pid == str(exclude_pid):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if _is_stale(path, int(pid), max_age):
+                os.remove(path)
+                continue
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for endpoint, endpoint_data in data["endpoints"].items():
+            stats = merged.setdefault(endpoint, EndpointStats())
+            stats.merge(EndpointStats.from_dict(endpoint_data))
+    return merged
+
+
+def app_stats(app: Flask) -> Optional[PerfStats]:
+    """`PerfStats` instrument of the application's `FlaskPydantic` extension"""
+    from .extension import EXTENSION_NAME
+
+    extension = app.extensions.get(EXTENSION_NAME)
+    for instrument in getattr(extension, "instruments", ()):
+        if isinstance(instrument, PerfStats):
+            return instrument
+    return None
+
+
+def stats_view(stats: PerfStats) -> Callable:
+    """
+    creates view responding with statistics as JSON (of all processes if they are
+    written to a directory)
+    """
+
+    def flask_pydantic_stats() -> Response:
+        return jsonify(report(stats.collect()))
+
+    return flask_pydantic_stats
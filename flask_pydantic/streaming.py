@@ -0,0 +1,349 @@
+"""
+Incremental parsing and validation of request bodies containing many items
+(`request_body_many`).
+
+Items are read from the request stream and validated one by one (or in batches),
+so memory usage doesn't grow with the size of the body.
+"""
+
+import csv
+import io
+import json
+import re
+from functools import lru_cache
+from itertools import islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .exceptions import ManyModelValidationError
+from .spec import is_model_class, type_adapter
+from .validation import validate_string_model
+
+DEFAULT_CHARSET = "utf-8"
+# size of read buffer of the request stream
+READ_SIZE = 64 * 1024
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+@lru_cache(maxsize=None)
+def csv_field_keys(model: Any) -> Dict[str, str]:
+    """
+    mapping of accepted CSV column names to input keys of model fields
+
+    Both field names and aliases are accepted as column names of pydantic models.
+    """
+    if not is_model_class(model):
+        return {}
+    keys = {}
+    for name, field in model.model_fields.items():
+        key = field.alias or name
+        keys[name] = key
+        keys[key] = key
+        if isinstance(field.validation_alias, str):
+            keys[field.validation_alias] = field.validation_alias
+    return keys
+
+
+def _text_stream(stream: IO[bytes], charset: str) -> io.TextIOWrapper:
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream, READ_SIZE)
+    if charset.lower().replace("_", "-") in ("utf-8", "utf8"):
+        # skip byte order mark written by spreadsheet applications
+        charset = "utf-8-sig"
+    return io.TextIOWrapper(stream, encoding=charset, newline="")
+
+
+def _detach(text: io.TextIOWrapper) -> None:
+    # keep the request stream open when wrappers are garbage collected
+    if text.closed:
+        return
+    buffer = text.detach()
+    if isinstance(buffer, io.BufferedReader):
+        buffer.detach()
+
+
+def _item_errors(ve: ValidationError, offset: int, batch: bool = False) -> list:
+    """errors located by item index (offset of the batch for list validation)"""
+    errors = ve.errors()
+    for error in errors:
+        loc = list(error["loc"])
+        if batch and loc and isinstance(loc[0], int):
+            loc[0] += offset
+        else:
+            loc.insert(0, offset)
+        error["loc"] = loc
+    return errors
+
+
+def _batched(items: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_csv_rows(
+    stream: IO[bytes], model: Any, charset: str = DEFAULT_CHARSET
+) -> Iterator[Dict[str, str]]:
+    """
+    parses CSV from binary stream incrementally, yields rows as dictionaries keyed
+    by input keys of model fields
+
+    The header line is mapped to model fields once. Empty cells are left out, so
+    default values of fields are used for them.
+    """
+    text = _text_stream(stream, charset)
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            return
+        field_keys = csv_field_keys(model)
+        keys = [field_keys.get(column, column) for column in header]
+        for row in reader:
+            yield {key: value for key, value in zip(keys, row) if value != ""}
+    finally:
+        _detach(text)
+
+
+def iter_csv_models(
+    model: Any,
+    stream: IO[bytes],
+    charset: str = DEFAULT_CHARSET,
+    batch_size: Optional[int] = None,
+    strict: bool = False,
+) -> Iterator[Any]:
+    """
+    validates CSV rows read from binary stream incrementally
+
+    Values are validated as strings (in pydantic's string mode in strict mode).
+
+    :param batch_size: if given, lists of validated models of `batch_size` rows are
+        yielded instead of single models
+    :raises ManyModelValidationError: when an invalid row is reached, location of
+        errors is `[row index, column]`, the index is 0-based and doesn't count the
+        header line (as indexes of JSON array items)
+    """
+    rows = iter_csv_rows(stream, model, charset)
+    if batch_size is None or strict:
+        models = _validate_rows(model, rows, strict)
+        return models if batch_size is None else _batched(models, batch_size)
+    return _validate_batches(model, _batched(rows, batch_size))
+
+
+def iter_models(
+    model: Any,
+    items: Iterable[Any],
+    batch_size: Optional[int] = None,
+    strict: bool = False,
+) -> Iterator[Any]:
+    """
+    validates already parsed items (e. g. elements of JSON array) lazily
+
+    :param batch_size: if given, lists of validated models of `batch_size` items
+        are yielded instead of single models
+    :raises ManyModelValidationError: when an invalid item is reached
+    """
+    if batch_size is None:
+        return _validate_items(model, items, strict)
+    return _validate_batches(model, _batched(iter(items), batch_size), strict)
+
+
+def _validate_rows(model: Any, rows: Iterator[dict], strict: bool) -> Iterator[Any]:
+    for index, row in enumerate(rows):
+        try:
+            yield validate_string_model(model, row, strict)
+        except ValidationError as ve:
+            raise ManyModelValidationError(_item_errors(ve, index))
+
+
+def _validate_items(model: Any, items: Iterable[Any], strict: bool) -> Iterator[Any]:
+    adapter = type_adapter(model)
+    for index, item in enumerate(items):
+        try:
+            yield adapter.validate_python(item, strict=strict)
+        except ValidationError as ve:
+            raise ManyModelValidationError(_item_errors(ve, index))
+
+
+def _validate_batches(
+    model: Any, batches: Iterator[List[Any]], strict: bool = False
+) -> Iterator[List[Any]]:
+    adapter = type_adapter(List[model])
+    offset = 0
+    for batch in batches:
+        try:
+            yield adapter.validate_python(batch, strict=strict)
+        except ValidationError as ve:
+            raise ManyModelValidationError(_item_errors(ve, offset, batch=True))
+        offset += len(batch)
+
+
+class JsonArrayError(ValueError):
+    """raised by `iter_json_array` when the document is not a valid JSON array"""
+
+    def __init__(self, msg: str, index: Optional[int] = None, not_array: bool = False):
+        self.index = index
+        self.not_array = not_array
+        super().__init__(msg)
+
+
+def iter_json_array(
+    stream: IO[bytes], read_size: int = READ_SIZE
+) -> Iterator[Tuple[Any, str]]:
+    """
+    parses top-level JSON array read from binary (UTF-8) stream incrementally
+
+    Only the current element is kept in memory.
+
+    :return: iterator of parsed elements together with their raw JSON
+    :raises JsonArrayError: if the document is not an array or it is invalid
+    """
+    text = _text_stream(stream, DEFAULT_CHARSET)
+    try:
+        yield from _iter_json_array(text, read_size)
+    finally:
+        _detach(text)
+
+
+def _iter_json_array(
+    text: io.TextIOWrapper, read_size: int
+) -> Iterator[Tuple[Any, str]]:
+    buffer = ""
+    pos = index = 0
+    eof = False
+
+    def read() -> bool:
+        # consumed part of the buffer is dropped
+        nonlocal buffer, pos, eof
+        chunk = "" if eof else text.read(read_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+        return not eof
+
+    def next_char() -> str:
+        nonlocal pos
+        while True:
+            pos = _JSON_WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read():
+                return ""
+
+    if next_char() != "[":
+        raise JsonArrayError("is not an array", not_array=True)
+    pos += 1
+    if next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            if not next_char():
+                raise JsonArrayError("unexpected end of document", index)
+            try:
+                value, end = _JSON_DECODER.raw_decode(buffer, pos)
+                # a number may continue in the next chunk (e. g. `12.` or `1e`),
+                # the element is complete once the following delimiter is read
+                delimiter = _JSON_WHITESPACE.match(buffer, end).end()
+                following = buffer[delimiter : delimiter + 1]
+                truncated = not eof and following not in (",", "]")
+            except json.JSONDecodeError as e:
+                truncated = not eof and (
+                    e.pos >= len(buffer) - 6 or e.msg.startswith("Unterminated")
+                )
+                if not truncated:
+                    raise JsonArrayError(e.msg, index)
+            if truncated:
+                # element continues in the next chunk, it is parsed again
+                read()
+                continue
+            yield value, buffer[pos:end]
+            index += 1
+            pos = end
+            char = next_char()
+            pos += 1
+            if char == "]":
+                break
+            if not char:
+                raise JsonArrayError("unexpected end of document", index)
+            if char != ",":
+                raise JsonArrayError("expected ',' or ']'", index)
+    if next_char():
+        raise JsonArrayError("unexpected data after the array")
+
+
+def _array_error(error: JsonArrayError) -> dict:
+    if error.not_array:
+        return {
+            "loc": ["root"],
+            "msg": "is not an array of objects",
+            "type": "type_error.array",
+        }
+    return {
+        "loc": ["root" if error.index is None else error.index],
+        "msg": f"Invalid JSON: {error}",
+        "type": "json_invalid",
+    }
+
+
+def iter_json_models(
+    model: Any,
+    stream: IO[bytes],
+    batch_size: Optional[int] = None,
+    strict: bool = False,
+) -> Iterator[Any]:
+    """
+    validates elements of JSON array read from binary stream incrementally
+
+    Elements are validated as they are decoded, in strict mode directly from
+    their raw JSON (as non-streamed strict bodies).
+
+    :param batch_size: if given, lists of validated models of `batch_size`
+        elements are yielded instead of single models
+    :raises ManyModelValidationError: when an invalid element is reached (or the
+        document is not an array)
+    """
+    elements = iter_json_array(stream)
+    if batch_size is None:
+        return _validate_json_items(model, elements, strict)
+    return _validate_json_batches(model, elements, batch_size, strict)
+
+
+def _validate_json_items(
+    model: Any, elements: Iterator[Tuple[Any, str]], strict: bool
+) -> Iterator[Any]:
+    adapter = type_adapter(model)
+    try:
+        for index, (value, raw) in enumerate(elements):
+            try:
+                if strict:
+                    yield adapter.validate_json(raw, strict=True)
+                else:
+                    yield adapter.validate_python(value)
+            except ValidationError as ve:
+                raise ManyModelValidationError(_item_errors(ve, index))
+    except JsonArrayError as e:
+        raise ManyModelValidationError([_array_error(e)])
+
+
+def _validate_json_batches(
+    model: Any, elements: Iterator[Tuple[Any, str]], batch_size: int, strict: bool
+) -> Iterator[List[Any]]:
+    adapter = type_adapter(List[model])
+    offset = 0
+    try:
+        for batch in _batched(elements, batch_size):
+            try:
+                if strict:
+                    raw = "[" + ",".join(raw for _, raw in batch) + "]"
+                    yield adapter.validate_json(raw, strict=True)
+                else:
+                    yield adapter.validate_python([value for value, _ in batch])
+            except ValidationError as ve:
+                raise ManyModelValidationError(_item_errors(ve, offset, batch=True))
+            offset += len(batch)
+    except JsonArrayError as e:
+        raise ManyModelValidationError([_array_error(e)])
@@ -0,0 +1,310 @@
+from dataclasses import is_dataclass
+from functools import lru_cache, partial
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any, Callable, Dict, Iterator, NamedTuple, Optional, Union
+
+try:
+    from typing import Annotated, get_args, get_origin
+except ImportError:
+    from typing_extensions import Annotated, get_args, get_origin
+
+from flask import Request, current_app
+from pydantic import BaseModel, GetCoreSchemaHandler, GetJsonSchemaHandler
+from pydantic_core import PydanticCustomError, core_schema
+from typing_extensions import get_type_hints, is_typeddict
+from werkzeug.datastructures import FileStorage
+from werkzeug.formparser import FormDataParser
+
+from .exceptions import UploadTooLargeError
+
+
+class UploadFile:
+    """
+    File uploaded in `multipart/form-data` request, usable as a form model field
+
+    Exposes the stream the file was spooled into (memory or temporary file on disk)
+    together with its size, file name and content type.
+
+    example::
+
+        class Form(BaseModel):
+            title: str
+            document: Annotated[UploadFile, MaxSize(10 * 1024 * 1024)]
+            attachments: List[UploadFile] = []
+    """
+
+    def __init__(self, storage: FileStorage):
+        self.storage = storage
+
+    def __repr__(self) -> str:
+        return (
+            f"<UploadFile {self.filename!r} ({self.content_type}, {self.size} bytes)>"
+        )
+
+    @property
+    def stream(self) -> IO[bytes]:
+        return self.storage.stream
+
+    @property
+    def filename(self) -> Optional[str]:
+        return self.storage.filename
+
+    @property
+    def name(self) -> Optional[str]:
+        """name of the form field"""
+        return self.storage.name
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self.storage.mimetype or None
+
+    @property
+    def size(self) -> int:
+        stream = self.stream
+        size = getattr(stream, "size", None)
+        if size is not None:
+            return size
+        position = stream.tell()
+        stream.seek(0, 2)
+        size = stream.tell()
+        stream.seek(position)
+        return size
+
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size)
+
+    def save(self, dst: Any, buffer_size: int = 16384) -> None:
+        self.storage.save(dst, buffer_size)
+
+    def close(self) -> None:
+        self.storage.close()
+
+    @classmethod
+    def _validate(cls, value: Any) -> "UploadFile":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, FileStorage):
+            return cls(value)
+        raise PydanticCustomError("upload_file", "Input should be an uploaded file")
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda upload: upload.filename
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(
+        cls, schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler
+    ) -> Dict[str, Any]:
+        return {"type": "string", "format": "binary"}
+
+
+class MaxSize:
+    """
+    `Annotated` metadata limiting size (in bytes) of an `UploadFile` field
+
+    The limit is enforced while the request is streamed, so the upload is aborted
+    as soon as the limit is exceeded.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+
+    def __repr__(self) -> str:
+        return f"MaxSize({self.max_size})"
+
+    def _check(self, value: Any) -> Any:
+        uploads = value if isinstance(value, list) else [value]
+        for upload in uploads:
+            if isinstance(upload, UploadFile) and upload.size > self.max_size:
+                raise _too_large_error(self.max_size)
+        return value
+
+    def __get_pydantic_core_schema__(
+        self, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        return core_schema.no_info_after_validator_function(
+            self._check, handler(source)
+        )
+
+
+class UploadField(NamedTuple):
+    """upload field of a form model"""
+
+    many: bool
+    max_size: Optional[int] = None
+
+
+def _too_large_error(max_size: int) -> PydanticCustomError:
+    return PydanticCustomError(
+        "file_too_large",
+        "File should have at most {max_size} bytes",
+        {"max_size": max_size},
+    )
+
+
+def upload_error(error: UploadTooLargeError) -> dict:
+    """validation error (in pydantic's format) for an aborted upload"""
+    return {
+        "loc": [error.field],
+        "msg": f"File should have at most {error.max_size} bytes",
+        "type": "file_too_large",
+        "ctx": {"max_size": error.max_size},
+    }
+
+
+def _upload_field(type_: Any, max_size: Optional[int] = None) -> Optional[UploadField]:
+    origin = get_origin(type_)
+    if origin is Annotated:
+        type_, *metadata = get_args(type_)
+        for item in metadata:
+            if isinstance(item, MaxSize):
+                max_size = item.max_size
+        return _upload_field(type_, max_size)
+    if origin is Union:
+        for arg in get_args(type_):
+            field = _upload_field(arg, max_size)
+            if field is not None:
+                return field
+        return None
+    if origin is list:
+        args = get_args(type_)
+        field = _upload_field(args[0], max_size) if args else None
+        return field and UploadField(True, field.max_size)
+    if isinstance(type_, type) and issubclass(type_, UploadFile):
+        return UploadField(False, max_size)
+    return None
+
+
+@lru_cache(maxsize=None)
+def upload_fields(model: Any) -> Dict[str, UploadField]:
+    """
+    upload fields of a form model (pydantic model, dataclass or TypedDict)
+
+    :return: mapping of field names (aliases for pydantic models) to upload fields
+    """
+    if isinstance(model, type) and issubclass(model, BaseModel):
+        annotations = {
+            field.alias
+            or name: (
+                Annotated[(field.annotation, *field.metadata)]
+                if field.metadata
+                else field.annotation
+            )
+            for name, field in model.model_fields.items()
+        }
+    elif is_dataclass(model) or is_typeddict(model):
+        annotations = get_type_hints(model, include_extras=True)
+    else:
+        return {}
+    fields = {}
+    for name, type_ in annotations.items():
+        field = _upload_field(type_)
+        if field is not None:
+            fields[name] = field
+    return fields
+
+
+StreamFactory = Callable[..., IO[bytes]]
+
+
+def _spooled_file(
+    spool_size: int,
+    total_content_length: Optional[int] = None,
+    content_type: Optional[str] = None,
+    filename: Optional[str] = None,
+    content_length: Optional[int] = None,
+) -> IO[bytes]:
+    return SpooledTemporaryFile(max_size=spool_size, mode="w+b")
+
+
+class _LimitedUpload:
+    """stream of an uploaded file which aborts the upload once it exceeds the limit"""
+
+    def __init__(self, stream: IO[bytes], field: str, max_size: int):
+        self.stream = stream
+        self.field = field
+        self.limit = max_size
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.limit:
+            self.stream.close()
+            raise UploadTooLargeError(self.field, self.limit)
+        return self.stream.write(data)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.stream)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+
+def upload_stream_factory(
+    stream_factory: StreamFactory,
+    limits: Dict[str, UploadField],
+    spool_size: Optional[int] = None,
+) -> StreamFactory:
+    """
+    wraps werkzeug's stream factory of uploaded files (`FormDataParser`'s
+    `stream_factory`) so that uploads exceeding size limits are aborted
+
+    The factory doesn't know which form field a file belongs to, so any file is
+    aborted once it exceeds the largest limit of the upload fields (and not at
+    all if any of them is unlimited). The limit of each field is checked again
+    by validation of the form model.
+
+    :param stream_factory: factory of streams the files are written into
+    :param limits: upload fields of the form model
+    :param spool_size: if given, files are written into spooled temporary files
+        kept in memory up to this size instead
+    """
+    if spool_size is not None:
+        stream_factory = partial(_spooled_file, spool_size)
+    sizes = [(field.max_size, name) for name, field in limits.items()]
+    if not sizes or any(max_size is None for max_size, _ in sizes):
+        return stream_factory
+    max_size, field = max(sizes)
+
+    def factory(*args: Any, **kwargs: Any) -> IO[bytes]:
+        stream = stream_factory(*args, **kwargs)
+        return _LimitedUpload(stream, field, max_size)  # type: ignore
+
+    return factory
+
+
+class UploadRequest(Request):
+    """
+    Request class aborting uploads which exceed `MaxSize` limits of form models
+    of validated routes while the request is streamed
+
+    Without it, uploads are read completely and their size is checked by
+    validation of the form model.
+
+    example::
+
+        app = Flask(__name__)
+        app.request_class = UploadRequest
+    """
+
+    def make_form_data_parser(self) -> FormDataParser:
+        parser = super().make_form_data_parser()
+        # imported here as route specs are built on top of this module
+        from .spec import get_route_spec
+
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        spec = get_route_spec(view) if view is not None else None
+        if spec is not None and spec.form_model is not None and spec.upload_fields:
+            parser.stream_factory = upload_stream_factory(
+                parser.stream_factory,
+                spec.upload_fields,
+                current_app.config.get("FLASK_PYDANTIC_UPLOAD_SPOOL_SIZE"),
+            )
+        return parser
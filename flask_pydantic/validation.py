@@ -0,0 +1,509 @@
+"""
+Framework independent validation of request parameters.
+
+Functions of this module work with raw request inputs only (view keyword
+arguments, query and form `MultiDict`, parsed or raw JSON body and headers), so
+they can be used (and benchmarked) without Flask's request context, e. g. from
+plain werkzeug applications or background workers.
+"""
+
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from pydantic import TypeAdapter, ValidationError
+from werkzeug.datastructures import ImmutableMultiDict
+from werkzeug.http import parse_options_header
+
+from .cache import digest
+from .converters import convert_multi_dict, list_fields
+from .exceptions import (
+    JsonBodyParsingError,
+    ManyModelValidationError,
+    QueryParsingError,
+    UnsupportedMediaTypeError,
+)
+from .instrumentation import (
+    PHASE_BODY,
+    PHASE_FORM,
+    PHASE_PATH,
+    PHASE_QUERY,
+    RequestTrace,
+)
+from .spec import (
+    NON_PATH_ANNOTATIONS,
+    STRING_MODE,
+    RouteSpec,
+    is_model_class,
+    is_root_model_class,
+    type_adapter,
+    type_name,
+)
+
+
+class ValidatedRequest(NamedTuple):
+    """result of request validation"""
+
+    path_params: dict
+    query_params: Any = None
+    body_params: Any = None
+    form_params: Any = None
+    errors: Dict[str, list] = {}
+
+
+def validate_model(model: Any, content: Any) -> Any:
+    """
+    validates `content` against pydantic model or any other type supported by
+    pydantic's `TypeAdapter` (e. g. `TypedDict` or dataclass)
+
+    :raises TypeError: if `content` is missing (or is not a mapping for models)
+    """
+    if is_model_class(model):
+        return model(**content)
+    if content is None:
+        raise TypeError("content is missing")
+    return type_adapter(model).validate_python(content)
+
+
+def validate_json_model(
+    model: Any, content: bytes, many: bool = False, strict: bool = True
+) -> Any:
+    """validates raw JSON (object or array of objects), in strict mode by default"""
+    if many:
+        return type_adapter(List[model]).validate_json(content, strict=strict)
+    if is_model_class(model):
+        return model.model_validate_json(content, strict=strict)
+    return type_adapter(model).validate_json(content, strict=strict)
+
+
+def validate_string_model(model: Any, content: Mapping, strict: bool = False) -> Any:
+    """
+    validates string values (query or form parameters) against model
+
+    Strings can not be validated strictly against non-string types, so in strict
+    mode they are validated by pydantic's string mode (`model_validate_strings`),
+    which parses e. g. "1" as `int` but rejects non-string inputs. Models with list
+    fields are validated in lax mode as string mode doesn't support lists (as well
+    as all models with pydantic older than 2.6), see `RouteSpec.check_strict`.
+    """
+    string_mode = strict and STRING_MODE and not list_fields(model)
+    if is_model_class(model) and not string_mode:
+        return model(**content)
+    if type(content) is not dict:
+        # `MultiDict` keeps lists of values in the underlying dict
+        content = dict(content.items())
+    if not string_mode:
+        return type_adapter(model).validate_python(content)
+    if is_model_class(model):
+        return model.model_validate_strings(content, strict=True)
+    return type_adapter(model).validate_strings(content, strict=True)
+
+
+def validate_many_models(model: Any, content: Any) -> List[Any]:
+    if not is_model_class(model):
+        try:
+            return type_adapter(List[model]).validate_python(content)
+        except ValidationError as ve:
+            raise ManyModelValidationError(ve.errors())
+    try:
+        return [model(**fields) for fields in content]
+    except TypeError:
+        # iteration through `content` fails
+        err = [
+            {
+                "loc": ["root"],
+                "msg": "is not an array of objects",
+                "type": "type_error.array",
+            }
+        ]
+        raise ManyModelValidationError(err)
+    except ValidationError as ve:
+        raise ManyModelValidationError(ve.errors())
+
+
+def validate_path_params(
+    func: Callable,
+    kwargs: dict,
+    skip: Iterable[str] = (),
+    adapters: Optional[Dict[str, TypeAdapter]] = None,
+    strict: bool = False,
+) -> Tuple[dict, list]:
+    if adapters is None:
+        adapters = {
+            name: TypeAdapter(type_)
+            for name, type_ in func.__annotations__.items()
+            if name not in NON_PATH_ANNOTATIONS
+        }
+    errors = []
+    validated = {}
+    for name, adapter in adapters.items():
+        if name in skip:
+            continue
+        value = kwargs.get(name)
+        try:
+            if strict and isinstance(value, str) and not STRING_MODE:
+                validated[name] = adapter.validate_python(value)
+            elif strict and isinstance(value, str):
+                validated[name] = adapter.validate_strings(value, strict=True)
+            else:
+                validated[name] = adapter.validate_python(value, strict=strict)
+        except ValidationError as e:
+            err = e.errors()[0]
+            err["loc"] = [name]
+            errors.append(err)
+    kwargs = {**kwargs, **validated}
+    return kwargs, errors
+
+
+def _media_type(headers: Optional[Mapping]) -> Tuple[str, str]:
+    content_type = (headers or {}).get("Content-Type", "").lower()
+    return content_type, content_type.split(";")[0]
+
+
+def _charset(headers: Optional[Mapping], default: str) -> str:
+    _, options = parse_options_header((headers or {}).get("Content-Type", ""))
+    return options.get("charset", default)
+
+
+def _validate_body_items(
+    spec: RouteSpec,
+    body: Any,
+    stream: Optional[IO[bytes]],
+    headers: Optional[Mapping],
+    strict: bool,
+) -> Any:
+    # imported here as streaming validation is built on top of this module
+    from .streaming import (
+        DEFAULT_CHARSET,
+        iter_csv_models,
+        iter_json_models,
+        iter_models,
+    )
+
+    model = spec.body_model
+    batch_size = spec.options.get("request_body_batch_size")
+    content_type, media_type = _media_type(headers)
+    if stream is not None and media_type == "text/csv":
+        if "csv" not in (spec.options.get("body_formats") or ()):
+            raise UnsupportedMediaTypeError(content_type)
+        charset = _charset(headers, DEFAULT_CHARSET)
+        items = iter_csv_models(model, stream, charset, batch_size, strict)
+    elif stream is not None:
+        items = iter_json_models(model, stream, batch_size, strict)
+    elif isinstance(body, list):
+        items = iter_models(model, body, batch_size, strict)
+    else:
+        return validate_many_models(model, body)
+    if spec.options.get("request_body_stream"):
+        return items
+    if batch_size is None:
+        return list(items)
+    return [item for batch in items for item in batch]
+
+
+def _validate_body(
+    spec: RouteSpec,
+    body: Any,
+    raw_body: Optional[bytes],
+    headers: Optional[Mapping],
+    strict: bool,
+    stream: Optional[IO[bytes]] = None,
+) -> Any:
+    model = spec.body_model
+    many = spec.options.get("request_body_many", False)
+    if many and (stream is not None or spec.options.get("request_body_stream")):
+        return _validate_body_items(spec, body, stream, headers, strict)
+    if raw_body is not None and strict:
+        return validate_json_model(model, raw_body, many, strict)
+    if raw_body is not None:
+        # parsed first to be validated like bodies parsed by `Request.get_json`,
+        # malformed JSON fails validation (`json_invalid`)
+        body = type_adapter(Any).validate_json(raw_body)
+    if strict:
+        if body is None:
+            raise UnsupportedMediaTypeError(_media_type(headers)[0])
+        adapter = type_adapter(List[model]) if many else type_adapter(model)
+        return adapter.validate_python(body, strict=True)
+    if is_root_model_class(model):
+        return model(body)
+    if many:
+        return validate_many_models(model, body)
+    try:
+        return validate_model(model, body)
+    except TypeError:
+        content_type, media_type = _media_type(headers)
+        if media_type != "application/json":
+            raise UnsupportedMediaTypeError(content_type)
+        raise JsonBodyParsingError()
+
+
+def _with_files(spec: RouteSpec, content: dict, files: Mapping) -> dict:
+    for name, field in spec.upload_fields.items():
+        uploads = files.getlist(name)
+        if field.many:
+            content[name] = uploads
+        elif uploads:
+            content[name] = uploads[0]
+    return content
+
+
+def _validate_form(
+    spec: RouteSpec,
+    form: Mapping,
+    files: Optional[Mapping],
+    headers: Optional[Mapping],
+    strict: bool,
+) -> Any:
+    model = spec.form_model
+    if is_root_model_class(model):
+        return model(form)
+    if hasattr(form, "lists"):
+        form = convert_multi_dict(form, spec.form_list_fields)
+    else:
+        form = dict(form)
+    try:
+        if spec.upload_fields:
+            # uploaded files can not be validated in string mode
+            return validate_model(
+                model, _with_files(spec, form, files or ImmutableMultiDict())
+            )
+        return validate_string_model(model, form, strict)
+    except TypeError:
+        content_type, media_type = _media_type(headers)
+        if media_type != "multipart/form-data":
+            raise UnsupportedMediaTypeError(content_type)
+        raise JsonBodyParsingError()
+
+
+def _in_phase(
+    trace: Optional[RequestTrace],
+    phase: str,
+    model: Any,
+    func: Callable[..., Any],
+    *args: Any,
+) -> Any:
+    # untraced requests don't pay for the context manager
+    if trace is None:
+        return func(*args)
+    with trace.phase(phase, model=type_name(model)):
+        return func(*args)
+
+
+def _validate_path(
+    spec: RouteSpec,
+    path_params: Optional[dict],
+    skip: Iterable[str],
+    strict: bool,
+    errors: Dict[str, list],
+) -> dict:
+    path_params, path_errors = validate_path_params(
+        spec.func,
+        path_params or {},
+        skip=skip,
+        adapters=spec.path_adapters,
+        strict=strict,
+    )
+    if path_errors:
+        errors["path_params"] = path_errors
+    return path_params
+
+
+def _validate_query(
+    spec: RouteSpec,
+    query: Optional[Mapping],
+    query_string: Optional[bytes],
+    strict: bool,
+    errors: Dict[str, list],
+) -> Any:
+    cache = spec.query_cache if query_string is not None else None
+    if cache is not None:
+        query_params = cache.get((query_string, strict))
+        if query_params is not None:
+            return query_params
+    query = ImmutableMultiDict() if query is None else query
+    query_strict = strict
+    try:
+        if spec.query_parser is not None:
+            params = spec.query_parser.parse(query)
+            # string mode doesn't support (nested) lists
+            query_strict = strict and not spec.query_parser.has_lists
+        else:
+            params = convert_multi_dict(query, spec.query_list_fields)
+        query_params = validate_string_model(spec.query_model, params, query_strict)
+    except ValidationError as ve:
+        errors["query_params"] = ve.errors()
+        return None
+    except QueryParsingError as e:
+        errors["query_params"] = e.errors()
+        return None
+    if cache is not None:
+        cache.set((query_string, strict), query_params)
+    return query_params
+
+
+def _errors(ve: ValidationError, keep_input: bool = True) -> list:
+    """
+    errors of validation, raw body of `json_invalid` errors is left out (as well
+    as all inputs if `keep_input` is false, e. g. uploaded files)
+    """
+    errors = ve.errors()
+    for error in errors:
+        if not keep_input or isinstance(error.get("input"), bytes):
+            error.pop("input", None)
+    return errors
+
+
+def _validate_cached_body(
+    spec: RouteSpec,
+    body: Any,
+    raw_body: Optional[bytes],
+    headers: Optional[Mapping],
+    strict: bool,
+    stream: Optional[IO[bytes]],
+    errors: Dict[str, list],
+) -> Any:
+    key = None
+    if spec.body_cache is not None and raw_body is not None:
+        key = (digest(raw_body), strict)
+        body_params = spec.body_cache.get(key)
+        if body_params is not None:
+            return body_params
+    try:
+        body_params = _validate_body(spec, body, raw_body, headers, strict, stream)
+    except ValidationError as ve:
+        errors["body_params"] = _errors(ve)
+        return None
+    except ManyModelValidationError as e:
+        errors["body_params"] = e.errors()
+        return None
+    if key is not None:
+        spec.body_cache.set(key, body_params)
+    return body_params
+
+
+def _validate_form_params(
+    spec: RouteSpec,
+    form: Optional[Mapping],
+    files: Optional[Mapping],
+    headers: Optional[Mapping],
+    strict: bool,
+    errors: Dict[str, list],
+) -> Any:
+    try:
+        return _validate_form(spec, form or {}, files, headers, strict)
+    except ValidationError as ve:
+        errors["form_params"] = _errors(ve, keep_input=not spec.upload_fields)
+        return None
+
+
+def _body_size(raw_body: Optional[bytes], headers: Optional[Mapping]) -> Optional[int]:
+    if raw_body is not None:
+        return len(raw_body)
+    length = (headers or {}).get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def validate_request(
+    spec: RouteSpec,
+    path_params: Optional[dict] = None,
+    query: Optional[Mapping] = None,
+    body: Any = None,
+    raw_body: Optional[bytes] = None,
+    form: Optional[Mapping] = None,
+    files: Optional[Mapping] = None,
+    stream: Optional[IO[bytes]] = None,
+    headers: Optional[Mapping] = None,
+    strict: bool = False,
+    skip_path_params: Iterable[str] = (),
+    query_string: Optional[bytes] = None,
+    trace: Optional[RequestTrace] = None,
+) -> ValidatedRequest:
+    """
+    validates raw request inputs against models of the route
+
+    Only inputs of sources the route has a model for are used.
+
+    :param spec: specification of the validated route
+    :param path_params: URL path parameters (view function's keyword arguments)
+    :param query: query parameters (e. g. werkzeug's `Request.args`)
+    :param body: parsed JSON body, used only if `raw_body` is not given
+    :param raw_body: raw JSON body, key of the route's body cache, in strict mode
+        validated without creation of intermediate python objects
+    :param form: form parameters (e. g. werkzeug's `Request.form`)
+    :param files: uploaded files (e. g. werkzeug's `Request.files`), used for
+        `UploadFile` fields of the form model
+    :param stream: request body stream of `request_body_many` routes, `text/csv`
+        rows (if enabled by `body_formats` option) or JSON array elements are read
+        from it incrementally
+    :param headers: request headers (used to report unsupported media type)
+    :param strict: whether to use pydantic's strict mode
+    :param skip_path_params: path parameters which are already validated
+    :param query_string: raw query string, key of the route's query cache
+    :param trace: trace of the request, validation of every source is its phase
+    :raises UnsupportedMediaTypeError: if the body can not be read from the request
+        of given content type
+    :raises JsonBodyParsingError: if JSON body is missing
+    """
+    errors = {}
+    query_params = body_params = form_params = None
+    path_params = _in_phase(
+        trace,
+        PHASE_PATH,
+        None,
+        _validate_path,
+        spec,
+        path_params,
+        skip_path_params,
+        strict,
+        errors,
+    )
+    if spec.query_model:
+        query_params = _in_phase(
+            trace,
+            PHASE_QUERY,
+            spec.query_model,
+            _validate_query,
+            spec,
+            query,
+            query_string,
+            strict,
+            errors,
+        )
+    if spec.body_model:
+        args = (spec, body, raw_body, headers, strict, stream, errors)
+        if trace is None:
+            body_params = _validate_cached_body(*args)
+        else:
+            with trace.phase(
+                PHASE_BODY,
+                model=type_name(spec.body_model),
+                bytes=_body_size(raw_body, headers),
+            ) as attributes:
+                body_params = _validate_cached_body(*args)
+                if isinstance(body_params, list) and spec.options.get(
+                    "request_body_many"
+                ):
+                    attributes["items"] = len(body_params)
+    if spec.form_model:
+        form_params = _in_phase(
+            trace,
+            PHASE_FORM,
+            spec.form_model,
+            _validate_form_params,
+            spec,
+            form,
+            files,
+            headers,
+            strict,
+            errors,
+        )
+    return ValidatedRequest(path_params, query_params, body_params, form_params, errors)
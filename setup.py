@@ -50,6 +50,8 @@ setup(
     long_description_content_type="text/markdown",
     packages=["flask_pydantic"],
     install_requires=list(get_install_requires()),
+    extras_require={"arrow": ["pyarrow"], "otel": ["opentelemetry-api"]},
+    entry_points={"flask.commands": ["pydantic=flask_pydantic.cli:cli"]},
     python_requires=">=3.7",
     classifiers=[
         "Environment :: Web Environment",
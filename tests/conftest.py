@@ -1,9 +1,10 @@
-from typing import List, Optional, Type
+from contextlib import nullcontext
+from typing import List, Optional, Tuple, Type
 
 import pytest
 from flask import Flask, request
-from flask_pydantic import validate
-from pydantic import BaseModel
+from flask_pydantic import FlaskPydantic, validate
+from pydantic import BaseModel, ConfigDict
 
 
 @pytest.fixture
@@ -126,3 +127,68 @@ def app(posts, response_model, query_model, body_model, post_model, form_model):
         return response_model(results=results[: query.limit], count=len(results))
 
     return app
+
+
+class Item(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    tags: Tuple[str, ...] = ()
+
+
+class Limit(BaseModel):
+    limit: int = 10
+
+
+@pytest.fixture
+def instruments() -> list:
+    """instruments of `instrumented_app`, overridden by tests of instruments"""
+    return []
+
+
+@pytest.fixture
+def view_hook():
+    """context manager factory wrapping view of `import_items` route"""
+    return nullcontext
+
+
+@pytest.fixture
+def instrumented_app(instruments, view_hook):
+    app = Flask("instrumented_app")
+    FlaskPydantic(app, instruments=instruments)
+    # keeps validated bodies alive (allocations of the body phase)
+    app.config["IMPORTED"] = imported = []
+
+    @app.route("/items", methods=["POST"])
+    @validate(body_cache=16)
+    def create_item(body: Item) -> Item:
+        return body
+
+    @app.route("/items/<int:item_id>", methods=["POST"])
+    @validate(body=Item, request_body_many=True, response_many=True)
+    def import_items(item_id: int, query: Limit) -> List[Item]:
+        imported.append(request.body_params)
+        with view_hook():
+            return request.body_params[: query.limit]
+
+    @app.route("/items", methods=["GET"])
+    @validate(response_many=True)
+    def list_items() -> List[Item]:
+        return [Item(name=str(i)) for i in range(100)]
+
+    @app.route("/fail", methods=["GET"])
+    @validate()
+    def fail():
+        raise KeyError("missing")
+
+    @app.route("/skipped", methods=["GET"])
+    @validate()
+    def skipped():
+        return {}
+
+    @app.route("/every", methods=["GET"])
+    @validate()
+    def every():
+        return {}
+
+    return app
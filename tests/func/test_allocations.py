@@ -0,0 +1,69 @@
+import sys
+import tracemalloc
+
+import pytest
+from flask_pydantic.allocations import AllocationTracker, allocations_view
+
+
+@pytest.fixture
+def tracker():
+    return AllocationTracker(sample_rate=2)
+
+
+@pytest.fixture
+def instruments(tracker):
+    return [tracker]
+
+
+@pytest.fixture
+def tracked_app(instrumented_app, tracker):
+    instrumented_app.add_url_rule("/allocations", view_func=allocations_view(tracker))
+    return instrumented_app
+
+
+def test_allocations(tracked_app, tracker):
+    client = tracked_app.test_client()
+    body = [{"name": f"item {i}", "tags": ["a", "b"]} for i in range(300)]
+    for _ in range(3):
+        assert client.post("/items/1", json=body).status_code == 200
+    client.get("/items")
+    report = client.get("/allocations").json["endpoints"]
+    assert set(report) == {"import_items", "list_items"}
+    body_params = report["import_items"]["body_params"]
+    # requests 1 and 3 are sampled
+    assert body_params["samples"] == 2
+    # validated models are kept by the view
+    assert body_params["net"]["min"] > 300 * sys.getsizeof(object())
+    if hasattr(tracemalloc, "reset_peak"):
+        assert body_params["peak"]["max"] >= body_params["net"]["max"]
+    assert any("validation.py" in site["site"] for site in body_params["sites"])
+    assert all(site["size"] > 0 for site in body_params["sites"])
+    assert set(report["list_items"]) == {"view", "serialization"}
+    tracker.reset()
+    assert tracker.report() == {"endpoints": {}}
+
+
+def test_phases_and_sites_are_configurable(tracked_app):
+    tracker = AllocationTracker(sample_rate=1, phases=["serialization"], sites=0)
+    tracked_app.extensions["flask-pydantic"].instruments = [tracker]
+    tracked_app.test_client().get("/items")
+    [(phase, stats)] = tracker.report()["endpoints"]["list_items"].items()
+    assert phase == "serialization"
+    assert stats["sites"] == []
+
+
+def test_tracing_only_of_sampled_requests(tracked_app, tracker):
+    client = tracked_app.test_client()
+    assert not tracemalloc.is_tracing()
+    client.get("/items")
+    assert not tracemalloc.is_tracing()
+    assert tracker.report()["endpoints"]["list_items"]["view"]["samples"] == 1
+    # tracing started by others is kept
+    tracemalloc.start()
+    try:
+        client.get("/items")
+        client.get("/items")
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert tracker.report()["endpoints"]["list_items"]["view"]["samples"] == 2
@@ -1,11 +1,25 @@
 from ..util import assert_matches
 import re
-from typing import List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from typing_extensions import Annotated, TypedDict
 
 import pytest
-from flask import jsonify, request
-from flask_pydantic import validate, ValidationError
-from pydantic import BaseModel, RootModel, ConfigDict
+from flask import Blueprint, Response, jsonify, request, url_for
+import flask_pydantic.core
+from flask_pydantic import route, validate, ValidationError
+from flask_pydantic.batch import batch_view
+from flask_pydantic.response_cache import SharedResponseCache
+from flask_pydantic.uploads import MaxSize, UploadFile, UploadRequest
+from pydantic import BaseModel, RootModel, ConfigDict, Field, conint
 
 
 class ArrayModel(BaseModel):
@@ -76,6 +90,37 @@ def app_with_int_path_param_route(app):
         return IdObj(id=obj_id)
 
 
+class Color(str, Enum):
+    red = "red"
+    blue = "blue"
+
+
+@pytest.fixture
+def app_with_typed_route(app):
+    class Item(BaseModel):
+        id: UUID
+        color: Color
+        position: int
+
+    @route(app, "/items/<item_id>/<color>/<position>", methods=["GET"])
+    @validate()
+    def typed_item(item_id: UUID, color: Color, position: conint(ge=0)):
+        return Item(id=item_id, color=color, position=position)
+
+    @app.route("/items/<name>/<color>/<position>", methods=["GET"])
+    def untyped_item(name, color, position):
+        return {"fallback": name}
+
+    bp = Blueprint("bp", __name__)
+
+    @route(bp, "/positions/<position>", methods=["GET"])
+    @validate()
+    def bp_position(position: int):
+        return {"position": position, "type": type(position).__name__}
+
+    app.register_blueprint(bp, url_prefix="/bp")
+
+
 @pytest.fixture
 def app_with_untyped_path_param_route(app):
     class IdObj(BaseModel):
@@ -121,6 +166,325 @@ def app_with_custom_headers_status(app):
         return {"test": 1}, 201, {"CUSTOM_HEADER": "UNIQUE"}
 
 
+@pytest.fixture
+def app_with_strict_routes(app):
+    class Event(BaseModel):
+        id: int
+        at: datetime
+
+    class Page(BaseModel):
+        limit: int
+
+    @app.route("/strict", methods=["POST"])
+    @validate(strict=True)
+    def strict_event(body: Event, query: Page):
+        return {"id": body.id, "at": body.at.isoformat(), "limit": query.limit}
+
+    @app.route("/strict/many", methods=["POST"])
+    @validate(body=Event, request_body_many=True, strict=True)
+    def strict_events():
+        return {"count": len(request.body_params)}
+
+    @app.route("/strict/<event_id>", methods=["GET"])
+    @validate()
+    def strict_path(event_id: int):
+        return {"id": event_id}
+
+
+class PageDict(TypedDict):
+    limit: int
+    tags: List[str]
+
+
+class PersonDict(TypedDict):
+    name: str
+    age: int
+
+
+@dataclass
+class PointBody:
+    x: int
+    y: int = 0
+
+
+@pytest.fixture
+def app_with_adapter_types(app):
+    @app.route("/adapters", methods=["POST"])
+    @validate()
+    def adapters(query: PageDict, body: PointBody):
+        assert request.body_params is body
+        return {"query": query, "body": {"x": body.x, "y": body.y}}
+
+    @app.route("/adapters/many", methods=["POST"])
+    @validate(body=PageDict, request_body_many=True)
+    def adapters_many():
+        return {"limits": [page["limit"] for page in request.body_params]}
+
+    @app.route("/adapters/form", methods=["POST"])
+    @validate()
+    def adapters_form(form: PersonDict):
+        return dict(form)
+
+
+class UploadForm(BaseModel):
+    title: str
+    document: Annotated[UploadFile, MaxSize(16)]
+    attachments: List[UploadFile] = []
+
+
+class DocumentForm(BaseModel):
+    document: Annotated[UploadFile, MaxSize(16)]
+
+
+@pytest.fixture
+def app_with_upload_route(app):
+    @app.route("/upload", methods=["POST"])
+    @validate()
+    def upload(form: UploadForm):
+        return {
+            "title": form.title,
+            "document": {
+                "filename": form.document.filename,
+                "content_type": form.document.content_type,
+                "size": form.document.size,
+                "content": form.document.read().decode(),
+            },
+            "attachments": [upload.size for upload in form.attachments],
+        }
+
+    @app.route("/upload/document", methods=["POST"])
+    @validate()
+    def upload_document(form: DocumentForm):
+        return {"size": form.document.size}
+
+
+class FilterForm(BaseModel):
+    name: str
+    colors: List[str] = []
+    sizes: List[int] = Field([], alias="size")
+
+
+@pytest.fixture
+def app_with_multi_value_form(app):
+    @app.route("/filter", methods=["POST"])
+    @validate()
+    def filter_form(form: FilterForm):
+        return form.model_dump()
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+
+
+class RowsQuery(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    count: int = 2
+
+
+@pytest.fixture
+def app_with_response_formats(app):
+    @app.route("/rows", methods=["GET"])
+    @validate(response_many=True, response_formats=("json", "columnar", "csv"))
+    def rows() -> List[Row]:
+        count = int(request.args.get("count", 2))
+        return [Row(id=i, name=f"row {i}") for i in range(count)]
+
+    @app.route("/rows/tabular", methods=["GET"])
+    @validate(response_many=True, response_formats=("csv", "columnar"), query_cache=8)
+    def tabular_rows(query: RowsQuery) -> List[Row]:
+        return tuple(Row(id=i, name=f"row {i}") for i in range(query.count))
+
+
+class Contact(BaseModel):
+    name: str = Field(alias="fullName")
+    age: int
+
+
+@pytest.fixture
+def app_with_many_body_routes(app):
+    @app.route("/contacts", methods=["POST"])
+    @validate(body=Contact, request_body_many=True, body_formats=("csv",))
+    def import_contacts():
+        return {"names": [contact.name for contact in request.body_params]}
+
+    @app.route("/contacts/json", methods=["POST"])
+    @validate(body=Contact, request_body_many=True)
+    def import_json_contacts():
+        return {"names": [contact.name for contact in request.body_params]}
+
+    @app.route("/contacts/stream", methods=["POST"])
+    @validate(
+        body=Contact,
+        request_body_many=True,
+        request_body_stream=True,
+        body_formats=("csv",),
+    )
+    def stream_contacts():
+        total = 0
+        for contact in request.body_params:
+            total += contact.age
+        return {"total": total}
+
+    @app.route("/contacts/batches", methods=["POST"])
+    @validate(
+        body=Contact,
+        request_body_many=True,
+        request_body_stream=True,
+        request_body_batch_size=2,
+        body_formats=("csv",),
+    )
+    def batch_contacts():
+        return {"batches": [len(batch) for batch in request.body_params]}
+
+
+class SearchQuery(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    q: str
+    tags: Tuple[str, ...] = ()
+
+
+@pytest.fixture
+def app_with_query_cache(app):
+    @app.route("/search", methods=["GET"])
+    @validate(query_cache=16)
+    def search(query: SearchQuery):
+        return {"id": id(query), "q": query.q, "tags": query.tags}
+
+
+class Webhook(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    event: str
+    delivery: int
+
+
+@pytest.fixture
+def app_with_body_cache(app):
+    @app.route("/webhook", methods=["POST"])
+    @validate(body_cache=16, body_cache_ttl=60)
+    def webhook(body: Webhook):
+        return {"id": id(body), "event": body.event}
+
+
+class OrderRange(BaseModel):
+    gte: Optional[int] = None
+    lte: Optional[int] = None
+
+
+class OrderFilter(BaseModel):
+    status: List[str] = []
+    total: OrderRange = OrderRange()
+
+
+class OrderQuery(BaseModel):
+    filter: OrderFilter = OrderFilter()
+    sort: List[str] = []
+
+
+@pytest.fixture
+def app_with_deep_query(app):
+    @app.route("/orders", methods=["GET"])
+    @validate(query_style="deep", query_delimiter=",")
+    def orders(query: OrderQuery):
+        return query.model_dump()
+
+
+class Country(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    code: str
+    name: Optional[str] = None
+
+
+COUNTRIES = [Country(code="CZ", name="Czechia"), Country(code="XX")]
+
+
+@pytest.fixture
+def app_with_response_memo(app):
+    @app.route("/countries", methods=["GET"])
+    @validate(response_many=True, response_memo=True, exclude_none=True)
+    def countries():
+        return COUNTRIES
+
+    @app.route("/countries/<int:index>", methods=["GET"])
+    @validate(response_memo=True)
+    def country(index: int):
+        return COUNTRIES[index]
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    cache = SharedResponseCache(str(tmp_path / "cache"), slots=64, slot_size=1024)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def app_with_response_cache(app, response_cache):
+    calls = []
+
+    @app.route("/cached/<int:item_id>", methods=["GET", "POST"])
+    @validate(response_cache=response_cache)
+    def cached(item_id: int, query: SearchQuery):
+        calls.append(item_id)
+        if query.q == "headers":
+            return Country(code="CZ"), {"X-Custom": "1"}
+        return Country(code=query.q, name=str(item_id))
+
+    return calls
+
+
+@pytest.fixture
+def app_with_singleflight(app):
+    calls = []
+    release = threading.Event()
+
+    @app.route("/coalesced", methods=["GET"])
+    @validate(singleflight=True)
+    def coalesced(query: SearchQuery):
+        calls.append(query.q)
+        release.wait(5)
+        if query.q == "cookie":
+            return Country(code="CZ"), 201, {"Set-Cookie": f"id={len(calls)}"}
+        return Country(code=query.q), 201
+
+    return app, calls, release
+
+
+@pytest.fixture
+def app_with_batch(app):
+    barrier = threading.Barrier(2, timeout=5)
+    created = []
+
+    @app.route("/batch/items/<int:item_id>", methods=["GET"])
+    @validate()
+    def batch_item(item_id: int, query: SearchQuery):
+        if query.q == "parallel":
+            barrier.wait()
+        elif query.q == "raw":
+            return Response("not JSON", mimetype="application/json")
+        elif query.q == "error":
+            raise RuntimeError("failed")
+        return Country(code=query.q, name=str(item_id))
+
+    @app.route("/batch/items", methods=["POST"])
+    @validate()
+    def batch_create(body: Country):
+        created.append(body.code)
+        return {"created": created}, 201
+
+    @app.route("/batch/plain", methods=["GET"])
+    def batch_plain():
+        return "plain"
+
+    app.add_url_rule(
+        "/batch", view_func=batch_view(max_workers=4, max_requests=5), methods=["POST"]
+    )
+
+
 @pytest.fixture
 def app_with_camel_route(app):
     def to_camel(x: str) -> str:
@@ -395,6 +759,33 @@ class TestPathIntParameter:
         assert response.status_code == 400
 
 
+@pytest.mark.usefixtures("app_with_typed_route")
+class TestTypedRoute:
+    uuid = "0d9f6a33-5e27-4e6f-9a4a-3f0a6fd1f1a2"
+
+    def test_typed_values(self, client):
+        response = client.get(f"/items/{self.uuid}/red/3")
+        assert response.json == {"id": self.uuid, "color": "red", "position": 3}
+
+    def test_router_falls_through_to_next_rule(self, client):
+        response = client.get("/items/not-an-uuid/red/3")
+        assert response.json == {"fallback": "not-an-uuid"}
+
+    def test_constraint_rejected_by_router(self, client):
+        response = client.get(f"/items/{self.uuid}/green/-1")
+        assert response.json == {"fallback": self.uuid}
+
+    def test_blueprint(self, client):
+        assert client.get("/bp/positions/12").json == {"position": 12, "type": "int"}
+        assert client.get("/bp/positions/twelve").status_code == 404
+
+    def test_url_for(self, app):
+        with app.test_request_context():
+            assert url_for(
+                "typed_item", item_id=UUID(self.uuid), color=Color.blue, position=1
+            ) == (f"/items/{self.uuid}/blue/1")
+
+
 @pytest.mark.usefixtures("app_with_untyped_path_param_route")
 class TestPathUnannotatedParameter:
     def test_int_str_param_passes(self, client):
@@ -468,3 +859,549 @@ class TestCustomResponse:
             response.json["body"],
         )
         assert response.status_code == 422
+
+
+@pytest.mark.usefixtures("app_with_strict_routes")
+class TestStrict:
+    def test_valid(self, client):
+        response = client.post(
+            "/strict?limit=5", json={"id": 1, "at": "2024-01-08T12:30:00"}
+        )
+        assert response.json == {"id": 1, "at": "2024-01-08T12:30:00", "limit": 5}
+
+    def test_no_coercion(self, client):
+        response = client.post(
+            "/strict?limit=5", json={"id": "1", "at": "2024-01-08T00:00:00"}
+        )
+        assert response.status_code == 400
+        errors = response.json["validation_error"]["body_params"]
+        assert [(e["loc"], e["type"]) for e in errors] == [(["id"], "int_type")]
+
+    def test_invalid_query_string(self, client):
+        response = client.post(
+            "/strict?limit=five", json={"id": 1, "at": "2024-01-08T00:00:00"}
+        )
+        assert response.status_code == 400
+        errors = response.json["validation_error"]["query_params"]
+        assert [(e["loc"], e["type"]) for e in errors] == [(["limit"], "int_parsing")]
+
+    def test_many(self, client):
+        response = client.post(
+            "/strict/many",
+            json=[
+                {"id": 1, "at": "2024-01-08T00:00:00"},
+                {"id": 2.0, "at": "2024-01-08T00:00:00"},
+            ],
+        )
+        errors = response.json["validation_error"]["body_params"]
+        assert [(e["loc"], e["type"]) for e in errors] == [([1, "id"], "int_type")]
+
+    def test_not_json(self, client):
+        response = client.post("/strict?limit=1", data="id=1")
+        assert response.status_code == 415
+
+    def test_malformed_json(self, client):
+        # raw body is validated by pydantic instead of Flask's `get_json`
+        response = client.post(
+            "/strict?limit=1", data='{"id": 1', content_type="application/json"
+        )
+        assert response.status_code == 400
+        errors = response.json["validation_error"]["body_params"]
+        assert [e["type"] for e in errors] == ["json_invalid"]
+        assert "input" not in errors[0]
+
+    def test_config_default(self, app, client):
+        app.config["FLASK_PYDANTIC_STRICT"] = True
+        assert client.get("/strict/12").json == {"id": 12}
+        assert client.get("/strict/twelve").status_code == 400
+
+
+@pytest.mark.usefixtures("app_with_adapter_types")
+class TestAdapterTypes:
+    def test_typed_dict_query_and_dataclass_body(self, client):
+        response = client.post("/adapters?limit=3&tags=a&tags=b", json={"x": "1"})
+        assert response.json == {
+            "query": {"limit": 3, "tags": ["a", "b"]},
+            "body": {"x": 1, "y": 0},
+        }
+
+    def test_invalid(self, client):
+        response = client.post("/adapters?limit=x", json={})
+        errors = response.json["validation_error"]
+        assert response.status_code == 400
+        assert [e["loc"] for e in errors["query_params"]] == [["limit"], ["tags"]]
+        assert [e["loc"] for e in errors["body_params"]] == [["x"]]
+
+    def test_many(self, client):
+        response = client.post(
+            "/adapters/many", json=[{"limit": 1, "tags": []}, {"limit": 2, "tags": []}]
+        )
+        assert response.json == {"limits": [1, 2]}
+        response = client.post("/adapters/many", json=[{"limit": 1}])
+        errors = response.json["validation_error"]["body_params"]
+        assert [e["loc"] for e in errors] == [[0, "tags"]]
+
+    def test_form(self, client):
+        response = client.post("/adapters/form", data={"name": "Geralt", "age": "95"})
+        assert response.json == {"name": "Geralt", "age": 95}
+
+    def test_not_json(self, client):
+        response = client.post("/adapters?limit=1&tags=a", data="x=1")
+        assert response.status_code == 415
+
+
+@pytest.mark.usefixtures("app_with_upload_route")
+class TestUpload:
+    def test_upload(self, client):
+        response = client.post(
+            "/upload",
+            data={
+                "title": "report",
+                "document": (BytesIO(b"hello"), "hello.txt", "text/plain"),
+                "attachments": [
+                    (BytesIO(b"a" * 100), "a.bin"),
+                    (BytesIO(b"b" * 1000), "b.bin"),
+                ],
+            },
+        )
+        assert response.status_code == 200
+        assert response.json == {
+            "title": "report",
+            "document": {
+                "filename": "hello.txt",
+                "content_type": "text/plain",
+                "size": 5,
+                "content": "hello",
+            },
+            "attachments": [100, 1000],
+        }
+
+    def test_too_large(self, client):
+        response = client.post(
+            "/upload",
+            data={"title": "report", "document": (BytesIO(b"x" * 17), "big.txt")},
+        )
+        assert response.status_code == 400
+        assert response.json == {
+            "validation_error": {
+                "form_params": [
+                    {
+                        "loc": ["document"],
+                        "msg": "File should have at most 16 bytes",
+                        "type": "file_too_large",
+                        "ctx": {"max_size": 16},
+                    }
+                ]
+            }
+        }
+
+    def test_too_large_streamed(self, app, client, mocker):
+        app.request_class = UploadRequest
+        upload_error = mocker.spy(flask_pydantic.core, "upload_error")
+        response = client.post(
+            "/upload/document", data={"document": (BytesIO(b"x" * 17), "big.txt")}
+        )
+        assert response.status_code == 400
+        assert response.json["validation_error"]["form_params"] == [
+            {
+                "loc": ["document"],
+                "msg": "File should have at most 16 bytes",
+                "type": "file_too_large",
+                "ctx": {"max_size": 16},
+            }
+        ]
+        # aborted while the request was streamed
+        upload_error.assert_called_once()
+        response = client.post(
+            "/upload/document", data={"document": (BytesIO(b"x" * 16), "doc.txt")}
+        )
+        assert response.json == {"size": 16}
+
+    def test_missing_file(self, client):
+        response = client.post("/upload", data={"title": "report"})
+        errors = response.json["validation_error"]["form_params"]
+        assert response.status_code == 400
+        assert [e["loc"] for e in errors] == [["document"]]
+
+
+@pytest.mark.usefixtures("app_with_multi_value_form")
+class TestMultiValueForm:
+    def test_repeated_keys(self, client):
+        response = client.post(
+            "/filter",
+            data={"name": ["a", "b"], "colors": ["red", "blue"], "size": ["1", "2"]},
+        )
+        assert response.json == {
+            "name": "a",
+            "colors": ["red", "blue"],
+            "sizes": [1, 2],
+        }
+
+    def test_single_value(self, client):
+        response = client.post("/filter", data={"name": "a", "colors": "red"})
+        assert response.json == {"name": "a", "colors": ["red"], "sizes": []}
+
+
+@pytest.mark.usefixtures("app_with_response_formats")
+class TestResponseFormats:
+    def test_json_by_default(self, client):
+        response = client.get("/rows")
+        assert response.json == [{"id": 0, "name": "row 0"}, {"id": 1, "name": "row 1"}]
+        assert response.headers["Vary"] == "Accept"
+
+    def test_columnar_by_query_param(self, client):
+        response = client.get("/rows?format=columnar")
+        assert response.json == {
+            "columns": ["id", "name"],
+            "rows": [[0, "row 0"], [1, "row 1"]],
+        }
+
+    def test_columnar_by_accept(self, client):
+        response = client.get(
+            "/rows?count=0", headers={"Accept": "application/json; format=columnar"}
+        )
+        assert response.json == {"columns": ["id", "name"], "rows": []}
+
+    def test_not_acceptable(self, client):
+        response = client.get("/rows?format=xml")
+        assert response.status_code == 406
+
+    def test_csv(self, client):
+        response = client.get("/rows", headers={"Accept": "text/csv"})
+        assert response.mimetype == "text/csv"
+        assert response.is_streamed
+        assert response.data == b"id,name\r\n0,row 0\r\n1,row 1\r\n"
+
+    def test_format_param_is_not_query_param(self, client):
+        for _ in range(2):
+            response = client.get("/rows/tabular?count=1&format=columnar")
+            assert response.json == {"columns": ["id", "name"], "rows": [[0, "row 0"]]}
+        response = client.get("/rows/tabular?count=1&sort=id")
+        assert response.status_code == 400
+
+    def test_first_format_without_json(self, client):
+        response = client.get("/rows/tabular?count=1", headers={"Accept": "*/*"})
+        assert response.data == b"id,name\r\n0,row 0\r\n"
+        response = client.get("/rows/tabular", headers={"Accept": "application/json"})
+        assert response.status_code == 406
+
+
+CONTACTS_CSV = "name,age\nAnn,30\nBob,40\nCyril,50\n"
+
+
+@pytest.mark.usefixtures("app_with_many_body_routes")
+class TestManyBody:
+    def test_csv(self, client):
+        response = client.post(
+            "/contacts", data=CONTACTS_CSV, content_type="text/csv; charset=utf-8"
+        )
+        assert response.json == {"names": ["Ann", "Bob", "Cyril"]}
+
+    def test_csv_invalid_row(self, client):
+        response = client.post(
+            "/contacts", data="fullName,age\nAnn,x\n", content_type="text/csv"
+        )
+        assert response.status_code == 400
+        errors = response.json["validation_error"]["body_params"]
+        assert [error["loc"] for error in errors] == [[0, "age"]]
+
+    def test_json(self, client):
+        response = client.post("/contacts", json=[{"fullName": "Ann", "age": 1}])
+        assert response.json == {"names": ["Ann"]}
+
+    def test_csv_not_enabled(self, client):
+        response = client.post(
+            "/contacts/json", data=CONTACTS_CSV, content_type="text/csv"
+        )
+        assert response.status_code == 415
+        response = client.post("/contacts/json", json=[{"fullName": "Ann", "age": 1}])
+        assert response.json == {"names": ["Ann"]}
+
+    def test_unknown_body_format(self):
+        with pytest.raises(ValueError):
+            validate(body=Contact, request_body_many=True, body_formats=("xml",))
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"data": CONTACTS_CSV, "content_type": "text/csv"},
+            {"json": [{"fullName": "Ann", "age": 30}, {"fullName": "Bob", "age": 90}]},
+        ],
+    )
+    def test_stream(self, client, kwargs):
+        response = client.post("/contacts/stream", **kwargs)
+        assert response.json == {"total": 120}
+
+    def test_stream_invalid_item(self, client):
+        response = client.post(
+            "/contacts/stream", data="name,age\nAnn,1\nBob,x\n", content_type="text/csv"
+        )
+        assert response.status_code == 400
+        errors = response.json["validation_error"]["body_params"]
+        assert [error["loc"] for error in errors] == [[1, "age"]]
+
+    def test_batches(self, client):
+        response = client.post(
+            "/contacts/batches", data=CONTACTS_CSV, content_type="text/csv"
+        )
+        assert response.json == {"batches": [2, 1]}
+
+    def test_stream_json_invalid(self, client):
+        response = client.post("/contacts/stream", json={"fullName": "Ann"})
+        assert response.status_code == 400
+        errors = response.json["validation_error"]["body_params"]
+        assert errors == [
+            {
+                "loc": ["root"],
+                "msg": "is not an array of objects",
+                "type": "type_error.array",
+            }
+        ]
+
+    def test_batches_json(self, client):
+        response = client.post(
+            "/contacts/batches", json=[{"fullName": "Ann", "age": 30}] * 5
+        )
+        assert response.json == {"batches": [2, 2, 1]}
+
+
+@pytest.mark.usefixtures("app_with_query_cache")
+class TestQueryCache:
+    def test_cached_model(self, client):
+        first = client.get("/search?q=a&tags=x&tags=y").json
+        assert first["tags"] == ["x", "y"]
+        assert client.get("/search?q=a&tags=x&tags=y").json == first
+        assert client.get("/search?q=b").json["q"] == "b"
+
+    def test_invalid_query_is_not_cached(self, client):
+        for _ in range(2):
+            assert client.get("/search").status_code == 400
+        assert client.get("/search?q=").json["q"] == ""
+
+
+@pytest.mark.usefixtures("app_with_body_cache")
+class TestBodyCache:
+    def test_redelivery(self, client):
+        body = {"event": "paid", "delivery": 1}
+        first = client.post("/webhook", json=body).json
+        assert first["event"] == "paid"
+        assert client.post("/webhook", json=body).json == first
+        assert client.post("/webhook", json={**body, "delivery": 2}).json != first
+
+    def test_invalid_body(self, client):
+        for _ in range(2):
+            response = client.post("/webhook", json={"event": "paid"})
+            assert response.status_code == 400
+
+    def test_unsupported_media_type(self, client):
+        response = client.post("/webhook", data="event=paid")
+        assert response.status_code == 415
+
+    def test_malformed_json(self, client):
+        response = client.post(
+            "/webhook", data='{"event": ', content_type="application/json"
+        )
+        assert response.status_code == 400
+        errors = response.json["validation_error"]["body_params"]
+        assert [e["type"] for e in errors] == ["json_invalid"]
+
+    def test_mutable_fields_are_not_cached(self, app, client):
+        class TaggedWebhook(Webhook):
+            model_config = ConfigDict(frozen=True)
+
+            tags: List[str] = []
+
+        with pytest.warns(UserWarning, match="has mutable fields"):
+
+            @app.route("/webhook/tagged", methods=["POST"])
+            @validate(body_cache=16)
+            def tagged_webhook(body: TaggedWebhook):
+                body.tags.append("seen")
+                return {"tags": body.tags}
+
+        body = {"event": "paid", "delivery": 1, "tags": ["new"]}
+        for _ in range(2):
+            response = client.post("/webhook/tagged", json=body)
+            assert response.json == {"tags": ["new", "seen"]}
+
+
+@pytest.mark.usefixtures("app_with_deep_query")
+class TestDeepQuery:
+    def test_nested(self, client):
+        response = client.get(
+            "/orders?filter[status]=paid,shipped&filter[total][gte]=100&sort=-total,id"
+        )
+        assert response.json == {
+            "filter": {
+                "status": ["paid", "shipped"],
+                "total": {"gte": 100, "lte": None},
+            },
+            "sort": ["-total", "id"],
+        }
+
+    def test_unknown_key(self, client):
+        response = client.get("/orders?filter[totl][gte]=100")
+        assert response.status_code == 400
+        assert response.json["validation_error"]["query_params"] == [
+            {
+                "loc": ["filter", "totl"],
+                "msg": "Extra inputs are not permitted",
+                "type": "extra_forbidden",
+            }
+        ]
+
+
+@pytest.mark.usefixtures("app_with_response_memo")
+class TestResponseMemo:
+    def test_many(self, client):
+        for _ in range(2):
+            response = client.get("/countries")
+            assert response.json == [{"code": "CZ", "name": "Czechia"}, {"code": "XX"}]
+
+    def test_single(self, client):
+        for _ in range(2):
+            assert client.get("/countries/1").json == {"code": "XX", "name": None}
+
+
+class TestResponseCache:
+    def test_cached(self, client, app_with_response_cache):
+        calls = app_with_response_cache
+        for _ in range(2):
+            response = client.get("/cached/1?q=CZ")
+            assert response.json == {"code": "CZ", "name": "1"}
+            assert response.mimetype == "application/json"
+        assert calls == [1]
+        client.get("/cached/2?q=CZ")
+        client.post("/cached/2?q=CZ")
+        assert calls == [1, 2, 2]
+
+    def test_vary_headers(self, client, app_with_response_cache):
+        calls = app_with_response_cache
+        for token in ["", "Bearer a", "Bearer b"]:
+            for _ in range(2):
+                client.get("/cached/1?q=CZ", headers={"Authorization": token})
+        assert calls == [1, 1, 1]
+        client.set_cookie("session", "a")
+        client.get("/cached/1?q=CZ")
+        assert calls == [1, 1, 1, 1]
+
+    def test_public(self, app, client, response_cache):
+        calls = []
+
+        @app.route("/public")
+        @validate(response_cache=response_cache, vary_headers=())
+        def public():
+            calls.append(1)
+            return Country(code="CZ")
+
+        client.get("/public", headers={"Authorization": "Bearer a"})
+        assert client.get("/public").json["code"] == "CZ"
+        assert calls == [1]
+
+    def test_not_cached(self, client, app_with_response_cache):
+        calls = app_with_response_cache
+        for _ in range(2):
+            assert client.get("/cached/1").status_code == 400
+            assert client.get("/cached/1?q=headers").headers["X-Custom"] == "1"
+        assert calls == [1, 1]
+
+
+class TestSingleflight:
+    def test_coalesced(self, app_with_singleflight):
+        app, calls, release = app_with_singleflight
+        urls = ["/coalesced?q=CZ"] * 4 + ["/coalesced?q=SK"]
+        with ThreadPoolExecutor(len(urls)) as pool:
+            futures = [pool.submit(app.test_client().get, url) for url in urls]
+            time.sleep(0.2)
+            release.set()
+            responses = [future.result() for future in futures]
+        assert sorted(calls) == ["CZ", "SK"]
+        assert [response.status_code for response in responses] == [201] * 5
+        codes = [response.json["code"] for response in responses]
+        assert codes == ["CZ"] * 4 + ["SK"]
+
+    @pytest.mark.parametrize(
+        "url,headers",
+        [
+            ("/coalesced?q=cookie", [{}] * 3),
+            ("/coalesced?q=CZ", [{"Authorization": f"Bearer {i}"} for i in range(3)]),
+        ],
+    )
+    def test_not_shared(self, app_with_singleflight, url, headers):
+        app, calls, release = app_with_singleflight
+        with ThreadPoolExecutor(len(headers)) as pool:
+            futures = [
+                pool.submit(app.test_client().get, url, headers=request_headers)
+                for request_headers in headers
+            ]
+            time.sleep(0.2)
+            release.set()
+            responses = [future.result() for future in futures]
+        assert len(calls) == 3
+        assert [response.status_code for response in responses] == [201] * 3
+        cookies = {response.headers.get("Set-Cookie") for response in responses}
+        assert len(cookies) == (3 if "cookie" in url else 1)
+
+
+@pytest.mark.usefixtures("app_with_batch")
+class TestBatch:
+    def test_batch(self, client):
+        requests = [
+            {"id": "a", "path": "/batch/items/1", "query": {"q": "CZ"}},
+            {"id": "b", "path": "/batch/items/2"},
+            {"method": "POST", "path": "/batch/items", "body": {"code": "SK"}},
+            {"path": "/batch/plain"},
+            {"path": "/batch/missing"},
+        ]
+        response = client.post("/batch", json={"requests": requests})
+        assert response.status_code == 200
+        responses = response.json["responses"]
+        assert [item["status"] for item in responses] == [200, 400, 201, 404, 404]
+        assert responses[0] == {
+            "id": "a",
+            "status": 200,
+            "body": {"code": "CZ", "name": "1"},
+        }
+        assert "query_params" in responses[1]["body"]["validation_error"]
+        assert responses[2]["body"] == {"created": ["SK"]}
+
+    def test_safe_requests_run_in_parallel(self, client):
+        requests = [
+            {"path": f"/batch/items/{i}", "query": {"q": "parallel"}} for i in range(2)
+        ]
+        response = client.post("/batch", json={"requests": requests})
+        assert [item["status"] for item in response.json["responses"]] == [200, 200]
+
+    def test_query_string_in_path(self, client):
+        requests = [
+            {"path": "/batch/items/1?q=CZ"},
+            {"path": "/batch/items/2?q=CZ", "query": {"q": "SK"}},
+            {"path": "/batch/items/3", "query": {"q": "SK"}},
+        ]
+        response = client.post("/batch", json={"requests": requests})
+        assert response.status_code == 200
+        responses = response.json["responses"]
+        assert [item["status"] for item in responses] == [200, 400, 200]
+        assert responses[0]["body"] == {"code": "CZ", "name": "1"}
+        assert "Query string" in responses[1]["body"]["detail"]
+
+    def test_invalid_responses(self, client):
+        requests = [
+            {"path": "/batch/items/1", "query": {"q": "raw"}},
+            {"path": "/batch/items/2", "query": {"q": "error"}},
+            {"path": "/batch/items/3", "query": {"q": "CZ"}},
+        ]
+        response = client.post("/batch", json={"requests": requests})
+        assert response.status_code == 200
+        responses = response.json["responses"]
+        assert [item["status"] for item in responses] == [200, 500, 200]
+        assert responses[0]["body"] == "not JSON"
+        assert responses[1]["body"] == {"detail": "Internal Server Error"}
+
+    def test_batch_limits(self, client):
+        requests = [{"path": "/batch/items/1", "query": {"q": "CZ"}}] * 6
+        response = client.post("/batch", json={"requests": requests})
+        assert response.status_code == 400
+        batch = {"method": "POST", "path": "/batch", "body": {"requests": []}}
+        response = client.post("/batch", json={"requests": [batch]})
+        assert response.json["responses"][0]["status"] == 404
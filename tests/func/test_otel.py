@@ -0,0 +1,119 @@
+import json
+
+import pytest
+from flask_pydantic import otel
+from flask_pydantic.otel import OpenTelemetry
+
+sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode  # noqa: E402
+
+
+@pytest.fixture
+def exporter():
+    return InMemorySpanExporter()
+
+
+@pytest.fixture
+def provider(exporter):
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider
+
+
+@pytest.fixture
+def instruments(provider):
+    return [OpenTelemetry(tracer_provider=provider)]
+
+
+@pytest.fixture
+def view_hook(provider):
+    return lambda: provider.get_tracer("test").start_as_current_span("store")
+
+
+@pytest.fixture
+def otel_app(instrumented_app):
+    return instrumented_app
+
+
+def send(provider, app, *args, **kwargs):
+    with provider.get_tracer("test").start_as_current_span("request"):
+        return app.test_client().open(*args, **kwargs)
+
+
+def test_phase_spans(provider, exporter, otel_app):
+    body = json.dumps([{"name": "a"}, {"name": "b"}, {"name": "c"}])
+    response = send(
+        provider,
+        otel_app,
+        "/items/1?limit=2",
+        method="POST",
+        data=body,
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert list(spans) == [
+        "flask_pydantic.path_params",
+        "flask_pydantic.query_params",
+        "flask_pydantic.body_params",
+        "store",
+        "flask_pydantic.view",
+        "flask_pydantic.serialization",
+        "request",
+    ]
+    parent = spans["request"].context.span_id
+    assert all(
+        span.parent.span_id == parent
+        for name, span in spans.items()
+        if name.startswith("flask_pydantic")
+    )
+    assert spans["store"].parent.span_id == spans["flask_pydantic.view"].context.span_id
+    assert dict(spans["flask_pydantic.body_params"].attributes) == {
+        "flask_pydantic.endpoint": "import_items",
+        "flask_pydantic.model": "Item",
+        "flask_pydantic.items": 3,
+        "flask_pydantic.bytes": len(body),
+    }
+    serialization = spans["flask_pydantic.serialization"].attributes
+    assert serialization["flask_pydantic.items"] == 2
+    assert serialization["flask_pydantic.bytes"] == len(response.data)
+
+
+def test_validation_errors(provider, exporter, otel_app):
+    send(provider, otel_app, "/items/1?limit=x", method="POST", json={"name": "a"})
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert "flask_pydantic.view" not in spans
+    assert spans["request"].attributes["flask_pydantic.validation_errors"] == (
+        "body_params",
+        "query_params",
+    )
+
+
+def test_view_error(provider, exporter, otel_app):
+    otel_app.testing = True
+    with pytest.raises(KeyError):
+        send(provider, otel_app, "/fail")
+    [view] = [
+        span
+        for span in exporter.get_finished_spans()
+        if span.name == "flask_pydantic.view"
+    ]
+    assert view.status.status_code == StatusCode.ERROR
+    assert view.events[0].name == "exception"
+
+
+def test_no_spans_without_recording_parent(exporter, otel_app):
+    otel_app.test_client().post("/items/1", json=[])
+    # only the span of the view itself
+    assert [span.name for span in exporter.get_finished_spans()] == ["store"]
+
+
+def test_noop_without_opentelemetry(monkeypatch, provider, exporter):
+    monkeypatch.setattr(otel, "trace", None)
+    instrument = OpenTelemetry()
+    with provider.get_tracer("test").start_as_current_span("request"):
+        assert instrument.start_request("items", None) is None
@@ -0,0 +1,65 @@
+import os
+import pstats
+
+import pytest
+from flask_pydantic.profiling import Profiler
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return Profiler(str(tmp_path), sample_rate=2, rates={"skipped": 0, "every": 1})
+
+
+@pytest.fixture
+def instruments(profiler):
+    return [profiler]
+
+
+@pytest.fixture
+def profiled_app(instrumented_app):
+    return instrumented_app
+
+
+def calls(stats: pstats.Stats, name: str) -> int:
+    return sum(stat[1] for func, stat in stats.stats.items() if func[2] == name)
+
+
+def test_sampling(profiled_app, profiler):
+    client = profiled_app.test_client()
+    for _ in range(5):
+        client.post("/items", json={"name": "a"})
+        client.get("/skipped")
+        client.get("/every")
+    profiles = profiler.profiles()
+    assert set(profiles) == {"create_item", "every"}
+    # requests 1, 3 and 5
+    assert calls(profiles["create_item"], "create_item") == 3
+    assert calls(profiles["every"], "every") == 5
+
+
+def test_rotation(profiled_app, profiler, tmp_path):
+    client = profiled_app.test_client()
+    client.post("/items", json={"name": "a"})
+    paths = profiler.rotate()
+    assert list(paths) == ["create_item"]
+    assert os.path.dirname(paths["create_item"]) == str(tmp_path)
+    stats = pstats.Stats(paths["create_item"])
+    assert calls(stats, "validate_request") == 1
+    assert profiler.profiles() == {}
+    assert profiler.rotate() == {}
+
+
+def test_rotation_interval(profiled_app, tmp_path):
+    profiler = Profiler(str(tmp_path / "profiles"), sample_rate=1, interval=0)
+    profiled_app.extensions["flask-pydantic"].instruments = [profiler]
+    profiled_app.test_client().get("/every")
+    [name] = os.listdir(tmp_path / "profiles")
+    assert name.startswith("every.") and name.endswith(f".{os.getpid()}.pstats")
+
+
+def test_one_request_is_profiled_at_a_time(profiler):
+    state = profiler.start_request("every", None)
+    assert state is not None
+    assert profiler.start_request("every", None) is None
+    profiler.end_request(state, None, {})
+    assert profiler.start_request("every", None) is not None
@@ -0,0 +1,77 @@
+import json
+import threading
+
+import pytest
+from flask_pydantic.stats import PerfStats, stats_view
+
+
+@pytest.fixture
+def stats():
+    return PerfStats()
+
+
+@pytest.fixture
+def instruments(stats):
+    return [stats]
+
+
+@pytest.fixture
+def stats_app(instrumented_app, stats):
+    instrumented_app.add_url_rule("/stats", view_func=stats_view(stats))
+    return instrumented_app
+
+
+def test_requests_of_threads_are_merged(stats_app, stats):
+    def post(count):
+        client = stats_app.test_client()
+        for _ in range(count):
+            client.post("/items", json={"name": "a"})
+        client.post("/items", json={"name": 1})
+
+    threads = [threading.Thread(target=post, args=(5,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    post(5)
+    [(endpoint, item_stats)] = stats.snapshot().items()
+    assert endpoint == "create_item"
+    assert item_stats.requests == 30
+    assert item_stats.phases["total"].count == 30
+    assert item_stats.phases["body_params"].count == 30
+    assert item_stats.phases["view"].count == 25
+    assert item_stats.errors == {"body_params": 5}
+    assert item_stats.error_rates() == {"body_params": 5 / 30}
+    assert item_stats.request_bytes.max == len(json.dumps({"name": "a"}))
+    assert item_stats.response_bytes.count == 30
+    assert item_stats.models == {"body_params": "Item", "serialization": "Item"}
+    body_cache = item_stats.caches["body"]
+    assert body_cache["hits"] + body_cache["misses"] == 30
+    assert body_cache["hits"] >= 20
+
+
+def test_stats_view(stats_app, stats):
+    client = stats_app.test_client()
+    client.post("/items", json={"name": "a"})
+    response = client.get("/stats")
+    endpoints = response.json["endpoints"]
+    assert list(endpoints) == ["create_item"]
+    assert endpoints["create_item"]["requests"] == 1
+    assert endpoints["create_item"]["phases"]["total"]["p99"] > 0
+    stats.reset()
+    assert client.get("/stats").json == {"endpoints": {}}
+
+
+def test_cli(stats_app, tmp_path):
+    runner = stats_app.test_cli_runner()
+    assert "No statistics." in runner.invoke(args=["pydantic", "stats"]).output
+    stats_app.test_client().post("/items", json={"name": 1})
+    output = runner.invoke(args=["pydantic", "stats"]).output
+    assert "create_item: 1 requests" in output
+    assert "body_params (Item): p50" in output
+    assert "body_params errors: 100.00%" in output
+    assert "body cache: 0.00% hits" in output
+    result = runner.invoke(args=["pydantic", "stats", "--json"])
+    assert json.loads(result.output)["endpoints"]["create_item"]["requests"] == 1
+    result = runner.invoke(args=["pydantic", "stats", "--dir", str(tmp_path)])
+    assert "No statistics." in result.output
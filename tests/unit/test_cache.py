@@ -0,0 +1,196 @@
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import FrozenSet, List, Literal, Optional, Tuple, Union
+
+import gc
+
+import pytest
+from flask_pydantic.cache import LRUCache, SerializationMemo, is_frozen
+from flask_pydantic.spec import RouteSpec
+from flask_pydantic.validation import validate_request
+from pydantic import BaseModel, ConfigDict, Field
+from werkzeug.datastructures import MultiDict
+
+
+class FrozenQuery(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    page: int = 1
+
+
+class MutableQuery(BaseModel):
+    page: int = 1
+
+
+class Event(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    kind: str
+
+
+@dataclass(frozen=True)
+class FrozenData:
+    page: int
+
+
+@dataclass
+class MutableData:
+    page: int
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class Tagged(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    tags: Tuple[str, ...] = ()
+    colors: FrozenSet[Color] = frozenset()
+    kind: Literal["a", "b"] = "a"
+    created: Optional[datetime] = None
+    parent: Optional["Tagged"] = None
+    data: Union[FrozenData, int] = 0
+
+
+class MutableTags(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    tags: List[str] = []
+
+
+class NestedMutable(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    query: MutableQuery = MutableQuery()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size, stats.maxsize) == (3, 1, 2, 2)
+    assert stats.hit_rate == 0.75
+    cache.clear()
+    assert cache.stats() == (0, 0, 0, 2)
+
+
+def test_lru_cache_ttl():
+    clock = Clock()
+    cache = LRUCache(2, ttl=10, timer=clock)
+    cache.set("a", 1)
+    clock.now = 9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a", "expired") == "expired"
+    assert len(cache) == 0
+
+
+def test_lru_cache_size():
+    with pytest.raises(ValueError):
+        LRUCache(0)
+
+
+@pytest.mark.parametrize(
+    "type_,frozen",
+    [
+        (FrozenQuery, True),
+        (MutableQuery, False),
+        (FrozenData, True),
+        (MutableData, False),
+        (Tagged, True),
+        (MutableTags, False),
+        (NestedMutable, False),
+        (Tuple[int, List[int]], False),
+        (dict, False),
+    ],
+)
+def test_is_frozen(type_, frozen):
+    assert is_frozen(type_) is frozen
+
+
+def test_query_cache():
+    spec = RouteSpec(query=FrozenQuery, query_cache=8)
+    first = validate_request(
+        spec, query=MultiDict({"page": "2"}), query_string=b"page=2"
+    )
+    second = validate_request(
+        spec, query=MultiDict({"page": "2"}), query_string=b"page=2"
+    )
+    assert second.query_params is first.query_params
+    invalid = validate_request(
+        spec, query=MultiDict({"page": "x"}), query_string=b"page=x"
+    )
+    assert "query_params" in invalid.errors
+    assert spec.query_cache.stats() == (1, 2, 1, 8)
+    assert spec.describe()["caches"]["query"]["hits"] == 1
+
+
+def test_query_cache_disabled_for_mutable_model():
+    with pytest.warns(UserWarning, match="not frozen"):
+        spec = RouteSpec(query=MutableQuery, query_cache=8)
+    assert spec.query_cache is None
+    assert RouteSpec(query=FrozenQuery).query_cache is None
+
+
+def test_body_cache():
+    spec = RouteSpec(body=Event, body_cache=8)
+    raw = b'{"id": 1, "kind": "created"}'
+    first = validate_request(spec, raw_body=raw)
+    assert first.body_params == Event(id=1, kind="created")
+    assert validate_request(spec, raw_body=raw).body_params is first.body_params
+    assert validate_request(spec, raw_body=raw, strict=True).body_params == Event(
+        id=1, kind="created"
+    )
+    assert "body_params" in validate_request(spec, raw_body=b'{"id": 1}').errors
+    assert spec.body_cache.stats() == (1, 3, 2, 8)
+
+
+def test_body_cache_disabled():
+    with pytest.warns(UserWarning, match="MutableQuery is not frozen"):
+        assert RouteSpec(body=MutableQuery, body_cache=8).body_cache is None
+    with pytest.warns(UserWarning, match="lists of models are mutable"):
+        spec = RouteSpec(body=Event, body_cache=8, request_body_many=True)
+    assert spec.body_cache is None
+
+
+class Reference(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    code: str = Field(alias="Code")
+    label: Optional[str] = None
+
+
+def test_serialization_memo():
+    memo = SerializationMemo()
+    ref = Reference(Code="a")
+    assert memo.dump_json(ref) == ref.model_dump_json()
+    assert memo.dump_json(ref) is memo.dump_json(ref)
+    assert memo.dump_json(ref, by_alias=True, exclude_none=True) == '{"Code":"a"}'
+    assert memo.stats() == (2, 2, 1, None)
+    del ref
+    gc.collect()
+    assert len(memo) == 0
+
+
+def test_serialization_memo_skips_mutable_models():
+    memo = SerializationMemo()
+    query = MutableQuery()
+    assert memo.dump_json(query) == '{"page":1}'
+    assert memo.stats() == (0, 0, 0, None)
@@ -1,16 +1,19 @@
 import re
-from typing import Any, List, NamedTuple, Optional, Type, Union
+from dataclasses import dataclass
+from typing import Any, FrozenSet, List, NamedTuple, Optional, Tuple, Type, Union
 from ..util import assert_matches
 
 import pytest
 from flask import jsonify
 from flask_pydantic import validate, ValidationError
+from flask_pydantic.converters import convert_multi_dict, list_fields
 from flask_pydantic.core import convert_query_params, is_iterable_of_models
 from flask_pydantic.exceptions import (
     InvalidIterableOfModelsException,
     JsonBodyParsingError,
 )
-from pydantic import BaseModel, RootModel
+from pydantic import BaseModel, Field, RootModel
+from typing_extensions import TypedDict
 from werkzeug.datastructures import ImmutableMultiDict
 
 
@@ -658,3 +661,41 @@ def test_convert_query_params(query_params: ImmutableMultiDict, expected_result:
         d: Optional[List[int]]
 
     assert convert_query_params(query_params, Model) == expected_result
+
+
+def test_list_fields_of_adapter_types():
+    class Typed(TypedDict):
+        a: int
+        b: List[str]
+
+    @dataclass
+    class Data:
+        c: Optional[List[int]]
+        d: str
+
+    assert list_fields(Typed) == {"b"}
+    assert list_fields(Data) == {"c"}
+    assert list_fields(int) == frozenset()
+
+
+def test_list_fields_include_aliases():
+    class Model(BaseModel):
+        tags: List[str] = Field(alias="tag")
+        name: str = Field(alias="n")
+
+    assert list_fields(Model) == {"tags", "tag"}
+
+
+def test_list_fields_of_tuples_and_sets():
+    class Model(BaseModel):
+        tags: Tuple[str, ...] = ()
+        ids: FrozenSet[int] = frozenset()
+        name: str
+
+    assert list_fields(Model) == {"tags", "ids"}
+
+
+def test_convert_multi_dict():
+    content = ImmutableMultiDict([("a", "1"), ("b", "2"), ("a", "3"), ("b", "4")])
+    assert convert_multi_dict(content, frozenset({"a"})) == {"a": ["1", "3"], "b": "2"}
+    assert convert_multi_dict(ImmutableMultiDict(), frozenset({"a"})) == {}
@@ -0,0 +1,66 @@
+import pytest
+from flask import Flask
+from flask_pydantic import FlaskPydantic, validate
+from flask_pydantic.spec import get_route_spec
+from pydantic import BaseModel, ConfigDict
+
+
+class DeferredQuery(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
+    limit: int = 10
+
+
+@pytest.fixture
+def deferred_app():
+    app = Flask("deferred_app")
+
+    @app.route("/items/<item_id>")
+    @validate()
+    def items(item_id: int, query: DeferredQuery):
+        return query
+
+    @app.route("/plain")
+    def plain():
+        return "plain"
+
+    return app
+
+
+class TestFlaskPydantic:
+    def test_lazy_does_not_build(self, deferred_app):
+        FlaskPydantic(deferred_app, gc_freeze=False)
+        assert deferred_app.extensions["flask-pydantic"]
+        assert not get_route_spec(deferred_app.view_functions["items"]).built
+
+    def test_eager_builds_all_routes(self, deferred_app, mocker):
+        freeze = mocker.patch("gc.freeze")
+        ext = FlaskPydantic(deferred_app, schema_build="eager")
+
+        spec = get_route_spec(deferred_app.view_functions["items"])
+        assert spec.built
+        assert set(spec.path_adapters) == {"item_id"}
+        assert DeferredQuery.__pydantic_complete__
+        assert set(ext.build_times) == {"items"}
+        freeze.assert_called_once_with()
+
+    def test_eager_from_config(self, deferred_app, mocker):
+        deferred_app.config["FLASK_PYDANTIC_SCHEMA_BUILD"] = "eager"
+        deferred_app.config["FLASK_PYDANTIC_GC_FREEZE"] = False
+        freeze = mocker.patch("gc.freeze")
+        FlaskPydantic(deferred_app)
+        assert get_route_spec(deferred_app.view_functions["items"]).built
+        freeze.assert_not_called()
+
+    def test_unknown_strategy(self, deferred_app):
+        with pytest.raises(ValueError):
+            FlaskPydantic(deferred_app, schema_build="sometimes")
+
+    def test_lazy_route_builds_on_request(self, deferred_app):
+        FlaskPydantic(deferred_app)
+        spec = get_route_spec(deferred_app.view_functions["items"])
+        assert not spec.built
+        response = deferred_app.test_client().get("/items/1?limit=3")
+        assert response.json == {"limit": 3}
+        assert spec.built
+        assert set(spec.path_adapters) == {"item_id"}
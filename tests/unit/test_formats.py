@@ -0,0 +1,245 @@
+from datetime import date
+from typing import List, Optional
+
+import pytest
+from flask_pydantic.formats import (
+    check_formats,
+    columnar_serializer,
+    dump_arrow,
+    dump_columnar,
+    dump_parquet,
+    flat_schema,
+    iter_csv,
+    negotiate_format,
+    tabular_schema,
+)
+from pydantic import BaseModel, Field, computed_field, field_serializer
+from pydantic_core import from_json
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+
+class Address(BaseModel):
+    city: str
+
+
+class Person(BaseModel):
+    name: str = Field(alias="fullName")
+    born: date
+    address: Optional[Address] = None
+
+    @computed_field
+    @property
+    def initial(self) -> str:
+        return self.name[0]
+
+
+class Tagged(BaseModel):
+    tags: List[str]
+
+    @field_serializer("tags")
+    def join_tags(self, tags: List[str]) -> str:
+        return ",".join(tags)
+
+
+class Single(BaseModel):
+    value: int
+
+
+people = [
+    Person(fullName="Ann", born=date(2000, 1, 2), address=Address(city="Prague")),
+    Person(fullName="Bob", born=date(1990, 3, 4)),
+]
+
+
+def test_dump_columnar():
+    assert from_json(dump_columnar(people)) == {
+        "columns": ["name", "born", "address", "initial"],
+        "rows": [
+            ["Ann", "2000-01-02", {"city": "Prague"}, "A"],
+            ["Bob", "1990-03-04", None, "B"],
+        ],
+    }
+
+
+def test_dump_columnar_by_alias():
+    result = from_json(dump_columnar(people, by_alias=True))
+    assert result["columns"] == ["fullName", "born", "address", "initial"]
+
+
+def test_dump_columnar_field_serializers():
+    result = from_json(dump_columnar([Tagged(tags=["a", "b"])]))
+    assert result == {"columns": ["tags"], "rows": [["a,b"]]}
+
+
+def test_dump_columnar_single_field():
+    result = from_json(dump_columnar([Single(value=1), Single(value=2)]))
+    assert result == {"columns": ["value"], "rows": [[1], [2]]}
+
+
+def test_dump_columnar_empty():
+    assert from_json(dump_columnar([], model=Single)) == {
+        "columns": ["value"],
+        "rows": [],
+    }
+    assert from_json(dump_columnar([])) == {"columns": [], "rows": []}
+
+
+def test_dump_columnar_mixed_models():
+    with pytest.raises(TypeError):
+        dump_columnar([Single(value=1), Tagged(tags=[])])
+
+
+def test_serializer_is_cached():
+    assert columnar_serializer(Single) is columnar_serializer(Single)
+    assert columnar_serializer(Single) is not columnar_serializer(Single, True)
+
+
+@pytest.mark.parametrize(
+    "requested,accept,expected",
+    [
+        (None, None, "json"),
+        ("columnar", None, "columnar"),
+        ("json", "application/json; format=columnar", "json"),
+        (None, "application/json; format=columnar", "columnar"),
+        (None, "text/html, application/json;format=columnar;q=0.9", "columnar"),
+        (None, "application/json; format=xml", None),
+        (None, "text/csv", "csv"),
+        (None, "text/html, text/csv;q=0.5", "csv"),
+        (None, "text/csv;q=0.5, application/json;q=0.9", "json"),
+        (None, "text/csv;q=0.5, */*;q=0.9", "json"),
+        (None, "text/*", "csv"),
+        (None, "application/vnd.apache.parquet", None),
+        ("xml", None, None),
+    ],
+)
+def test_negotiate_format(requested, accept, expected):
+    formats = ("json", "columnar", "csv")
+    accept = parse_accept_header(accept, MIMEAccept)
+    assert negotiate_format(requested, accept, formats) == expected
+
+
+@pytest.mark.parametrize(
+    "accept,expected",
+    [(None, "csv"), ("*/*", "csv"), ("application/json", None)],
+)
+def test_negotiate_format_without_json(accept, expected):
+    accept = parse_accept_header(accept, MIMEAccept)
+    assert negotiate_format(None, accept, ("csv", "columnar")) == expected
+
+
+def test_check_formats():
+    assert check_formats(["json", "columnar"]) == ("json", "columnar")
+    with pytest.raises(ValueError):
+        check_formats(["xml"])
+
+
+class Row(BaseModel):
+    id: int
+    person: Person
+    scores: List[int] = []
+
+
+rows = [Row(id=i, person=person, scores=[i] * i) for i, person in enumerate(people)]
+
+
+def test_flat_schema():
+    schema = flat_schema(Row)
+    assert schema is flat_schema(Row)
+    assert schema.names == [
+        "id",
+        "person.name",
+        "person.born",
+        "person.address.city",
+        "person.initial",
+        "scores",
+    ]
+    assert flat_schema(Row, by_alias=True).names[1] == "person.fullName"
+    assert [c.native for c in schema.columns] == [True] * 5 + [False]
+
+
+def test_dump_columnar_nested_by_alias():
+    result = from_json(dump_columnar(rows, by_alias=True))
+    assert result["rows"][0][1] == {
+        "fullName": "Ann",
+        "born": "2000-01-02",
+        "address": {"city": "Prague"},
+        "initial": "A",
+    }
+
+
+def test_iter_csv():
+    # rows are read from the iterable batch by batch
+    chunks = list(iter_csv(tabular_schema(rows, False, None), iter(rows), batch_size=1))
+    assert chunks == [
+        "id,person.name,person.born,person.address.city,person.initial,scores\r\n",
+        "0,Ann,2000-01-02,Prague,A,[]\r\n",
+        "1,Bob,1990-03-04,,B,[1]\r\n",
+    ]
+
+
+def test_iter_csv_field_serializers():
+    schema = tabular_schema([Tagged(tags=["a", "b"])], False, None)
+    assert schema.dump_rows
+    assert "".join(iter_csv(schema, [Tagged(tags=["a", "b"])])) == 'tags\r\n"a,b"\r\n'
+
+
+class Inner(BaseModel):
+    some_val: int = Field(serialization_alias="someVal")
+
+
+class Outer(BaseModel):
+    my_id: int = Field(serialization_alias="myId")
+    inner: Inner
+    items: List[Inner]
+
+
+class SerializedOuter(Outer):
+    @field_serializer("my_id")
+    def scale_id(self, my_id: int) -> int:
+        return my_id * 10
+
+
+@pytest.mark.parametrize("model,my_id", [(Outer, "1"), (SerializedOuter, "10")])
+def test_iter_csv_by_alias(model, my_id):
+    content = [model(my_id=1, inner=Inner(some_val=2), items=[Inner(some_val=3)])]
+    assert "".join(iter_csv(tabular_schema(content, True, None), content)) == (
+        "myId,inner.someVal,items\r\n" f'{my_id},2,"[{{""someVal"":3}}]"\r\n'
+    )
+
+
+def test_iter_csv_empty():
+    assert list(iter_csv(tabular_schema([], False, Single), [])) == ["value\r\n"]
+    assert list(iter_csv(tabular_schema([], False, None), [])) == []
+
+
+def test_dump_arrow():
+    pyarrow = pytest.importorskip("pyarrow")
+    schema = tabular_schema(rows, False, None)
+    data = dump_arrow(schema, rows, batch_size=1)
+    table = pyarrow.ipc.open_stream(data).read_all()
+    assert table.num_rows == 2
+    assert table.column("person.address.city").to_pylist() == ["Prague", None]
+    assert table.column("person.born").to_pylist() == [
+        date(2000, 1, 2),
+        date(1990, 3, 4),
+    ]
+    assert table.column("scores").to_pylist() == ["[]", "[1]"]
+    content = [Outer(my_id=1, inner=Inner(some_val=2), items=[Inner(some_val=3)])]
+    data = dump_arrow(tabular_schema(content, True, None), content)
+    table = pyarrow.ipc.open_stream(data).read_all()
+    assert table.column("items").to_pylist() == ['[{"someVal":3}]']
+
+
+def test_dump_parquet():
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    schema = tabular_schema(rows, False, None)
+    data = dump_parquet(schema, rows, batch_size=1)
+    table = pyarrow.parquet.read_table(pyarrow.BufferReader(data))
+    assert table.column("id").to_pylist() == [0, 1]
+    empty = pyarrow.parquet.read_table(
+        pyarrow.BufferReader(dump_parquet(tabular_schema([], False, Single), []))
+    )
+    assert empty.column_names == ["value"]
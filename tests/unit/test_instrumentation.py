@@ -0,0 +1,93 @@
+from typing import List
+
+import pytest
+from flask_pydantic.instrumentation import Instrument, start_trace
+from flask_pydantic.spec import RouteSpec
+from flask_pydantic.validation import validate_request
+from pydantic import BaseModel
+from werkzeug.datastructures import MultiDict
+
+
+class Item(BaseModel):
+    name: str
+
+
+class Query(BaseModel):
+    limit: int
+
+
+class Recorder(Instrument):
+    def __init__(self, sample: bool = True):
+        self.sample = sample
+        self.events = []
+
+    def start_request(self, endpoint, spec):
+        return endpoint if self.sample else None
+
+    def start_phase(self, state, phase, attributes):
+        self.events.append(("start", state, phase))
+        return phase
+
+    def end_phase(self, state, phase, token, attributes, error):
+        assert token == phase
+        self.events.append(("end", phase, dict(attributes), type(error)))
+
+    def end_request(self, state, response, errors):
+        self.events.append(("finish", response, list(errors)))
+
+
+def test_trace_is_not_started_without_sampling():
+    spec = RouteSpec(body=Item)
+    assert start_trace([Recorder(sample=False)], "items", spec) is None
+
+
+def test_validation_phases():
+    def view(item_id: int):
+        pass
+
+    recorder = Recorder()
+    spec = RouteSpec(view, body=Item, query=Query, request_body_many=True)
+    trace = start_trace([Recorder(sample=False), recorder], "items", spec)
+    validated = validate_request(
+        spec,
+        path_params={"item_id": "1"},
+        query=MultiDict({"limit": "x"}),
+        raw_body=b'[{"name": "a"}, {"name": "b"}]',
+        trace=trace,
+    )
+    trace.errors = validated.errors
+    trace.finish("response")
+    assert recorder.events == [
+        ("start", "items", "path_params"),
+        ("end", "path_params", {"model": None}, type(None)),
+        ("start", "items", "query_params"),
+        ("end", "query_params", {"model": "Query"}, type(None)),
+        ("start", "items", "body_params"),
+        (
+            "end",
+            "body_params",
+            {"model": "Item", "bytes": 30, "items": 2},
+            type(None),
+        ),
+        ("finish", "response", ["query_params"]),
+    ]
+
+
+def test_phase_error():
+    recorder = Recorder()
+    trace = start_trace([recorder], "items", RouteSpec())
+    with pytest.raises(KeyError):
+        with trace.phase("view"):
+            raise KeyError()
+    assert recorder.events[-1] == ("end", "view", {}, KeyError)
+
+
+def test_phases_end_in_reverse_order():
+    first, second = Recorder(), Recorder()
+    trace = start_trace([first, second], "items", RouteSpec())
+    order: List[Recorder] = []
+    first.end_phase = lambda *args: order.append(first)
+    second.end_phase = lambda *args: order.append(second)
+    with trace.phase("view"):
+        pass
+    assert order == [second, first]
@@ -0,0 +1,208 @@
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Dict, List, Literal, Optional, Tuple, Union
+from uuid import UUID
+
+import pytest
+from flask import Flask
+from flask_pydantic import FlaskPydantic, validate
+from flask_pydantic.payloads import (
+    PayloadGenerator,
+    request_corpus,
+    route_payload,
+    to_pairs,
+)
+from flask_pydantic.spec import RouteSpec
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, conint, constr
+from typing_extensions import Annotated, TypedDict
+from werkzeug.datastructures import MultiDict
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class Tag(TypedDict):
+    name: constr(min_length=2, max_length=4)
+
+
+@dataclass
+class Page:
+    number: conint(ge=1, le=5) = 1
+
+
+class Cat(BaseModel):
+    kind: Literal["cat"]
+    lives: conint(ge=1, le=9)
+
+
+class Dog(BaseModel):
+    kind: Literal["dog"]
+    good: bool
+
+
+class Tree(BaseModel):
+    name: str
+    children: List["Tree"] = []
+    parent: Optional["Tree"] = None
+
+
+class Order(BaseModel):
+    id: UUID
+    created: datetime
+    day: date
+    price: Decimal
+    amount: float = Field(gt=0, lt=10)
+    color: Color
+    tags: List[Tag] = Field(min_length=1, max_length=2)
+    meta: Dict[str, int]
+    pet: Annotated[Union[Cat, Dog], Field(discriminator="kind")]
+    page: Page
+    pair: Tuple[int, str]
+    tree: Tree
+    note: Optional[str]
+
+
+@pytest.mark.parametrize("model", [Order, Tree, Tag, Page, List[Order]])
+@pytest.mark.parametrize("seed", range(5))
+def test_generated_payloads_are_valid(model, seed):
+    generator = PayloadGenerator(seed=seed, optional=1.0)
+    adapter = TypeAdapter(model)
+    adapter.validate_python(generator.generate(model))
+    with pytest.raises(ValidationError):
+        adapter.validate_python(generator.invalid(model))
+
+
+class Constrained(BaseModel):
+    narrow: float = Field(gt=0.1, lt=0.2)
+    unit: float = Field(gt=0, lt=1)
+    closed: float = Field(ge=0.5, le=0.5)
+    halves: float = Field(multiple_of=0.5)
+    tenths: float = Field(gt=0.25, le=1, multiple_of=0.1)
+    negative: float = Field(lt=0)
+    count: int = Field(gt=0, lt=2)
+    even: int = Field(ge=-7, le=7, multiple_of=2)
+    scaled: Decimal = Field(gt=1, lt=2, multiple_of=Decimal("0.25"))
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_constrained_numbers_are_valid(seed):
+    generator = PayloadGenerator(seed=seed)
+    Constrained.model_validate(generator.generate(Constrained))
+
+
+def test_generation_is_deterministic():
+    payloads = [PayloadGenerator(seed=1).generate(Order) for _ in range(2)]
+    assert payloads[0] == payloads[1]
+    assert PayloadGenerator(seed=2).generate(Order) != payloads[0]
+
+
+def test_size_controls():
+    generator = PayloadGenerator(list_length=10, string_length=20, optional=1.0)
+    order = generator.generate(Order)
+    # within bounds of the schema
+    assert len(order["tags"]) == 2
+    assert all(len(tag["name"]) == 4 for tag in order["tags"])
+    assert len(order["meta"]) == 10
+    assert len(order["note"]) == 20
+    assert len(generator.generate_many(Tag)) == 10
+
+
+def test_max_depth():
+    def depth(tree: dict) -> int:
+        nested = tree.get("children", []) + [tree.get("parent") or {}]
+        return 1 + max(depth(child) for child in nested) if tree else 0
+
+    for max_depth in (0, 2, 6):
+        tree = PayloadGenerator(max_depth=max_depth, optional=1.0).generate(Tree)
+        # parent is nested by one level, children by two (array and object)
+        assert depth(tree) <= max_depth + 1
+
+
+def test_to_pairs():
+    value = {"q": "a", "tags": ["x", "y"], "on": True, "page": {"size": 2}, "n": None}
+    assert to_pairs(value) == [
+        ("q", "a"),
+        ("tags", "x"),
+        ("tags", "y"),
+        ("on", "true"),
+        ("page[size]", "2"),
+    ]
+
+
+class Query(BaseModel):
+    q: str
+    limit: int = 10
+
+
+class Search(BaseModel):
+    q: str
+
+
+def test_route_payload():
+    def view(item_id: int):
+        pass
+
+    generator = PayloadGenerator(seed=3)
+    spec = RouteSpec(view, query=Query, body=Tag, request_body_many=True)
+    payload = route_payload(spec, generator)
+    assert payload["valid"]
+    assert isinstance(payload["path"]["item_id"], int)
+    assert payload["query"][0][0] == "q"
+    assert len(payload["body"]) == 3
+    assert not route_payload(spec, generator, invalid=True)["valid"]
+    # strings of query parameters can be invalid only if they are missing
+    payload = route_payload(RouteSpec(query=Search), generator, invalid=True)
+    assert payload["valid"] or payload["query"] == []
+
+
+@pytest.fixture
+def corpus_app():
+    app = Flask("corpus_app")
+    FlaskPydantic(app)
+
+    @app.route("/orders/<int:order_id>", methods=["GET", "PUT"])
+    @validate()
+    def update_order(order_id: int, body: Order, query: Query):
+        return {"id": order_id}
+
+    @app.route("/search", methods=["GET"])
+    @validate()
+    def search(query: Query):
+        return {"q": query.q}
+
+    @app.route("/tags", methods=["POST"])
+    @validate(form=Tag)
+    def create_tag():
+        return {}
+
+    return app
+
+
+def test_request_corpus(corpus_app):
+    generator = PayloadGenerator(seed=0)
+    corpus = list(request_corpus(corpus_app, generator, count=20, invalid_ratio=0.5))
+    assert len(corpus) == 60
+    assert {request["method"] for request in corpus} == {"GET", "PUT", "POST"}
+    assert {request["valid"] for request in corpus} == {True, False}
+    client = corpus_app.test_client()
+    for request in corpus:
+        payload = {"json": request["json"]} if "json" in request else {}
+        if "form" in request:
+            payload["data"] = MultiDict(request["form"])
+        response = client.open(request["url"], method=request["method"], **payload)
+        assert response.status_code == (200 if request["valid"] else 400), request
+
+
+def test_cli(corpus_app):
+    runner = corpus_app.test_cli_runner()
+    args = ["pydantic", "payloads", "search", "--count", "3", "--seed", "7"]
+    result = runner.invoke(args=args)
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert [line["endpoint"] for line in lines] == ["search"] * 3
+    assert lines[0]["url"].startswith("/search?q=")
+    assert runner.invoke(args=args).output == result.output
@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional
+
+import pytest
+from flask_pydantic.exceptions import QueryParsingError
+from flask_pydantic.query import QueryParser, query_parser
+from flask_pydantic.spec import RouteSpec
+from flask_pydantic.validation import validate_request
+from pydantic import BaseModel, Field
+from typing_extensions import TypedDict
+from werkzeug.datastructures import MultiDict
+
+
+class Range(TypedDict, total=False):
+    gte: date
+    lte: date
+
+
+class Filter(BaseModel):
+    status: List[str] = []
+    created: Range = {}
+    labels: Dict[str, str] = {}
+
+
+@dataclass
+class Page:
+    number: int = 1
+    size: int = 20
+
+
+class Query(BaseModel):
+    filter_: Optional[Filter] = Field(None, alias="filter")
+    page: Page = Page()
+    sort: List[str] = []
+    q: Optional[str] = None
+
+
+class Tree(BaseModel):
+    name: Optional[str] = None
+    child: Optional["Tree"] = None
+
+
+def parse(parser: QueryParser, params: list) -> dict:
+    return parser.parse(MultiDict(params))
+
+
+def test_parse_nested():
+    parser = QueryParser(Query, delimiter=",")
+    params = [
+        ("filter[status]", "open"),
+        ("filter[status][]", "closed,draft"),
+        ("filter[created][gte]", "2024-01-01"),
+        ("filter[labels][env]", "prod"),
+        ("page[size]", "50"),
+        ("sort", "-created,id"),
+        ("q", "shoes"),
+        ("other", "x"),
+    ]
+    assert parse(parser, params) == {
+        "filter": {
+            "status": ["open", "closed", "draft"],
+            "created": {"gte": "2024-01-01"},
+            "labels": {"env": "prod"},
+        },
+        "page": {"size": "50"},
+        "sort": ["-created", "id"],
+        "q": "shoes",
+        "other": "x",
+    }
+    assert parser.has_lists
+
+
+def test_parse_field_names_and_aliases():
+    parser = QueryParser(Query)
+    assert parse(parser, [("filter_[status]", "a")]) == {"filter": {"status": ["a"]}}
+    assert parse(parser, [("sort", "a,b")]) == {"sort": ["a,b"]}
+
+
+def test_parse_recursive_model():
+    parser = QueryParser(Tree)
+    assert parse(parser, [("child[child][name]", "leaf")]) == {
+        "child": {"child": {"name": "leaf"}}
+    }
+    assert not parser.has_lists
+
+
+@pytest.mark.parametrize(
+    "key,loc,type_",
+    [
+        ("filter[unknown]", ["filter", "unknown"], "extra_forbidden"),
+        ("filter[created][eq]", ["filter", "created", "eq"], "extra_forbidden"),
+        ("unknown[a]", ["unknown"], "extra_forbidden"),
+        ("q[a]", ["q", "a"], "query_nesting"),
+        ("page", ["page"], "query_nesting"),
+        ("filter[status", ["filter[status"], "query_key"),
+    ],
+)
+def test_parse_errors(key, loc, type_):
+    with pytest.raises(QueryParsingError) as e:
+        parse(QueryParser(Query), [(key, "1")])
+    [error] = e.value.errors()
+    assert (error["loc"], error["type"]) == (loc, type_)
+
+
+def test_query_parser():
+    assert query_parser(Query) is None
+    assert query_parser(None, "deep") is None
+    assert not query_parser(Query, "flat", ",").nested
+    assert query_parser(Query, "deep").nested
+    with pytest.raises(ValueError):
+        query_parser(Query, "spaceDelimited")
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_validate_nested_query(strict):
+    spec = RouteSpec(query=Query, query_style="deep", query_delimiter=",")
+    query = MultiDict(
+        [("filter[created][gte]", "2024-01-01"), ("page[number]", "2"), ("sort", "a,b")]
+    )
+    validated = validate_request(spec, query=query, strict=strict)
+    assert validated.query_params == Query(
+        filter=Filter(created={"gte": date(2024, 1, 1)}),
+        page=Page(number=2),
+        sort=["a", "b"],
+    )
+    invalid = validate_request(spec, query=MultiDict({"filter[x]": "1"}))
+    assert invalid.errors["query_params"][0]["loc"] == ["filter", "x"]
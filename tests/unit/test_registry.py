@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from flask import Flask
+from flask_pydantic import FlaskPydantic, validate
+from flask_pydantic.registry import find_route, registered_specs, validated_routes
+from pydantic import BaseModel
+
+
+class Query(BaseModel):
+    limit: int = 10
+
+
+class Item(BaseModel):
+    name: str
+
+
+@pytest.fixture
+def registry_app():
+    app = Flask("registry_app")
+
+    @app.route("/items/<item_id>", methods=["GET", "PUT"])
+    @validate(body=Item, request_body_many=True)
+    def items(item_id: int, query: Query) -> Item:
+        pass
+
+    @app.route("/plain")
+    def plain():
+        pass
+
+    FlaskPydantic(app)
+    return app
+
+
+def test_specs_are_registered_at_decoration():
+    @validate(query=Query)
+    def view():
+        pass
+
+    assert any(spec.func is view.__wrapped__ for spec in registered_specs())
+
+
+def test_validated_routes(registry_app):
+    routes = list(validated_routes(registry_app))
+    assert [route.endpoint for route in routes] == ["items"]
+    route = find_route(registry_app, "items")
+    assert route.rules == ("/items/<item_id>",)
+    assert route.methods == ("GET", "PUT")
+    assert route.describe() == {
+        "endpoint": "items",
+        "rules": ["/items/<item_id>"],
+        "methods": ["GET", "PUT"],
+        "function": "tests.unit.test_registry.registry_app.<locals>.items",
+        "query": "Query",
+        "body": "Item",
+        "form": None,
+        "path": {"item_id": "int"},
+        "response": "Item",
+        "options": {
+            "on_success_status": 200,
+            "exclude_none": False,
+            "response_many": False,
+            "request_body_many": True,
+            "response_by_alias": False,
+            "response_memo": False,
+            "request_body_stream": False,
+            "singleflight": False,
+        },
+        "built": False,
+        "build_time": None,
+        "adapters": [],
+        "caches": {},
+    }
+    assert find_route(registry_app, "plain") is None
+
+
+def test_routes_command(registry_app):
+    runner = registry_app.test_cli_runner()
+    result = runner.invoke(args=["pydantic", "routes"])
+    assert "items [GET, PUT] /items/<item_id>" in result.output
+    assert "query: Query" in result.output
+    assert "path item_id: int" in result.output
+
+    result = runner.invoke(args=["pydantic", "routes", "--json"])
+    assert json.loads(result.output)[0]["endpoint"] == "items"
@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+from flask_pydantic.cache import digest
+from flask_pydantic.response_cache import CachedResponse, SharedResponseCache
+
+
+def key(value: str) -> bytes:
+    return digest(value.encode())
+
+
+RESPONSE = CachedResponse(200, "application/json", b'{"a": 1}')
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "responses.cache")
+
+
+@pytest.fixture
+def cache(cache_path):
+    cache = SharedResponseCache(cache_path, slots=16, slot_size=256, ways=4)
+    yield cache
+    cache.close()
+
+
+def test_get_set(cache):
+    assert cache.get(key("a")) is None
+    assert cache.set(key("a"), RESPONSE)
+    assert cache.get(key("a")) == RESPONSE
+    assert cache.set(key("a"), RESPONSE._replace(body=b"[]"))
+    assert cache.get(key("a")).body == b"[]"
+    assert cache.stats() == (2, 1, 1, 16)
+    cache.delete(key("a"))
+    assert cache.get(key("a")) is None
+    assert len(cache) == 0
+
+
+def test_large_response_is_not_cached(cache):
+    assert not cache.set(key("a"), RESPONSE._replace(body=b"x" * 256))
+    assert cache.get(key("a")) is None
+
+
+def test_ttl(cache, monkeypatch):
+    cache.set(key("a"), RESPONSE, ttl=10)
+    now = time.time()
+    monkeypatch.setattr("flask_pydantic.response_cache.time.time", lambda: now + 11)
+    assert cache.get(key("a")) is None
+
+
+def test_clock_eviction(cache_path):
+    cache = SharedResponseCache(cache_path, slots=4, slot_size=256, ways=4)
+    keys = [key(str(i)) for i in range(4)]
+    for k in keys:
+        cache.set(k, RESPONSE)
+    # referenced entries get a second chance
+    for k in keys[:3]:
+        assert cache.get(k)
+    cache.set(key("new"), RESPONSE)
+    assert cache.get(keys[3]) is None
+    assert all(cache.get(k) for k in keys[:3])
+    assert len(cache) == 4
+    cache.close()
+
+
+def test_geometry_mismatch(cache, cache_path):
+    with pytest.raises(ValueError):
+        SharedResponseCache(cache_path, slots=32, slot_size=256, ways=4)
+    with pytest.raises(ValueError):
+        SharedResponseCache(cache_path, slots=10, ways=4)
+
+
+def _write(path: str) -> None:
+    cache = SharedResponseCache(path, slots=16, slot_size=256, ways=4)
+    cache.set(key(f"pid {os.getpid()}"), RESPONSE)
+    cache.set(key("shared"), RESPONSE._replace(status=201))
+    cache.close()
+
+
+def test_shared_by_processes(cache, cache_path):
+    process = multiprocessing.get_context("spawn").Process(
+        target=_write, args=(cache_path,)
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    assert cache.get(key(f"pid {process.pid}")) == RESPONSE
+    assert cache.get(key("shared")).status == 201
@@ -0,0 +1,109 @@
+import functools
+from enum import Enum
+from typing import Optional
+from uuid import UUID
+
+import pytest
+from flask import Flask
+from flask_pydantic import validate
+from flask_pydantic.routing import (
+    converted_path_params,
+    path_converter,
+    route,
+    typed_rule,
+)
+from pydantic import conint
+from werkzeug.routing import ValidationError
+
+try:
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal
+
+
+class Size(int, Enum):
+    small = 1
+    large = 10
+
+
+converter_test_cases = [
+    pytest.param(int, "-12", -12, id="int"),
+    pytest.param(float, "1.5", 1.5, id="float"),
+    pytest.param(
+        UUID,
+        "0d9f6a33-5e27-4e6f-9a4a-3f0a6fd1f1a2",
+        UUID("0d9f6a33-5e27-4e6f-9a4a-3f0a6fd1f1a2"),
+        id="uuid",
+    ),
+    pytest.param(Size, "10", Size.large, id="int enum"),
+    pytest.param(Literal["a", "bb"], "bb", "bb", id="literal"),
+    pytest.param(Optional[int], "3", 3, id="optional"),
+    pytest.param(conint(gt=2), "3", 3, id="constrained int"),
+    pytest.param(str, "anything", "anything", id="string"),
+]
+
+
+@pytest.mark.parametrize("type_,value,expected", converter_test_cases)
+def test_converter_to_python(type_, value, expected):
+    _, converter = path_converter(type_)
+    assert converter(None).to_python(value) == expected
+
+
+@pytest.mark.parametrize(
+    "type_,value",
+    [
+        pytest.param(conint(gt=2), "1", id="constraint"),
+        pytest.param(Size, "2", id="enum"),
+    ],
+)
+def test_converter_rejects_invalid(type_, value):
+    _, converter = path_converter(type_)
+    with pytest.raises(ValidationError):
+        converter(None).to_python(value)
+
+
+def test_converters_are_shared():
+    assert path_converter(UUID) is path_converter(UUID)
+
+
+def test_typed_rule():
+    def view(a: int, b, c: Size, query: int):
+        pass
+
+    rule, converters, converted = typed_rule("/<a>/<b>/<int:c>/<query>", view)
+    name = path_converter(int)[0]
+    assert rule == f"/<{name}:a>/<b>/<int:c>/<query>"
+    assert converters == {name: path_converter(int)[1]}
+    assert converted == {"a"}
+
+
+def test_route_decorator_reused():
+    app = Flask(__name__)
+    decorator = route(app, "/<item_id>", endpoint="item", methods=["GET"])
+    decorator(lambda item_id: "first")
+    with pytest.raises(AssertionError, match="overwriting an existing endpoint"):
+        # endpoint is kept for the second use
+        decorator(lambda item_id: "second")
+
+
+def test_route_marks_wrapped_views():
+    app = Flask(__name__)
+
+    def login_required(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    @route(app, "/items/<item_id>", methods=["GET"])
+    @login_required
+    @validate()
+    def get_item(item_id: int):
+        return {"id": item_id}
+
+    assert converted_path_params(get_item) == {"item_id"}
+    assert converted_path_params(get_item.__wrapped__) == {"item_id"}
+    response = app.test_client().get("/items/7")
+    assert response.json == {"id": 7}
+    assert app.test_client().get("/items/seven").status_code == 404
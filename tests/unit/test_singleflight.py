@@ -0,0 +1,77 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask_pydantic.singleflight import SingleFlight, singleflight_key
+from pydantic import BaseModel
+
+
+class Query(BaseModel):
+    page: int = 1
+
+
+def run_concurrently(flight: SingleFlight, func, calls: int = 5, **kwargs):
+    with ThreadPoolExecutor(calls) as pool:
+        futures = [pool.submit(flight.do, "key", func, **kwargs) for _ in range(calls)]
+        # let the other calls wait for the first one
+        time.sleep(0.2)
+        release.set()
+        return [future.result() for future in futures]
+
+
+release = threading.Event()
+
+
+@pytest.fixture(autouse=True)
+def reset_release():
+    release.clear()
+
+
+def test_coalesced_calls():
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait()
+        return [len(calls)]
+
+    results = run_concurrently(flight, func, share=tuple)
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert [1] in [result for result, _ in results]
+    assert (1,) in [result for result, _ in results]
+    assert flight.stats() == (4, 1, 0, None)
+    assert len(flight) == 0
+
+
+def test_unshared_result_is_recomputed():
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait()
+        return "streamed"
+
+    results = run_concurrently(flight, func, calls=3, share=lambda result: None)
+    assert len(calls) == 3
+    assert [shared for _, shared in results] == [False] * 3
+
+
+def test_failed_call_is_not_shared():
+    flight = SingleFlight()
+    with pytest.raises(ZeroDivisionError):
+        flight.do("key", lambda: 1 / 0)
+    assert flight.do("key", lambda: 1) == (1, False)
+
+
+def test_singleflight_key():
+    assert singleflight_key("a", {"id": 1}, Query()) == singleflight_key(
+        "a", {"id": 1}, Query(page=1)
+    )
+    assert singleflight_key("a", {"id": 1}, Query()) != singleflight_key(
+        "a", {"id": 1}, Query(page=2)
+    )
+    assert len(singleflight_key("a", object())) == 16
@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import random
+
+from flask_pydantic import validate
+from flask_pydantic.stats import EndpointStats, Histogram, PerfStats, load_stats, report
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    values = list(range(1, 100_001))
+    random.Random(0).shuffle(values)
+    for value in values:
+        histogram.record(value)
+    assert (histogram.count, histogram.min, histogram.max) == (100_000, 1, 100_000)
+    for percent in (50, 90, 99):
+        expected = percent * 1000
+        assert expected <= histogram.percentile(percent) <= expected * 1.04
+    assert histogram.percentile(100) == 100_000
+    assert Histogram().percentile(50) == 0
+
+
+def test_histogram_small_values_are_exact():
+    histogram = Histogram()
+    for value in (0, 1, 2, 3, 31):
+        histogram.record(value)
+    assert [histogram.percentile(p) for p in (20, 40, 60, 80, 100)] == [0, 1, 2, 3, 31]
+
+
+def test_histogram_merge_and_serialization():
+    first, second = Histogram(), Histogram()
+    for value in range(1000):
+        first.record(value)
+        second.record(value * 1000)
+    first.merge(second)
+    restored = Histogram.from_dict(json.loads(json.dumps(first.as_dict())))
+    assert restored.as_dict() == first.as_dict()
+    assert (restored.count, restored.min, restored.max) == (2000, 0, 999_000)
+
+
+def test_flush_and_load(tmp_path):
+    stats = PerfStats(directory=str(tmp_path))
+    other = EndpointStats()
+    other.record(1000, {"view": 500}, 10, 20, {})
+    (tmp_path / "1.json").write_text(json.dumps(report({"items": other})))
+    (tmp_path / "2.json").write_text("{")
+    bucket = stats._bucket()
+    bucket["items"] = EndpointStats()
+    bucket["items"].record(3000, {"view": 1500}, None, 20, {"query_params": []})
+    stats._specs["items"] = validate()(lambda: None).__flask_pydantic_spec__
+    stats.flush()
+    merged = load_stats(str(tmp_path))["items"]
+    assert merged.requests == 2
+    assert merged.phases["view"].max == 1500
+    assert merged.errors == {"query_params": 1}
+    assert stats.collect()["items"].requests == 2
+
+
+def test_stale_files(tmp_path):
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    content = json.dumps(report({"items": EndpointStats()}))
+    (tmp_path / f"{process.pid}.json").write_text(content)
+    idle = tmp_path / f"{os.getppid()}.json"
+    idle.write_text(content)
+    os.utime(idle, (time.time() - 120, time.time() - 120))
+    assert "items" in load_stats(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == [idle.name]
+    stats = PerfStats(directory=str(tmp_path), max_age=60)
+    assert stats.collect() == {}
+    assert os.listdir(tmp_path) == []
+
+
+def test_close(tmp_path):
+    stats = PerfStats(directory=str(tmp_path))
+    stats.flush()
+    assert os.listdir(tmp_path) == [f"{os.getpid()}.json"]
+    stats.close()
+    stats.flush()
+    assert os.listdir(tmp_path) == []
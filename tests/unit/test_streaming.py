@@ -0,0 +1,146 @@
+import json
+from io import BytesIO
+from typing import Optional
+
+import pytest
+from flask_pydantic.exceptions import ManyModelValidationError
+from flask_pydantic.streaming import (
+    csv_field_keys,
+    iter_csv_models,
+    iter_csv_rows,
+    iter_json_array,
+    iter_json_models,
+    iter_models,
+    JsonArrayError,
+)
+from pydantic import BaseModel, Field
+
+
+class Person(BaseModel):
+    name: str = Field(alias="fullName")
+    age: int
+    email: Optional[str] = None
+
+
+CSV = b'fullName,age,email\r\nAnn,30,ann@example.com\r\n"Bob, Jr.",40,\r\n'
+
+
+def test_csv_field_keys():
+    assert csv_field_keys(Person) == {
+        "name": "fullName",
+        "fullName": "fullName",
+        "age": "age",
+        "email": "email",
+    }
+
+
+def test_iter_csv_rows():
+    stream = BytesIO(b"\xef\xbb\xbfname,age\nAnn,30\n")
+    assert list(iter_csv_rows(stream, Person)) == [{"fullName": "Ann", "age": "30"}]
+    assert not stream.closed
+    assert list(iter_csv_rows(BytesIO(b""), Person)) == []
+
+
+def test_iter_csv_models():
+    models = iter_csv_models(Person, BytesIO(CSV))
+    assert next(models) == Person(fullName="Ann", age=30, email="ann@example.com")
+    assert next(models) == Person(fullName="Bob, Jr.", age=40)
+    assert next(models, None) is None
+
+
+def test_iter_csv_models_charset():
+    data = "name,age\nJiří,30\n".encode("cp1250")
+    (person,) = iter_csv_models(Person, BytesIO(data), charset="cp1250")
+    assert person.name == "Jiří"
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_iter_csv_models_batches(strict):
+    data = b"name,age\n" + b"Ann,1\n" * 6
+    batches = iter_csv_models(Person, BytesIO(data), batch_size=4, strict=strict)
+    assert [len(batch) for batch in batches] == [4, 2]
+
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+def test_iter_csv_models_errors(batch_size):
+    data = b"name,age\nAnn,30\nBob,x\nCyril,1\n"
+    models = iter_csv_models(Person, BytesIO(data), batch_size=batch_size)
+    with pytest.raises(ManyModelValidationError) as e:
+        list(models)
+    assert [error["loc"] for error in e.value.errors()] == [[1, "age"]]
+
+
+def test_iter_models():
+    items = [{"fullName": "Ann", "age": 1}, {"fullName": "Bob", "age": "x"}]
+    models = iter_models(Person, items)
+    assert next(models).name == "Ann"
+    with pytest.raises(ManyModelValidationError) as e:
+        next(models)
+    assert e.value.errors()[0]["loc"] == [1, "age"]
+    batches = iter_models(Person, items[:1] * 3, batch_size=2)
+    assert [len(batch) for batch in batches] == [2, 1]
+
+
+NESTED = b' [ {"a": "x,]}\\"[", "b": [1, {}]}, 2 ,"s"] '
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 1024])
+def test_iter_json_array(read_size):
+    assert list(iter_json_array(BytesIO(NESTED), read_size)) == [
+        ({"a": 'x,]}"[', "b": [1, {}]}, '{"a": "x,]}\\"[", "b": [1, {}]}'),
+        (2, "2"),
+        ("s", '"s"'),
+    ]
+    assert list(iter_json_array(BytesIO(b" [ ] "), read_size)) == []
+
+
+NUMBERS = b"[12.5, 1e3 ,-0.25E-2,7, 3.0e+1 ]"
+
+
+@pytest.mark.parametrize("read_size", range(1, 8))
+def test_iter_json_array_split_numbers(read_size):
+    assert [
+        value for value, _ in iter_json_array(BytesIO(NUMBERS), read_size)
+    ] == json.loads(NUMBERS)
+
+
+@pytest.mark.parametrize(
+    "data,index,not_array",
+    [
+        (b"", None, True),
+        (b'{"a": 1}', None, True),
+        (b"[1, 2", 2, False),
+        (b"[1 2]", 1, False),
+        (b"[1, tru]", 1, False),
+        (b'[1, "2', 1, False),
+        (b"[1] 2", None, False),
+    ],
+)
+def test_iter_json_array_errors(data, index, not_array):
+    with pytest.raises(JsonArrayError) as e:
+        list(iter_json_array(BytesIO(data), 2))
+    assert (e.value.index, e.value.not_array) == (index, not_array)
+
+
+PEOPLE = b'[{"fullName": "Ann", "age": 30}, {"fullName": "Bob", "age": "40"}]'
+
+
+def test_iter_json_models():
+    models = iter_json_models(Person, BytesIO(PEOPLE))
+    assert [person.age for person in models] == [30, 40]
+    batches = iter_json_models(Person, BytesIO(PEOPLE), batch_size=1)
+    assert [len(batch) for batch in batches] == [1, 1]
+
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+def test_iter_json_models_errors(batch_size):
+    models = iter_json_models(Person, BytesIO(PEOPLE), batch_size, strict=True)
+    with pytest.raises(ManyModelValidationError) as e:
+        list(models)
+    assert [error["loc"] for error in e.value.errors()] == [[1, "age"]]
+    with pytest.raises(ManyModelValidationError) as e:
+        list(iter_json_models(Person, BytesIO(b"{}"), batch_size))
+    assert e.value.errors()[0]["loc"] == ["root"]
+    with pytest.raises(ManyModelValidationError) as e:
+        list(iter_json_models(Person, BytesIO(b'[{"fullName": "Ann"'), batch_size))
+    assert e.value.errors()[0]["type"] == "json_invalid"
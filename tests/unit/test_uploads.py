@@ -0,0 +1,117 @@
+from io import BytesIO
+from typing import List, Optional
+
+import pytest
+from flask_pydantic.exceptions import UploadTooLargeError
+from flask_pydantic.uploads import (
+    MaxSize,
+    UploadField,
+    UploadFile,
+    upload_fields,
+    upload_stream_factory,
+)
+from pydantic import BaseModel, ValidationError
+from typing_extensions import Annotated, TypedDict
+from werkzeug.datastructures import FileStorage
+from werkzeug.formparser import FormDataParser, default_stream_factory
+from werkzeug.http import parse_options_header
+from werkzeug.test import EnvironBuilder
+
+
+class Form(BaseModel):
+    name: str
+    avatar: Optional[Annotated[UploadFile, MaxSize(10)]] = None
+    photos: Annotated[List[UploadFile], MaxSize(20)] = []
+
+
+class FormDict(TypedDict):
+    document: UploadFile
+
+
+def multipart(data: dict):
+    environ = EnvironBuilder(method="POST", data=data).get_environ()
+    return (
+        environ["wsgi.input"],
+        environ["CONTENT_TYPE"],
+        int(environ["CONTENT_LENGTH"]),
+    )
+
+
+def parse(data: dict, spool_size: int = 1024, limits=None):
+    stream, content_type, content_length = multipart(data)
+    limits = upload_fields(Form) if limits is None else limits
+    # werkzeug's own parser calls the factory
+    parser = FormDataParser(
+        upload_stream_factory(default_stream_factory, limits, spool_size)
+    )
+    mimetype, options = parse_options_header(content_type)
+    return parser.parse(stream, mimetype, content_length, options)
+
+
+def test_upload_fields():
+    assert upload_fields(Form) == {
+        "avatar": UploadField(many=False, max_size=10),
+        "photos": UploadField(many=True, max_size=20),
+    }
+    assert upload_fields(FormDict) == {"document": UploadField(many=False)}
+
+
+def test_validation():
+    storage = FileStorage(BytesIO(b"abc"), "a.png", "avatar", "image/png")
+    form = Form(name="x", avatar=storage)
+    assert form.avatar.size == 3
+    assert form.avatar.content_type == "image/png"
+    assert form.model_dump() == {"name": "x", "avatar": "a.png", "photos": []}
+    with pytest.raises(ValidationError) as e:
+        Form(name="x", avatar="a.png")
+    assert e.value.errors()[0]["type"] == "upload_file"
+    with pytest.raises(ValidationError) as e:
+        Form(name="x", photos=[FileStorage(BytesIO(b"x" * 21))])
+    assert e.value.errors()[0]["type"] == "file_too_large"
+
+
+def test_parser_spools_to_disk():
+    _, form, files = parse(
+        {"name": "x", "avatar": (BytesIO(b"x" * 10), "a.png")}, spool_size=4
+    )
+    assert form["name"] == "x"
+    assert files["avatar"].stream.size == 10
+    assert files["avatar"].stream._rolled
+    _, _, files = parse({"avatar": (BytesIO(b"x" * 3), "a.png")}, spool_size=4)
+    assert not files["avatar"].stream._rolled
+
+
+def test_parser_enforces_limits():
+    with pytest.raises(UploadTooLargeError) as e:
+        limits = {"avatar": upload_fields(Form)["avatar"]}
+        parse({"avatar": (BytesIO(b"x" * 11), "a.png")}, limits=limits)
+    assert (e.value.field, e.value.max_size) == ("avatar", 10)
+    # the largest limit of the form is enforced while streaming
+    _, _, files = parse({"avatar": (BytesIO(b"x" * 15), "a.png")})
+    assert files["avatar"].stream.size == 15
+    with pytest.raises(UploadTooLargeError) as e:
+        parse({"other": (BytesIO(b"x" * 21), "a.png")})
+    assert (e.value.field, e.value.max_size) == ("photos", 20)
+    # forms with unlimited upload fields
+    _, _, files = parse(
+        {"document": (BytesIO(b"x" * 100), "a.png")}, limits=upload_fields(FormDict)
+    )
+    assert files["document"].read() == b"x" * 100
+
+
+def test_parser_uses_stream_factory():
+    streams = []
+
+    def stream_factory(*args, **kwargs):
+        streams.append(BytesIO())
+        return streams[-1]
+
+    limits = upload_fields(Form)
+    parser = FormDataParser(upload_stream_factory(stream_factory, limits))
+    stream, content_type, content_length = multipart(
+        {"avatar": (BytesIO(b"abc"), "a.png")}
+    )
+    mimetype, options = parse_options_header(content_type)
+    _, _, files = parser.parse(stream, mimetype, content_length, options)
+    assert files["avatar"].stream.stream is streams[0]
+    assert UploadFile(files["avatar"]).size == 3
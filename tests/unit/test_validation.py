@@ -0,0 +1,152 @@
+from io import BytesIO
+from typing import List
+
+import pytest
+from flask_pydantic.exceptions import (
+    JsonBodyParsingError,
+    UnsupportedMediaTypeError,
+)
+from flask_pydantic.spec import RouteSpec
+from flask_pydantic.validation import validate_request
+from pydantic import BaseModel, ValidationInfo, field_validator
+from werkzeug.datastructures import Headers, ImmutableMultiDict
+
+
+class Query(BaseModel):
+    limit: int
+    tags: List[str] = []
+
+
+class Body(BaseModel):
+    name: str
+
+
+def view(item_id: int, query: Query, body: Body):
+    pass
+
+
+@pytest.fixture
+def spec() -> RouteSpec:
+    return RouteSpec(view)
+
+
+class TestValidateRequest:
+    def test_valid(self, spec):
+        result = validate_request(
+            spec,
+            path_params={"item_id": "3"},
+            query=ImmutableMultiDict([("limit", "5"), ("tags", "a"), ("tags", "b")]),
+            body={"name": "Geralt"},
+        )
+        assert result.errors == {}
+        assert result.path_params == {"item_id": 3}
+        assert result.query_params == Query(limit=5, tags=["a", "b"])
+        assert result.body_params == Body(name="Geralt")
+        assert result.form_params is None
+
+    def test_raw_body(self, spec):
+        result = validate_request(
+            spec,
+            path_params={"item_id": 1},
+            query=ImmutableMultiDict({"limit": "1"}),
+            raw_body=b'{"name": "Triss"}',
+        )
+        assert result.body_params == Body(name="Triss")
+
+    def test_raw_body_validated_like_parsed_body(self):
+        class Mode(BaseModel):
+            mode: str = ""
+
+            @field_validator("mode")
+            @classmethod
+            def validation_mode(cls, value: str, info: ValidationInfo) -> str:
+                return info.mode
+
+        spec = RouteSpec(body=Mode)
+        parsed = validate_request(spec, body={"mode": ""})
+        raw = validate_request(spec, raw_body=b'{"mode": ""}')
+        assert parsed.body_params.mode == raw.body_params.mode == "python"
+        strict = validate_request(spec, raw_body=b'{"mode": ""}', strict=True)
+        assert strict.body_params.mode == "json"
+        malformed = validate_request(spec, raw_body=b'{"mode": ')
+        assert [e["type"] for e in malformed.errors["body_params"]] == ["json_invalid"]
+
+    def test_errors(self, spec):
+        result = validate_request(
+            spec, path_params={"item_id": "x"}, body={}, strict=True
+        )
+        assert set(result.errors) == {"path_params", "query_params", "body_params"}
+
+    def test_skip_path_params(self, spec):
+        result = validate_request(
+            spec,
+            path_params={"item_id": "x"},
+            query=ImmutableMultiDict({"limit": "1"}),
+            body={"name": "a"},
+            skip_path_params={"item_id"},
+        )
+        assert result.errors == {}
+        assert result.path_params == {"item_id": "x"}
+
+    def test_form_without_function(self):
+        result = validate_request(
+            RouteSpec(form=Body), form=ImmutableMultiDict({"name": "Yennefer"})
+        )
+        assert result.form_params == Body(name="Yennefer")
+
+    def test_unsupported_media_type(self):
+        with pytest.raises(UnsupportedMediaTypeError) as excinfo:
+            validate_request(
+                RouteSpec(body=Body), headers=Headers({"Content-Type": "text/plain"})
+            )
+        assert excinfo.value.content_type == "text/plain"
+
+    def test_missing_json(self):
+        with pytest.raises(JsonBodyParsingError):
+            validate_request(
+                RouteSpec(body=Body),
+                headers=Headers({"Content-Type": "application/json"}),
+            )
+
+
+class TestStrictFallback:
+    def test_list_fields_warn(self):
+        with pytest.warns(UserWarning, match="query parameters .* list fields"):
+            spec = RouteSpec(view, strict=True)
+        result = validate_request(
+            spec,
+            path_params={"item_id": "3"},
+            query=ImmutableMultiDict([("limit", "5"), ("tags", "a")]),
+            raw_body=b'{"name": "Geralt"}',
+            strict=True,
+        )
+        assert result.errors == {}
+        assert result.query_params == Query(limit=5, tags=["a"])
+
+    def test_no_string_mode(self, monkeypatch):
+        monkeypatch.setattr("flask_pydantic.spec.STRING_MODE", False)
+        monkeypatch.setattr("flask_pydantic.validation.STRING_MODE", False)
+        with pytest.warns(UserWarning, match="query, path parameters .* pydantic 2.6"):
+            spec = RouteSpec(view, strict=True)
+        result = validate_request(
+            spec,
+            path_params={"item_id": "3"},
+            query=ImmutableMultiDict({"limit": "5"}),
+            raw_body=b'{"name": "Geralt"}',
+            strict=True,
+        )
+        assert result.errors == {}
+        assert result.path_params == {"item_id": 3}
+        # body is still validated strictly
+        result = validate_request(spec, raw_body=b'{"name": 1}', strict=True)
+        assert result.errors["body_params"][0]["type"] == "string_type"
+
+
+def test_csv_body_format():
+    headers = Headers({"Content-Type": "text/csv"})
+    spec = RouteSpec(body=Body, request_body_many=True)
+    with pytest.raises(UnsupportedMediaTypeError):
+        validate_request(spec, stream=BytesIO(b"name\nAnn\n"), headers=headers)
+    spec = RouteSpec(body=Body, request_body_many=True, body_formats=("csv",))
+    result = validate_request(spec, stream=BytesIO(b"name\nAnn\n"), headers=headers)
+    assert result.body_params == [Body(name="Ann")]